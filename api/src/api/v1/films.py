@@ -1,25 +1,32 @@
+import asyncio
 from http import HTTPStatus
-from typing import Literal
+from typing import Awaitable, Literal
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import TypeAdapter
 from src.api.v1.schemas.film import Film
 from src.api.v1.schemas.film_detailed import FilmDetailed
-from src.api.v1.schemas.pagination import PaginatedParams
+from src.api.v1.schemas.pagination import NEXT_PAGE_TOKEN_HEADER, CursorParams, PaginatedParams
 from src.core.auth import TokenData, get_current_user
 from src.core.prometheus_metrics import movies_watch_amount
 from src.core.settings import DjangoSettings, FileapiSettings
-from src.db.redis import get_cache
-from src.services.cache.storage import ICache
+from src.db.redis import get_response_cache
+from src.models.film import Film as FilmModel
+from src.services.base import Page, PageTokenError
+from src.services.cache.swr import CachePolicy, StaleWhileRevalidateCache
 from src.services.film import FilmService, get_film_service
-from src.services.user_pref import UserPrefService, get_user_pref_service
+from src.services.film_enrichment import FilmEnrichmentService, get_film_enrichment_service
 
 router = APIRouter()
 
 
 SORT_OPTION = Literal["imdb_rating", "-imdb_rating"]
 
+LIST_CACHE_POLICY = CachePolicy(ttl=60 * 5, stale_ttl=60 * 5)
+# Long tail of search queries is rarely repeated, keep it shorter
+SEARCH_CACHE_POLICY = CachePolicy(ttl=60 * 2, stale_ttl=60 * 3)
+
 
 @router.get(
     "/",
@@ -30,20 +37,16 @@ SORT_OPTION = Literal["imdb_rating", "-imdb_rating"]
 async def list_films(
     response: Response,
     pagination: PaginatedParams = Depends(),
+    cursor: CursorParams = Depends(),
     sort: SORT_OPTION = Query("imdb_rating", description="Sorting options"),
     genre: UUID | None = Query(None, description="Films by genre"),
     user: TokenData | None = Depends(get_current_user),
     user_id: UUID | None = Query(None, description="User id from the access token"),
     film_service: FilmService = Depends(get_film_service),
-    user_pref: UserPrefService = Depends(get_user_pref_service),
-    cache: ICache = Depends(get_cache),
+    enrichment: FilmEnrichmentService = Depends(get_film_enrichment_service),
+    response_cache: StaleWhileRevalidateCache = Depends(get_response_cache),
 ) -> list[Film]:
     user_id = user.user_id if user else user_id
-    key = f"films:{pagination.page_number}:{pagination.page_size}:{genre}:{sort}"
-    adapter = TypeAdapter(list[Film])
-    if cached := await cache.get(key):
-        return adapter.validate_json(cached)
-
     sort_object: dict[str, int] | None = None
     if sort:
         sort_object = {}
@@ -53,13 +56,25 @@ async def list_films(
                 sort_object[item[1:]] = -1
             else:
                 sort_object[item] = 1
-    films = await film_service.get_all_films(pagination.page_number, pagination.page_size, genre, sort_object)
-    mapped = [Film.model_validate(film) for film in films]
-    await _populate_rating(mapped, user_pref, user_id)
 
-    cached = adapter.dump_json(mapped)
-    await cache.set(key, cached, 60 * 5)
-    response.headers["Cache-Control"] = f"max-age={60 * 5}"
+    if cursor.enabled:
+        # Cursor pages live inside a point in time, so they are not cached
+        page = await _get_page(film_service.get_films_page(pagination.page_size, cursor.page_token, genre, sort_object))
+        return await _page_response(response, page, enrichment, user_id)
+
+    key = f"films:{pagination.page_number}:{pagination.page_size}:{genre}:{sort}"
+    adapter = TypeAdapter(list[Film])
+
+    async def load() -> bytes:
+        films = await film_service.get_all_films(pagination.page_number, pagination.page_size, genre, sort_object)
+        return adapter.dump_json([Film.model_validate(film) for film in films])
+
+    # Only the film list is cached, ratings and user's marks are added per request
+    mapped = adapter.validate_json(await response_cache.get_or_load(key, LIST_CACHE_POLICY, load))
+    await enrichment.enrich(mapped, user_id)
+    response.headers["Cache-Control"] = LIST_CACHE_POLICY.cache_control_for(personal=user_id is not None)
+    # The user may come from the access token, so shared caches must not mix anonymous and users' responses
+    response.headers["Vary"] = "Authorization"
     return mapped
 
 
@@ -74,22 +89,25 @@ async def search_films(
     query: str = Query(min_length=3, description="Search query string"),
     user_id: UUID | None = Query(None, description="User id from the access token"),
     pagination: PaginatedParams = Depends(),
+    cursor: CursorParams = Depends(),
     film_service: FilmService = Depends(get_film_service),
-    user_pref: UserPrefService = Depends(get_user_pref_service),
-    cache: ICache = Depends(get_cache),
+    enrichment: FilmEnrichmentService = Depends(get_film_enrichment_service),
+    response_cache: StaleWhileRevalidateCache = Depends(get_response_cache),
 ) -> list[Film]:
-    key = f"films:{query}:{pagination.page_number}:{pagination.page_size}"
+    if cursor.enabled:
+        page = await _get_page(film_service.search_films_page(query, pagination.page_size, cursor.page_token))
+        return await _page_response(response, page, enrichment, user_id)
+
+    key = f"films:search:{query}:{pagination.page_number}:{pagination.page_size}"
     adapter = TypeAdapter(list[Film])
-    if cached := await cache.get(key):
-        return adapter.validate_json(cached)
 
-    films = await film_service.search_films(query, pagination.page_number, pagination.page_size)
-    mapped = [Film.model_validate(film) for film in films]
-    await _populate_rating(mapped, user_pref, user_id)
+    async def load() -> bytes:
+        films = await film_service.search_films(query, pagination.page_number, pagination.page_size)
+        return adapter.dump_json([Film.model_validate(film) for film in films])
 
-    cached = adapter.dump_json(mapped)
-    await cache.set(key, cached, 60 * 5)
-    response.headers["Cache-Control"] = f"max-age={60 * 5}"
+    mapped = adapter.validate_json(await response_cache.get_or_load(key, SEARCH_CACHE_POLICY, load))
+    await enrichment.enrich(mapped, user_id)
+    response.headers["Cache-Control"] = SEARCH_CACHE_POLICY.cache_control_for(personal=user_id is not None)
     return mapped
 
 
@@ -103,11 +121,13 @@ async def film_details(
     film_id: UUID,
     user_id: UUID | None = Query(None, description="User id from the access token"),
     film_service: FilmService = Depends(get_film_service),
-    user_pref: UserPrefService = Depends(get_user_pref_service),
+    enrichment: FilmEnrichmentService = Depends(get_film_enrichment_service),
 ) -> FilmDetailed:
-    if film := await film_service.get_by_id(film_id):
+    # Id is known upfront, so ratings are fetched alongside the film itself
+    film, extra = await asyncio.gather(film_service.get_by_id(film_id), enrichment.fetch([film_id], user_id))
+    if film:
         model = FilmDetailed.model_validate(film)
-        await _populate_rating([model], user_pref, user_id)
+        extra.apply([model])
         for genre in film.genres:
             movies_watch_amount.labels(type=genre.name).inc()
 
@@ -122,17 +142,19 @@ async def film_details(
     raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
 
 
-async def _populate_rating(films: list[Film], user_pref: UserPrefService, user_id: UUID | None) -> None:
-    ids = [f.id for f in films]
-    ratings = await user_pref.count_films_rating(ids)
-    user_ratings = await user_pref.list_user_ratings(user_id, ids) if user_id else {}
-    bookmarked = await user_pref.list_user_bookmarks(user_id, ids) if user_id else []
-    ratings_map = {r.id: r for r in ratings}
-    bookmarked_set = {bm.movie_id for bm in bookmarked}
-    for film in films:
-        if film_rating := ratings_map.get(film.id):
-            film.user_rating = film_rating.rating
-            film.user_count = film_rating.count
-        if (ur := user_ratings.get(film.id)) is not None:
-            film.my_rating = ur
-        film.is_bookmarked = film.id in bookmarked_set
+async def _get_page(request: Awaitable[Page[FilmModel]]) -> Page[FilmModel]:
+    try:
+        return await request
+    except PageTokenError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+
+
+async def _page_response(
+    response: Response, page: Page[FilmModel], enrichment: FilmEnrichmentService, user_id: UUID | None
+) -> list[Film]:
+    mapped = [Film.model_validate(film) for film in page.items]
+    await enrichment.enrich(mapped, user_id)
+    if page.next_page_token:
+        response.headers[NEXT_PAGE_TOKEN_HEADER] = page.next_page_token
+    response.headers["Cache-Control"] = "no-store"
+    return mapped
@@ -3,9 +3,10 @@ from typing import Annotated
 from uuid import UUID
 
 from fastapi import APIRouter, Body, Depends
+from src.api.v1.schemas.film_rating_request import FilmRatingRequest
 from src.core.auth import AuthorizationProvider, TokenData
 from src.services.film import FilmService, get_film_service
-from src.services.user_pref import UserPrefService, get_user_pref_service
+from src.services.user_pref import MAX_BATCH_SIZE, UserPrefService, get_user_pref_service
 
 router = APIRouter()
 
@@ -39,6 +40,16 @@ async def get_liked(
     return await userpref.list_user_ratings(user.user_id)
 
 
+@router.post("/batch")
+async def set_likes(
+    ratings: Annotated[list[FilmRatingRequest], Body(max_length=MAX_BATCH_SIZE)],
+    user: TokenData = Depends(AuthorizationProvider()),
+    userpref: UserPrefService = Depends(get_user_pref_service),
+) -> dict[UUID, int | None]:
+    """Set many ratings at once, the last one wins for a repeated film"""
+    return await userpref.upsert_movie_ratings(user.user_id, {r.film_id: r.rating for r in ratings})
+
+
 @router.patch("/{film_id}")
 async def set_like(
     film_id: UUID,
@@ -6,8 +6,11 @@ from bson import ObjectId
 from fastapi import APIRouter, Body, Depends
 from pydantic import AfterValidator
 from src.api.v1.schemas.film_review_request import FilmReviewRequest
+from src.api.v1.schemas.object_id import check_object_id
+from src.api.v1.schemas.pagination import PaginatedParams
+from src.api.v1.schemas.review_reaction_request import ReviewReactionRequest
 from src.core.auth import AuthorizationProvider, TokenData
-from src.services.user_pref import UserPrefService, get_user_pref_service
+from src.services.user_pref import MAX_BATCH_SIZE, UserPrefService, get_user_pref_service
 
 router = APIRouter()
 
@@ -15,10 +18,15 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-def check_object_id(value: str) -> str:
-    if not ObjectId.is_valid(value):
-        raise ValueError("Invalid ObjectId")
-    return value
+# Declared before /{film_id} routes, otherwise "reactions" is matched as a film id
+@router.post("/reactions")
+async def set_review_reactions(
+    reactions: Annotated[list[ReviewReactionRequest], Body(max_length=MAX_BATCH_SIZE)],
+    user: TokenData = Depends(AuthorizationProvider()),
+    userpref: UserPrefService = Depends(get_user_pref_service),
+):
+    """Set many reactions at once, the last one wins for a repeated review"""
+    await userpref.rate_movie_reviews(user.user_id, {ObjectId(r.review_id): r.like for r in reactions})
 
 
 @router.post("/{film_id}")
@@ -35,18 +43,21 @@ async def sumbit_review(
 
 @router.get("/user")
 async def get_user_reviews(
+    pagination: PaginatedParams = Depends(),
     user: TokenData = Depends(AuthorizationProvider()),
     userpref: UserPrefService = Depends(get_user_pref_service),
 ):
-    return await userpref.list_user_reviews(user.user_id)
+    return await userpref.list_user_reviews(user.user_id, pagination.page_number, pagination.page_size)
 
 
 @router.get("/{film_id}")
 async def list_reviews(
     film_id: UUID,
+    pagination: PaginatedParams = Depends(),
     userpref: UserPrefService = Depends(get_user_pref_service),
 ):
-    return await userpref.list_movie_revies(film_id)
+    """Film reviews, the most liked first"""
+    return await userpref.list_movie_revies(film_id, pagination.page_number, pagination.page_size)
 
 
 @router.patch("/{review_id}")
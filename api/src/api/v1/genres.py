@@ -2,7 +2,7 @@ from http import HTTPStatus
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
-from src.api.v1.schemas.genre import Genre
+from src.api.v1.schemas.genre import Genre, GenreFilm
 from src.models.genre import Genre as Model
 from src.services.genre import GenreService, get_genre_service
 
@@ -10,7 +10,13 @@ router = APIRouter()
 
 
 def _from_model(model: Model) -> Genre:
-    return Genre(id=model.id, name=model.name, description=model.description)
+    return Genre(
+        id=model.id,
+        name=model.name,
+        description=model.description,
+        films_count=model.films_count,
+        top_films=[GenreFilm(uuid=f.id, title=f.title, imdb_rating=f.imdb_rating) for f in model.top_films],
+    )
 
 
 @router.get("/", response_model=list[Genre], summary="Список жанров", description="Возвращает полный список жанров")
@@ -1,25 +1,29 @@
 import logging
 from http import HTTPStatus
-from typing import get_args
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import TypeAdapter
 from src.api.v1.films import Film
-from src.api.v1.schemas.pagination import PaginatedParams
+from src.api.v1.schemas.pagination import NEXT_PAGE_TOKEN_HEADER, CursorParams, PaginatedParams
 from src.api.v1.schemas.person import Person, PersonFilm
-from src.db.redis import get_cache
-from src.models.film import Film as FilmModel
+from src.db.redis import get_response_cache
 from src.models.person import Person as PersonModel
-from src.services.cache.storage import ICache
-from src.services.film import PERSON_ROLE, FilmService, get_film_service
-from src.services.person_film import PersonFilmService, get_person_film_service
+from src.services.base import PageTokenError
+from src.services.cache.swr import CachePolicy, StaleWhileRevalidateCache
+from src.services.film import FilmService, get_film_service
+from src.services.film_enrichment import FilmEnrichmentService, get_film_enrichment_service
+from src.services.person import PersonService, get_person_service
 
 router = APIRouter()
 
 
 logger = logging.getLogger(__name__)
 
+SEARCH_CACHE_POLICY = CachePolicy(ttl=60 * 5, stale_ttl=60 * 5)
+# Filmography changes rarely, and the ETL invalidates it when it does
+FILMS_CACHE_POLICY = CachePolicy(ttl=60 * 10, stale_ttl=60 * 10)
+
 
 @router.get(
     "/search",
@@ -31,20 +35,30 @@ async def search_persons(
     response: Response,
     query: str = Query(..., min_length=3, description="Search string"),
     pagination: PaginatedParams = Depends(),
-    person_film_service: PersonFilmService = Depends(get_person_film_service),
-    cache: ICache = Depends(get_cache),
+    cursor: CursorParams = Depends(),
+    person_service: PersonService = Depends(get_person_service),
+    response_cache: StaleWhileRevalidateCache = Depends(get_response_cache),
 ) -> list[Person]:
+    if cursor.enabled:
+        try:
+            page = await person_service.search_page(query, pagination.page_size, cursor.page_token)
+        except PageTokenError as e:
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+        if page.next_page_token:
+            response.headers[NEXT_PAGE_TOKEN_HEADER] = page.next_page_token
+        response.headers["Cache-Control"] = "no-store"
+        return [_construct_person_films(person) for person in page.items]
+
     key = f"persons:{query}:{pagination.page_number}:{pagination.page_size}"
     adapter = TypeAdapter(list[Person])
-    if cached := await cache.get(key):
-        return adapter.validate_json(cached)
-
-    logger.debug("Persons search cache missed")
-    entities = await person_film_service.search(query, pagination.page_number or 1, pagination.page_size or 50)
-    persons = [_construct_person_films(person, films) for (person, films) in entities]
-    cached = adapter.dump_json(persons)
-    await cache.set(key, cached, 60 * 5)
-    response.headers["Cache-Control"] = f"max-age={60 * 5}"
+
+    async def load() -> bytes:
+        logger.debug("Persons search cache missed")
+        entities = await person_service.search(query, pagination.page_number or 1, pagination.page_size or 50)
+        return adapter.dump_json([_construct_person_films(person) for person in entities])
+
+    persons = adapter.validate_json(await response_cache.get_or_load(key, SEARCH_CACHE_POLICY, load))
+    response.headers["Cache-Control"] = SEARCH_CACHE_POLICY.cache_control
     return persons
 
 
@@ -54,12 +68,9 @@ async def search_persons(
     summary="Данные по персоне",
     description="Возвращает подробную информацию о персоне",
 )
-async def get_person(
-    person_id: UUID, person_film_service: PersonFilmService = Depends(get_person_film_service)
-) -> Person:
-    (person, films) = await person_film_service.get_person_with_films(person_id)
-    if person:
-        return _construct_person_films(person, films)
+async def get_person(person_id: UUID, person_service: PersonService = Depends(get_person_service)) -> Person:
+    if person := await person_service.get_by_id(person_id):
+        return _construct_person_films(person)
 
     raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
 
@@ -73,31 +84,26 @@ async def get_person(
 async def list_person_films(
     response: Response,
     person_id: UUID,
+    user_id: UUID | None = Query(None, description="User id from the access token"),
     film_service: FilmService = Depends(get_film_service),
-    cache: ICache = Depends(get_cache),
+    enrichment: FilmEnrichmentService = Depends(get_film_enrichment_service),
+    response_cache: StaleWhileRevalidateCache = Depends(get_response_cache),
 ) -> list[Film]:
     key = f"persons:{person_id}:films"
     adapter = TypeAdapter(list[Film])
-    if cached := await cache.get(key):
-        return adapter.validate_json(cached)
-
-    logger.debug(f"Person films cache missed {person_id}")
-    entities = await film_service.find_by_person(person_id)
-    films_list = [Film(**film.model_dump()) for film in entities]
-    cached = adapter.dump_json(films_list)
-    await cache.set(key, cached, 60 * 5)
-    response.headers["Cache-Control"] = f"max-age={60 * 5}"
-    return films_list
 
+    async def load() -> bytes:
+        logger.debug(f"Person films cache missed {person_id}")
+        entities = await film_service.find_by_person(person_id)
+        return adapter.dump_json([Film(**film.model_dump()) for film in entities])
 
-def _construct_person_films(person: PersonModel, films: list[FilmModel]) -> Person:
-    """Construct Person model with films"""
-    model = Person.model_validate(person)
-    model.films = [_extract_film_details(film, person.id) for film in films]
-    return model
+    films_list = adapter.validate_json(await response_cache.get_or_load(key, FILMS_CACHE_POLICY, load))
+    await enrichment.enrich(films_list, user_id)
+    response.headers["Cache-Control"] = FILMS_CACHE_POLICY.cache_control_for(personal=user_id is not None)
+    return films_list
 
 
-def _extract_film_details(film: FilmModel, person_id: UUID) -> PersonFilm:
-    all_roles = get_args(PERSON_ROLE)
-    roles = [role for role in all_roles if any(r.id == person_id for r in getattr(film, role))]
-    return PersonFilm(uuid=film.id, roles=roles)
+def _construct_person_films(person: PersonModel) -> Person:
+    """Construct Person model with films stored in the person document"""
+    films = [PersonFilm(uuid=film.id, roles=film.roles) for film in person.films]
+    return Person(id=person.id, full_name=person.full_name, films=films)
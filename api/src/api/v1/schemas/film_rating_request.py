@@ -0,0 +1,8 @@
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+
+class FilmRatingRequest(BaseModel):
+    film_id: UUID
+    rating: int | None = Field(None, ge=0, le=10, description="User rating 0..10, if None value will be removed")
@@ -3,7 +3,15 @@ from uuid import UUID
 from pydantic import BaseModel
 
 
+class GenreFilm(BaseModel):
+    uuid: UUID
+    title: str
+    imdb_rating: float | None = None
+
+
 class Genre(BaseModel):
     id: UUID
     name: str
     description: str | None = None
+    films_count: int = 0
+    top_films: list[GenreFilm] = []
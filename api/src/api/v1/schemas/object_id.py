@@ -0,0 +1,7 @@
+from bson import ObjectId
+
+
+def check_object_id(value: str) -> str:
+    if not ObjectId.is_valid(value):
+        raise ValueError("Invalid ObjectId")
+    return value
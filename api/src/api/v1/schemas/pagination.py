@@ -9,3 +9,20 @@ class PaginatedParams:
     ):
         self.page_number = page_number
         self.page_size = page_size
+
+
+NEXT_PAGE_TOKEN_HEADER = "X-Next-Page-Token"
+
+
+class CursorParams:
+    """Cursor pagination: the next page token comes back in the X-Next-Page-Token header"""
+
+    def __init__(
+        self,
+        cursor: bool = Query(
+            False, description=f"Use cursor pagination, next page token is in {NEXT_PAGE_TOKEN_HEADER}"
+        ),
+        page_token: str | None = Query(None, description=f"Opaque token from {NEXT_PAGE_TOKEN_HEADER}"),
+    ):
+        self.enabled = cursor or page_token is not None
+        self.page_token = page_token
@@ -0,0 +1,9 @@
+from typing import Annotated
+
+from pydantic import AfterValidator, BaseModel, Field
+from src.api.v1.schemas.object_id import check_object_id
+
+
+class ReviewReactionRequest(BaseModel):
+    review_id: Annotated[str, AfterValidator(check_object_id)]
+    like: bool | None = Field(None, description="User reaction, if None value will be removed")
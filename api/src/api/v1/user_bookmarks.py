@@ -6,6 +6,7 @@ from src.core.auth import AuthorizationProvider, TokenData
 from bson import ObjectId
 from fastapi import APIRouter, Depends
 from pydantic import AfterValidator
+from src.api.v1.schemas.object_id import check_object_id
 from src.services.user_pref import UserPrefService, get_user_pref_service
 
 router = APIRouter()
@@ -14,12 +15,6 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-def check_object_id(value: str) -> str:
-    if not ObjectId.is_valid(value):
-        raise ValueError("Invalid ObjectId")
-    return value
-
-
 @router.post("/")
 async def create_bookmark(
     film_id: UUID,
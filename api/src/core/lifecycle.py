@@ -1,11 +1,13 @@
+import asyncio
 import logging.config
 from contextlib import asynccontextmanager
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
+from pymongo.errors import PyMongoError
 from redis.asyncio import Redis
 from src.core.settings import ElasticsearchSettings, RedisSettings
-from src.db import elastic, redis
+from src.db import elastic, mogno, mongo_schema, redis
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +21,27 @@ async def lifespan(app: FastAPI):
     elastic_settings = ElasticsearchSettings()
     elastic.es = AsyncElasticsearch(hosts=[elastic_settings.url])
     redis_settings = RedisSettings()
-    redis.redis = Redis(host=redis_settings.host, port=redis_settings.port, decode_responses=True)
+    # Cached values are stored as compressed bytes, so responses are not decoded
+    redis.redis = Redis(host=redis_settings.host, port=redis_settings.port)
+    # Индексы создаются один раз при старте, а не при каждом обращении к коллекциям.
+    # В фоне, чтобы недоступная MongoDB не задерживала старт на время выбора сервера
+    mongo_indexes = asyncio.create_task(_ensure_mongo_indexes())
 
     yield
 
     logger.info("Закрываем соеденения.")
+    mongo_indexes.cancel()
+    redis.cache = None
+    redis.response_cache = None
     await redis.redis.close()
     await elastic.es.close()
+
+
+async def _ensure_mongo_indexes() -> None:
+    # Без MongoDB остальные эндпоинты продолжают работать
+    try:
+        await mongo_schema.ensure_indexes(mogno.get_mongo())
+    except KeyError as e:
+        logger.error("MongoDB не настроена (нет переменной %s), индексы не применены", e)
+    except PyMongoError:
+        logger.exception("Не удалось применить индексы MongoDB")
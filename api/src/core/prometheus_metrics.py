@@ -1,6 +1,6 @@
 from typing import Callable
 
-from prometheus_client import Counter
+from prometheus_client import Counter, Histogram
 from prometheus_fastapi_instrumentator.metrics import Info
 
 
@@ -31,3 +31,23 @@ movies_watch_amount = Counter(
     "Number of times a certain movie type has been watched.",
     labelnames=("type",),
 )
+
+
+cache_requests_total = Counter(
+    "api_cache_requests_total",
+    "Cache lookups by tier and result.",
+    labelnames=("tier", "result"),
+)
+
+cache_latency_seconds = Histogram(
+    "api_cache_latency_seconds",
+    "Cache operation latency by tier.",
+    labelnames=("tier", "operation"),
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+enrichment_degraded_total = Counter(
+    "api_enrichment_degraded_total",
+    "Film responses returned without an enrichment source due to its timeout or error.",
+    labelnames=("source", "reason"),
+)
@@ -10,6 +10,10 @@ class RedisSettings(BaseSettings):
 class ElasticsearchSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="ELASTIC_")
     url: str = ""
+    # How long a point in time of cursor pagination lives between page requests
+    pit_keep_alive: str = "1m"
+    # Signs cursor page tokens, must be the same for all API workers
+    page_token_secret: str = ""
 
 
 class FileapiSettings(BaseSettings):
@@ -37,3 +41,29 @@ class KeycloakSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="IDP_KEYCLOAK_")
     url: str = ""
     client: str = ""
+
+
+class SingleFlightSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="SINGLE_FLIGHT_")
+    # Seconds a coalesced result is reused after the call completes, 0 shares in-flight calls only
+    result_ttl: float = 0.0
+
+
+class CacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="CACHE_")
+    enabled: bool = True
+    # In-process tier in front of Redis
+    local_max_entries: int = 10_000
+    local_ttl_sec: float = 30
+    # Values larger than this are zlib-compressed in Redis
+    compress_min_bytes: int = 1024
+    # How often index versions bumped by the ETL are re-read from Redis
+    version_refresh_sec: float = 1.0
+
+
+class EnrichmentSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="ENRICHMENT_")
+    # Films are returned without the source's data if it doesn't answer in time
+    ratings_timeout_sec: float = 0.3
+    user_ratings_timeout_sec: float = 0.3
+    bookmarks_timeout_sec: float = 0.3
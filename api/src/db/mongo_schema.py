@@ -0,0 +1,123 @@
+"""
+Collections of user_pref_db and their indexes.
+
+Indexes are applied once at startup or with `python -m src.db.mongo_schema`,
+so services don't pay create_index round-trips on every call.
+"""
+
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from src.db.mogno import get_mongo
+
+USER_PREF_DB = "user_pref_db"
+
+MOVIE_RATINGS = "movie_likes"
+# Keyed by movie_id: {_id, count, sum}, average is sum / count
+MOVIE_RATING_AGGREGATES = "movie_rating_aggregates"
+MOVIE_REVIEWS = "movie_reviews"
+MOVIE_REVIEW_REACTIONS = "movie_review_reactions"
+USER_BOOKMARKS = "user_movie_bookmarks"
+
+# Compound indexes prefixed by user_id also serve lookups by user_id alone
+INDEXES: dict[str, list[IndexModel]] = {
+    MOVIE_RATINGS: [
+        IndexModel([("user_id", ASCENDING), ("movie_id", ASCENDING)], unique=True),
+        IndexModel([("movie_id", ASCENDING)]),
+    ],
+    MOVIE_REVIEWS: [
+        IndexModel([("user_id", ASCENDING), ("movie_id", ASCENDING)], unique=True),
+        # Film's reviews page in listing order, also serves lookups by movie_id alone
+        IndexModel([("movie_id", ASCENDING), ("likes", DESCENDING), ("dislikes", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    MOVIE_REVIEW_REACTIONS: [
+        IndexModel([("user_id", ASCENDING), ("review_id", ASCENDING)], unique=True),
+        IndexModel([("review_id", ASCENDING)]),
+    ],
+    USER_BOOKMARKS: [
+        IndexModel([("user_id", ASCENDING), ("movie_id", ASCENDING)], unique=True),
+        IndexModel([("movie_id", ASCENDING)]),
+    ],
+}
+
+# Keeps delete_many filters well below the document size limit
+DELETE_CHUNK_SIZE = 10_000
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_indexes(mongo: AsyncIOMotorClient) -> bool:
+    """
+    Create declared indexes, existing ones are left as is.
+    Each index is built separately: one that can't be built (e.g. duplicates break a unique index,
+    or an index with the same name has other options) is logged and skipped,
+    so it doesn't stop the others. Returns False if any index failed.
+    """
+    db = mongo.get_database(USER_PREF_DB)
+    applied = True
+    for name, indexes in INDEXES.items():
+        collection = db.get_collection(name)
+        for index in indexes:
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                logger.error(
+                    "Failed to create index %s of %s.%s, run migrate to remove duplicates: %s",
+                    index.document["name"],
+                    USER_PREF_DB,
+                    name,
+                    e.details or e,
+                )
+                applied = False
+
+    return applied
+
+
+async def remove_duplicates(mongo: AsyncIOMotorClient) -> int:
+    """
+    Delete documents that break declared unique indexes, the newest document of each key is kept.
+    Counters derived from the deleted documents have to be rebuilt afterwards.
+    """
+    db = mongo.get_database(USER_PREF_DB)
+    removed = 0
+    for name, indexes in INDEXES.items():
+        collection = db.get_collection(name)
+        for index in indexes:
+            if not index.document.get("unique"):
+                continue
+
+            fields = list(index.document["key"])
+            pipeline = [
+                {"$sort": {"_id": -1}},
+                {"$group": {"_id": {f: f"${f}" for f in fields}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": 1}}},
+            ]
+            duplicates = await collection.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+            stale = [id for group in duplicates for id in group["ids"][1:]]
+            for chunk in range(0, len(stale), DELETE_CHUNK_SIZE):
+                result = await collection.delete_many({"_id": {"$in": stale[chunk:chunk + DELETE_CHUNK_SIZE]}})
+                removed += result.deleted_count
+            if stale:
+                logger.warning("Removed %d duplicates of %s from %s.%s", len(stale), fields, USER_PREF_DB, name)
+
+    return removed
+
+
+async def migrate() -> None:
+    """
+    Remove duplicates and build the indexes.
+    Run `python -m src.maintenance rebuild-ratings` and `rebuild-review-counters` if anything was removed.
+    """
+    mongo = get_mongo()
+    if await remove_duplicates(mongo):
+        logger.warning("Duplicates were removed, rebuild ratings and review counters")
+    if not await ensure_indexes(mongo):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(migrate())
@@ -1,9 +1,16 @@
 from redis.asyncio import Redis
+from src.core.settings import CacheSettings
+from src.services.cache.local_storage import LocalCache
 from src.services.cache.none_storage import NoneCache
 from src.services.cache.redis_storage import RedisCache
 from src.services.cache.storage import ICache
+from src.services.cache.swr import StaleWhileRevalidateCache
+from src.services.cache.tiered_storage import TieredCache
+from src.services.cache.versions import IndexVersions
 
 redis: Redis | None = None
+cache: ICache | None = None
+response_cache: StaleWhileRevalidateCache | None = None
 
 
 def get_redis() -> Redis:
@@ -15,11 +22,27 @@ def get_redis() -> Redis:
 
 
 def get_cache() -> ICache:
-    # In future we can move it to different location
-    # but as we don't have any other implementations
-    # of the cache provider let's keep it here.
-    global redis
-    if True or redis is None:
+    # The local tier must be shared between requests, so the cache is built once per worker
+    global cache
+    if cache is not None:
+        return cache
+
+    settings = CacheSettings()
+    if redis is None or not settings.enabled:
         return NoneCache()
 
-    return RedisCache(redis)
+    cache = TieredCache(
+        LocalCache(settings.local_max_entries, settings.local_ttl_sec),
+        RedisCache(redis, settings.compress_min_bytes),
+        IndexVersions(redis, settings.version_refresh_sec),
+    )
+    return cache
+
+
+def get_response_cache() -> StaleWhileRevalidateCache:
+    # Background refreshes are tracked per worker, so the wrapper is shared too
+    global response_cache
+    if response_cache is None:
+        response_cache = StaleWhileRevalidateCache(get_cache())
+
+    return response_cache
@@ -0,0 +1,37 @@
+"""
+Operator commands for user_pref_db, not exposed over HTTP:
+
+    python -m src.maintenance rebuild-ratings
+    python -m src.maintenance rebuild-review-counters
+"""
+
+import argparse
+import asyncio
+import logging
+
+from src.db.mogno import get_mongo
+from src.services.user_pref import UserPrefService
+
+
+async def rebuild_ratings() -> None:
+    """Recompute films rating aggregates from all votes"""
+    await UserPrefService(get_mongo()).rebuild_rating_aggregates()
+
+
+async def rebuild_review_counters() -> None:
+    """Recompute reviews likes and dislikes from all reactions"""
+    await UserPrefService(get_mongo()).rebuild_review_counters()
+
+
+COMMANDS = {
+    "rebuild-ratings": rebuild_ratings,
+    "rebuild-review-counters": rebuild_review_counters,
+}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="user_pref_db maintenance")
+    parser.add_argument("command", choices=COMMANDS)
+    args = parser.parse_args()
+    asyncio.run(COMMANDS[args.command]())
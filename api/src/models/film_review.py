@@ -10,5 +10,5 @@ class FilmReview(BaseOrjsonModel):
     user_id: UUID
     movie_id: UUID
     created_at: datetime
-    likes: int
-    dislikes: int
+    likes: int = 0
+    dislikes: int = 0
@@ -3,7 +3,15 @@ from uuid import UUID
 from src.models.uitls import BaseOrjsonModel
 
 
+class GenreFilm(BaseOrjsonModel):
+    id: UUID
+    title: str
+    imdb_rating: float | None = None
+
+
 class Genre(BaseOrjsonModel):
     id: UUID
     name: str
     description: str | None = None
+    films_count: int = 0
+    top_films: list[GenreFilm] = []
@@ -3,6 +3,12 @@ from uuid import UUID
 from src.models.uitls import BaseOrjsonModel
 
 
+class PersonFilm(BaseOrjsonModel):
+    id: UUID
+    roles: list[str]
+
+
 class Person(BaseOrjsonModel):
     id: UUID
     full_name: str
+    films: list[PersonFilm] = []
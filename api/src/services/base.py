@@ -1,18 +1,48 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import math
+import secrets
 from abc import ABC
-from typing import Any, Literal, cast
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Generic, Literal, TypeVar, cast
 from uuid import UUID
 
-from elasticsearch import AsyncElasticsearch, NotFoundError
+import orjson
+from elasticsearch import AsyncElasticsearch, NotFoundError, RequestError
 from opentelemetry import trace
+from src.core.settings import ElasticsearchSettings
 
 INDICES = Literal["movies", "persons", "genres"]
 
+T = TypeVar("T")
+
 tracer = trace.get_tracer(__name__)
 
+# Sort value of a document missing a numeric sort field is +-Infinity, which JSON can't carry.
+# ES parses numeric search_after values from strings, so the sentinel round-trips as is
+MISSING_SORT_VALUES = {math.inf: "Infinity", -math.inf: "-Infinity"}
+
+
+class PageTokenError(ValueError):
+    """Page token is malformed, was issued for another query or its point in time has expired"""
+
+
+@dataclass
+class Page(Generic[T]):
+    items: list[T]
+    next_page_token: str | None = None
+
 
 class ServiceABC(ABC):
     def __init__(self, elastic: AsyncElasticsearch):
         self.elastic = elastic
+        settings = ElasticsearchSettings()
+        self.pit_keep_alive = settings.pit_keep_alive
+        self.page_token_key = _page_token_key(settings.page_token_secret)
 
     async def _get_from_elastic(self, index: INDICES, id: UUID) -> dict | None:
         try:
@@ -27,12 +57,148 @@ class ServiceABC(ABC):
         return [doc["_source"] for doc in cast(dict, data)["docs"]]
 
     async def _query_from_elastic(
-        self, index: INDICES, query: dict, size: int = 1000, skip: int = 0, sort: dict[str, int] | None = None
+        self,
+        index: INDICES,
+        query: dict,
+        size: int = 1000,
+        skip: int = 0,
+        sort: dict[str, int] | None = None,
+        request_cache: bool = False,
     ) -> list[Any]:
+        """
+        request_cache enables the shard request cache for requests returning hits,
+        by default ES caches only size=0 requests. Use it for pure filter queries,
+        entries are invalidated on every index refresh.
+        """
         body = {"query": query, "size": size, "from": skip}
         if sort:
-            body["sort"] = {key: {"order": "asc" if value > 0 else "desc"} for (key, value) in sort.items()}
+            body["sort"] = _sort_clause(sort)
+        params = {"request_cache": "true"} if request_cache else None
         with tracer.start_as_current_span("elasticsearch-request"):
-            data = await self.elastic.search(index=index, body=body)
+            data = await self.elastic.search(index=index, body=body, params=params)
             docs = cast(dict, data)["hits"]["hits"]
             return [doc["_source"] for doc in docs]
+
+    async def _page_from_elastic(
+        self,
+        index: INDICES,
+        query: dict,
+        size: int,
+        page_token: str | None = None,
+        sort: dict[str, int] | None = None,
+    ) -> Page[dict]:
+        """
+        Cursor pagination with search_after inside a point in time.
+        Every page costs the same as the first one, unlike from/size which makes
+        each shard collect from + size hits and stops at the max result window.
+        """
+        # _shard_doc is the cheapest unique tiebreaker within a point in time
+        sort_clause = [*(_sort_clause(sort) or [{"_score": "desc"}]), {"_shard_doc": "asc"}]
+        # Token is bound to the query, so it can't be replayed against another search
+        fingerprint = hashlib.sha1(orjson.dumps([index, query, sort_clause], option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+        search_after = None
+        if page_token:
+            pit_id, search_after = _decode_page_token(page_token, fingerprint, self.page_token_key)
+            if len(search_after) != len(sort_clause):
+                raise PageTokenError("page token was issued for another query")
+        else:
+            pit_id = await self._open_point_in_time(index)
+
+        body: dict = {
+            "query": query,
+            "size": size,
+            "sort": sort_clause,
+            "pit": {"id": pit_id, "keep_alive": self.pit_keep_alive},
+            "track_total_hits": False,
+        }
+        if search_after is not None:
+            body["search_after"] = search_after
+
+        with tracer.start_as_current_span("elasticsearch-request"):
+            try:
+                # Search within a point in time must not name the index
+                data = cast(dict, await self.elastic.search(body=body))
+            except (NotFoundError, RequestError) as e:
+                if page_token:
+                    raise PageTokenError("page token has expired") from e
+                raise
+
+        hits = data["hits"]["hits"]
+        # Point in time id can change between requests, the latest one must be used
+        pit_id = data.get("pit_id", pit_id)
+        if len(hits) < size:
+            await self._close_point_in_time(pit_id)
+            return Page([hit["_source"] for hit in hits])
+
+        next_token = _encode_page_token(pit_id, hits[-1]["sort"], fingerprint, self.page_token_key)
+        return Page([hit["_source"] for hit in hits], next_token)
+
+    async def _open_point_in_time(self, index: INDICES) -> str:
+        # elasticsearch-py 7.9 has no point in time API yet
+        data = await self.elastic.transport.perform_request(
+            "POST", f"/{index}/_pit", params={"keep_alive": self.pit_keep_alive}
+        )
+        return cast(dict, data)["id"]
+
+    async def _close_point_in_time(self, pit_id: str) -> None:
+        try:
+            await self.elastic.transport.perform_request("DELETE", "/_pit", body={"id": pit_id})
+        except NotFoundError:
+            pass
+
+
+def _sort_clause(sort: dict[str, int] | None) -> list[dict]:
+    if not sort:
+        return []
+    return [{key: {"order": "asc" if value > 0 else "desc"}} for (key, value) in sort.items()]
+
+
+@lru_cache()
+def _page_token_key(secret: str) -> bytes:
+    if secret:
+        return secret.encode()
+    # Tokens signed by one process are rejected by the others, so the secret must be set for several workers
+    logging.getLogger(__name__).warning("ELASTIC_PAGE_TOKEN_SECRET is not set, page tokens are signed per process")
+    return secrets.token_bytes(32)
+
+
+def _sign(payload: bytes, key: bytes) -> bytes:
+    return hmac.new(key, payload, hashlib.sha256).digest()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _encode_page_token(pit_id: str, search_after: list, fingerprint: str, key: bytes) -> str:
+    """Signed, so clients can't forge a point in time or sort values"""
+    after = [MISSING_SORT_VALUES.get(v, v) if isinstance(v, float) else v for v in search_after]
+    payload = orjson.dumps({"pit": pit_id, "after": after, "query": fingerprint})
+    return f"{_b64encode(payload)}.{_b64encode(_sign(payload, key))}"
+
+
+def _decode_page_token(page_token: str, fingerprint: str, key: bytes) -> tuple[str, list]:
+    try:
+        encoded_payload, encoded_signature = page_token.split(".")
+        payload, signature = _b64decode(encoded_payload), _b64decode(encoded_signature)
+    except (binascii.Error, ValueError) as e:
+        raise PageTokenError("page token is malformed") from e
+    if not hmac.compare_digest(signature, _sign(payload, key)):
+        raise PageTokenError("page token signature is invalid")
+
+    try:
+        data = orjson.loads(payload)
+        pit_id, search_after, query = data["pit"], data["after"], data["query"]
+    except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+        raise PageTokenError("page token is malformed") from e
+
+    if query != fingerprint:
+        raise PageTokenError("page token was issued for another query")
+    if not isinstance(pit_id, str) or not isinstance(search_after, list):
+        raise PageTokenError("page token is malformed")
+    return pit_id, search_after
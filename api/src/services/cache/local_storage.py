@@ -0,0 +1,38 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+from .storage import ICache
+
+
+class LocalCache(ICache):
+    """
+    Bounded in-process LRU cache with TTL.
+    Lives in a single worker, so entries are kept short to limit staleness between workers.
+    """
+
+    def __init__(self, max_entries: int, ttl_sec: float):
+        self._max_entries = max_entries
+        self._ttl_sec = ttl_sec
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def set(self, key: str, value: Any, timeout_sec: int) -> None:
+        self._entries[key] = (time.monotonic() + min(timeout_sec, self._ttl_sec), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Any:
+        if (entry := self._entries.get(key)) is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._entries)
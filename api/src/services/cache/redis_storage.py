@@ -1,3 +1,4 @@
+import zlib
 from typing import Any
 
 from opentelemetry import trace
@@ -7,15 +8,36 @@ from .storage import ICache
 
 tracer = trace.get_tracer(__name__)
 
+# First byte of a stored value tells whether the rest is compressed
+RAW = b"r"
+COMPRESSED = b"z"
+
 
 class RedisCache(ICache):
-    def __init__(self, client: Redis):
+    def __init__(self, client: Redis, compress_min_bytes: int = 1024):
         self._client = client
+        self._compress_min_bytes = compress_min_bytes
 
     async def set(self, key: str, value: Any, timeout_sec: int) -> None:
         with tracer.start_as_current_span("redis-request"):
-            await self._client.set(key, value, timeout_sec)
+            await self._client.set(key, self._dumps(value), timeout_sec)
 
     async def get(self, key: str) -> Any:
         with tracer.start_as_current_span("redis-request"):
-            return await self._client.get(key)
+            value = await self._client.get(key)
+        return self._loads(value) if value is not None else None
+
+    def _dumps(self, value: Any) -> bytes:
+        data = value.encode() if isinstance(value, str) else bytes(value)
+        if len(data) >= self._compress_min_bytes:
+            # JSON lists of films compress several times even on the fastest level
+            return COMPRESSED + zlib.compress(data, 1)
+        return RAW + data
+
+    @staticmethod
+    def _loads(value: bytes) -> bytes:
+        if value[:1] == COMPRESSED:
+            return zlib.decompress(value[1:])
+        if value[:1] == RAW:
+            return value[1:]
+        return value
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import math
+import random
+import struct
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from src.core.prometheus_metrics import cache_requests_total
+from src.services.single_flight import SingleFlight
+
+from .storage import ICache
+
+# fresh_until (unix time) and how long the value took to compute, seconds
+ENVELOPE = struct.Struct(">dd")
+
+PRIVATE_CACHE_CONTROL = "private, no-store"
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    # Seconds the value is served as fresh
+    ttl: int
+    # Seconds after ttl the value is still served while it is refreshed in background
+    stale_ttl: int = 0
+    # XFetch aggressiveness: >1 refreshes earlier, 0 disables early refresh
+    beta: float = 1.0
+
+    @property
+    def cache_control(self) -> str:
+        if self.stale_ttl:
+            return f"max-age={self.ttl}, stale-while-revalidate={self.stale_ttl}"
+        return f"max-age={self.ttl}"
+
+    def cache_control_for(self, personal: bool) -> str:
+        """Responses carrying a user's own data must not be stored by shared caches and CDNs"""
+        return PRIVATE_CACHE_CONTROL if personal else self.cache_control
+
+
+class StaleWhileRevalidateCache:
+    """
+    Serves cached values past their ttl while a background task refreshes them,
+    so requests don't all miss together when a hot key expires.
+    Before the ttl a value may also be refreshed early with probability growing towards
+    the expiry and with the time the value takes to compute (XFetch).
+    Only a missing or fully expired value is loaded in the request, coalesced per key.
+    """
+
+    def __init__(self, cache: ICache):
+        self._cache = cache
+        self._loads: SingleFlight[bytes] = SingleFlight()
+        # Keep references to background refreshes, otherwise they can be garbage collected mid-flight
+        self._refreshes: dict[str, asyncio.Task] = {}
+        self._logger = logging.getLogger(__name__)
+
+    async def get_or_load(self, key: str, policy: CachePolicy, load: Callable[[], Awaitable[bytes]]) -> bytes:
+        if (cached := await self._cache.get(key)) is not None:
+            fresh_until, delta = ENVELOPE.unpack_from(cached)
+            value = bytes(cached[ENVELOPE.size:])
+            now = time.time()
+            if now < fresh_until - delta * policy.beta * -math.log(1.0 - random.random()):
+                cache_requests_total.labels(tier="swr", result="fresh").inc()
+                return value
+
+            cache_requests_total.labels(tier="swr", result="stale" if now >= fresh_until else "early").inc()
+            self._refresh(key, policy, load)
+            return value
+
+        cache_requests_total.labels(tier="swr", result="miss").inc()
+        return await self._loads.do(key, lambda: self._load(key, policy, load))
+
+    def _refresh(self, key: str, policy: CachePolicy, load: Callable[[], Awaitable[bytes]]) -> None:
+        if key in self._refreshes:
+            return
+
+        task = asyncio.create_task(self._load(key, policy, load))
+        self._refreshes[key] = task
+        task.add_done_callback(lambda done: self._refreshed(key, done))
+
+    def _refreshed(self, key: str, task: asyncio.Task) -> None:
+        del self._refreshes[key]
+        if not task.cancelled() and (error := task.exception()) is not None:
+            # Stale value keeps being served until the next attempt
+            self._logger.warning("Background refresh of %s failed: %s", key, error)
+
+    async def _load(self, key: str, policy: CachePolicy, load: Callable[[], Awaitable[bytes]]) -> bytes:
+        start = time.time()
+        value = await load()
+        now = time.time()
+        envelope = ENVELOPE.pack(now + policy.ttl, now - start)
+        await self._cache.set(key, envelope + value, policy.ttl + policy.stale_ttl)
+        return value
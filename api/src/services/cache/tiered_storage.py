@@ -0,0 +1,85 @@
+import logging
+import time
+from typing import Any
+
+from redis.exceptions import RedisError
+from src.core.prometheus_metrics import cache_latency_seconds, cache_requests_total
+
+from .local_storage import LocalCache
+from .redis_storage import RedisCache
+from .storage import ICache
+from .versions import IndexVersions
+
+# Indices the cached responses of each key namespace are built from
+KEY_INDICES: dict[str, tuple[str, ...]] = {
+    "films": ("movies",),
+    # Person search reads persons, person films read movies
+    "persons": ("persons", "movies"),
+    "genres": ("genres",),
+}
+
+
+class TieredCache(ICache):
+    """
+    In-process LRU in front of Redis. Keys are suffixed with the versions of the indices
+    their namespace depends on, so an ETL load invalidates both tiers at once.
+    Redis failures degrade to the local tier instead of failing the request.
+    """
+
+    def __init__(self, local: LocalCache, remote: RedisCache, versions: IndexVersions):
+        self._local = local
+        self._remote = remote
+        self._versions = versions
+        self._logger = logging.getLogger(__name__)
+
+    async def set(self, key: str, value: Any, timeout_sec: int) -> None:
+        if (versioned := await self._versioned(key)) is None:
+            return
+        await self._local.set(versioned, value, timeout_sec)
+        start = time.perf_counter()
+        try:
+            await self._remote.set(versioned, value, timeout_sec)
+        except RedisError as e:
+            self._logger.warning("Cache write failed: %s", e)
+        cache_latency_seconds.labels(tier="redis", operation="set").observe(time.perf_counter() - start)
+
+    async def get(self, key: str) -> Any:
+        if (versioned := await self._versioned(key)) is None:
+            cache_requests_total.labels(tier="local", result="miss").inc()
+            return None
+
+        start = time.perf_counter()
+        value = await self._local.get(versioned)
+        cache_latency_seconds.labels(tier="local", operation="get").observe(time.perf_counter() - start)
+        if value is not None:
+            cache_requests_total.labels(tier="local", result="hit").inc()
+            return value
+        cache_requests_total.labels(tier="local", result="miss").inc()
+
+        start = time.perf_counter()
+        try:
+            value = await self._remote.get(versioned)
+        except RedisError as e:
+            self._logger.warning("Cache read failed: %s", e)
+            value = None
+        cache_latency_seconds.labels(tier="redis", operation="get").observe(time.perf_counter() - start)
+        if value is None:
+            cache_requests_total.labels(tier="redis", result="miss").inc()
+            return None
+
+        cache_requests_total.labels(tier="redis", result="hit").inc()
+        # Redis doesn't tell the remaining TTL here, the local tier bounds it by its own TTL anyway
+        await self._local.set(versioned, value, int(1e9))
+        return value
+
+    async def _versioned(self, key: str) -> str | None:
+        """Key with index versions, None when the versions are unknown and caching must be skipped"""
+        indices = KEY_INDICES.get(key.split(":", 1)[0])
+        if not indices:
+            return key
+        try:
+            versions = await self._versions.get(indices)
+        except RedisError as e:
+            self._logger.warning("Cache versions read failed: %s", e)
+            return None
+        return f"{key}@{'.'.join(map(str, versions))}"
@@ -0,0 +1,32 @@
+import time
+
+from redis.asyncio import Redis
+
+# Same key the ETL increments after loading documents into an index
+VERSION_KEY = "cache_version:{index}"
+
+
+class IndexVersions:
+    """
+    Versions of the Elasticsearch indices the cached responses were built from.
+    The ETL increments an index version after every load, so keys built with the
+    current versions stop matching older entries, which then just expire.
+    Versions are re-read from Redis at most once per refresh interval.
+    """
+
+    def __init__(self, client: Redis, refresh_sec: float):
+        self._client = client
+        self._refresh_sec = refresh_sec
+        self._versions: dict[str, int] = {}
+        self._read_at = 0.0
+
+    async def get(self, indices: tuple[str, ...]) -> tuple[int, ...]:
+        if time.monotonic() - self._read_at >= self._refresh_sec or any(i not in self._versions for i in indices):
+            await self._refresh(indices)
+        return tuple(self._versions[index] for index in indices)
+
+    async def _refresh(self, indices: tuple[str, ...]) -> None:
+        names = tuple({*self._versions, *indices})
+        values = await self._client.mget([VERSION_KEY.format(index=index) for index in names])
+        self._versions = {name: int(value or 0) for name, value in zip(names, values)}
+        self._read_at = time.monotonic()
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Awaitable, Iterable, TypeVar
+from uuid import UUID
+
+from fastapi import Depends
+from pymongo.errors import PyMongoError
+from src.api.v1.schemas.film import Film
+from src.core.prometheus_metrics import enrichment_degraded_total
+from src.core.settings import EnrichmentSettings
+from src.models.film_user_rating import FilmUserRating
+from src.services.user_pref import UserPrefService, get_user_pref_service
+
+T = TypeVar("T")
+
+
+@dataclass
+class FilmEnrichment:
+    ratings: dict[UUID, FilmUserRating] = field(default_factory=dict)
+    user_ratings: dict[UUID, int] = field(default_factory=dict)
+    bookmarked: set[UUID] = field(default_factory=set)
+
+    def apply(self, films: Iterable[Film]) -> None:
+        for film in films:
+            if film_rating := self.ratings.get(film.id):
+                film.user_rating = film_rating.rating
+                film.user_count = film_rating.count
+            if (user_rating := self.user_ratings.get(film.id)) is not None:
+                film.my_rating = user_rating
+            film.is_bookmarked = film.id in self.bookmarked
+
+
+class FilmEnrichmentService:
+    """
+    Adds users' ratings, the user's own rating and bookmarks to films.
+    Sources are queried concurrently, each with its own timeout: a slow or failing
+    source only leaves its fields at defaults instead of stalling the response.
+    """
+
+    def __init__(self, user_pref: UserPrefService, settings: EnrichmentSettings):
+        self._user_pref = user_pref
+        self._settings = settings
+        self._logger = logging.getLogger(__name__)
+
+    async def enrich(self, films: list[Film], user_id: UUID | None) -> None:
+        if films:
+            (await self.fetch([film.id for film in films], user_id)).apply(films)
+
+    async def fetch(self, film_ids: list[UUID], user_id: UUID | None) -> FilmEnrichment:
+        """Can be started before the films are loaded when their ids are already known"""
+        settings = self._settings
+        ratings, user_ratings, bookmarks = await asyncio.gather(
+            self._source("ratings", self._user_pref.count_films_rating(film_ids), settings.ratings_timeout_sec),
+            (
+                self._source(
+                    "user_ratings",
+                    self._user_pref.list_user_ratings(user_id, film_ids),
+                    settings.user_ratings_timeout_sec,
+                )
+                if user_id
+                else _skipped()
+            ),
+            (
+                self._source(
+                    "bookmarks", self._user_pref.list_user_bookmarks(user_id, film_ids), settings.bookmarks_timeout_sec
+                )
+                if user_id
+                else _skipped()
+            ),
+        )
+        return FilmEnrichment(
+            ratings={rating.id: rating for rating in ratings or []},
+            user_ratings=user_ratings or {},
+            bookmarked={bookmark.movie_id for bookmark in bookmarks or []},
+        )
+
+    async def _source(self, name: str, call: Awaitable[T], timeout: float) -> T | None:
+        try:
+            return await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            enrichment_degraded_total.labels(source=name, reason="timeout").inc()
+            self._logger.warning("Films %s didn't answer in %.2f sec, skipped", name, timeout)
+        except PyMongoError as e:
+            enrichment_degraded_total.labels(source=name, reason="error").inc()
+            self._logger.warning("Films %s failed, skipped: %s", name, e)
+        return None
+
+
+async def _skipped() -> None:
+    return None
+
+
+@lru_cache()
+def get_film_enrichment_service(
+    user_pref: UserPrefService = Depends(get_user_pref_service),
+) -> FilmEnrichmentService:
+    return FilmEnrichmentService(user_pref, EnrichmentSettings())
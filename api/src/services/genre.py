@@ -5,6 +5,7 @@ from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 from src.db.elastic import get_elastic
 from src.models.genre import Genre
+from src.services import queries
 from src.services.base import ServiceABC
 
 CACHE_EXPIRE_IN_SECONDS = 60 * 5
@@ -18,7 +19,7 @@ class GenreService(ServiceABC):
         """
         Get all available genres
         """
-        docs = await self._query_from_elastic("genres", {"match_all": {}})
+        docs = await self._query_from_elastic("genres", queries.match_all(), request_cache=True)
         return [Genre(**doc) for doc in docs]
 
     async def get_by_id(self, genre_id: UUID) -> Genre | None:
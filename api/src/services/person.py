@@ -3,26 +3,37 @@ from uuid import UUID
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
+from src.core.settings import SingleFlightSettings
 from src.db.elastic import get_elastic
 from src.models.person import Person
-from src.services.base import ServiceABC
+from src.services import queries
+from src.services.base import Page, ServiceABC
+from src.services.single_flight import SingleFlight
 
 
 class PersonService(ServiceABC):
     def __init__(self, elastic: AsyncElasticsearch):
         super().__init__(elastic)
+        self._by_id: SingleFlight[Person | None] = SingleFlight(SingleFlightSettings().result_ttl)
 
     async def get_by_id(self, person_id: UUID) -> Person | None:
+        return await self._by_id.do(person_id, lambda: self._get_by_id(person_id))
+
+    async def _get_by_id(self, person_id: UUID) -> Person | None:
         if doc := await self._get_from_elastic("persons", person_id):
             return Person(**doc)
 
         return None
 
     async def search(self, search: str, page_number: int = 1, page_size: int = 50) -> list[Person]:
-        query = {"bool": {"must": [{"match": {"full_name": search}}]}}
+        query = queries.person_name_search(search)
         entities = await self._query_from_elastic("persons", query, page_size, (page_number - 1) * page_size)
         return [Person(**doc) for doc in entities]
 
+    async def search_page(self, search: str, page_size: int = 50, page_token: str | None = None) -> Page[Person]:
+        page = await self._page_from_elastic("persons", queries.person_name_search(search), page_size, page_token)
+        return Page([Person(**doc) for doc in page.items], page.next_page_token)
+
 
 @lru_cache()
 def get_person_service(
@@ -0,0 +1,57 @@
+"""
+Elasticsearch query builders for the services.
+
+Pure filters (genre, person) are built in filter context, so ES skips scoring
+and can cache the filter bitsets, while full-text searches stay scoring.
+Built queries are cached by their arguments: repeated requests reuse the same
+dict and produce byte-identical bodies, which is also what the shard request
+cache keys on. Returned queries are shared, callers must not mutate them.
+"""
+
+from functools import lru_cache
+from typing import Literal, get_args
+
+PERSON_ROLE = Literal["directors", "actors", "writers"]
+
+QUERY_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=1)
+def match_all() -> dict:
+    return {"match_all": {}}
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def film_title_search(text: str) -> dict:
+    """Scoring fuzzy search by film title"""
+    return {"match": {"title": {"query": text, "fuzziness": "AUTO"}}}
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def person_name_search(text: str) -> dict:
+    """Scoring search by person full name"""
+    return {"match": {"full_name": text}}
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def films_by_genre(genre_id: str | None) -> dict:
+    """Non-scoring filter of films by genre, all films if genre is not set"""
+    if genre_id is None:
+        return match_all()
+    return _filter(_nested_term("genres", genre_id))
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def films_by_person(person_id: str) -> dict:
+    """Non-scoring filter of films where the person has any role"""
+    roles = [_nested_term(role, person_id) for role in get_args(PERSON_ROLE)]
+    return _filter({"bool": {"should": roles, "minimum_should_match": 1}})
+
+
+def _filter(*clauses: dict) -> dict:
+    return {"bool": {"filter": list(clauses)}}
+
+
+def _nested_term(path: str, id: str) -> dict:
+    # Ids are keywords, so exact term lookup instead of analyzed match
+    return {"nested": {"path": path, "query": {"term": {f"{path}.id": id}}}}
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces concurrent identical calls: the first caller for a key starts the call,
+    everyone else arriving while it is in flight awaits the same task.
+    With result_ttl > 0 the result is also reused for that many seconds after it completes.
+
+    The call runs in its own task, so a cancelled caller (client disconnect) doesn't fail
+    the others waiting on it. Results are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, result_ttl: float = 0.0, max_results: int = 10_000):
+        self._result_ttl = result_ttl
+        self._max_results = max_results
+        self._calls: dict[Hashable, asyncio.Task[T]] = {}
+        self._results: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        if self._result_ttl > 0 and (cached := self._results.get(key)):
+            expires_at, result = cached
+            if expires_at > time.monotonic():
+                return result
+            del self._results[key]
+
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._complete(key, done))
+
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _complete(self, key: Hashable, task: asyncio.Task[T]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # exception() also marks the error as retrieved when every caller was cancelled
+        if task.cancelled() or task.exception() is not None or self._result_ttl <= 0:
+            return
+
+        self._results[key] = (time.monotonic() + self._result_ttl, task.result())
+        self._results.move_to_end(key)
+        while len(self._results) > self._max_results:
+            self._results.popitem(last=False)
@@ -8,18 +8,32 @@ from uuid import UUID, uuid4
 
 from bson import ObjectId
 from fastapi import Depends
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
-from pymongo import InsertOne
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from src.core.settings import SingleFlightSettings
+from src.db import mongo_schema
 from src.db.mogno import get_mongo
 from src.models.film_bookmark import FilmBookmark
 from src.models.film_review import FilmReview
 from src.models.film_user_rating import FilmUserRating
+from src.services.single_flight import SingleFlight
+
+# Max number of writes accepted by batch methods in one call
+MAX_BATCH_SIZE = 1000
 
 
 class UserPrefService:
     def __init__(self, mongo: AsyncIOMotorClient):
         self._mongo = mongo
+        # Handles are plain references, indexes are created once by mongo_schema.ensure_indexes
+        db = mongo.get_database(mongo_schema.USER_PREF_DB)
+        self._movie_ratings = db.get_collection(mongo_schema.MOVIE_RATINGS)
+        self._movie_rating_aggregates = db.get_collection(mongo_schema.MOVIE_RATING_AGGREGATES)
+        self._movie_reviews = db.get_collection(mongo_schema.MOVIE_REVIEWS)
+        self._movie_review_reactions = db.get_collection(mongo_schema.MOVIE_REVIEW_REACTIONS)
+        self._user_bookmarks = db.get_collection(mongo_schema.USER_BOOKMARKS)
         self._logger = logging.getLogger(__name__)
+        self._films_rating: SingleFlight[list[FilmUserRating]] = SingleFlight(SingleFlightSettings().result_ttl)
 
     async def populate_ratings(self, films: list[UUID]) -> None:
         """
@@ -39,29 +53,59 @@ class UserPrefService:
             ]
 
             if len(batch) >= 10_000:
-                collection = await self._get_movie_ratings_collection()
+                collection = self._movie_ratings
                 await collection.bulk_write(requests=batch, ordered=False)
                 self._logger.info("Populated 10K in %.2f sec", time.perf_counter() - start_batch)
                 batch = []
                 start_batch = time.perf_counter()
 
         self._logger.info("Populated in %.2f sec", time.perf_counter() - start)
+        await self.rebuild_rating_aggregates()
 
     async def count_films_rating(self, film_ids: list[UUID]) -> list[FilmUserRating]:
         """
-        Compute average users' films rating and number of votes.
+        Average users' films rating and number of votes, read from the maintained aggregates.
+        Concurrent requests for the same set of films share one lookup.
+        """
+        key = frozenset(str(id) for id in film_ids)
+        return await self._films_rating.do(key, lambda: self._count_films_rating(film_ids))
+
+    async def _count_films_rating(self, film_ids: list[UUID]) -> list[FilmUserRating]:
+        # Point lookup of maintained per-film aggregates, doesn't depend on the number of votes
+        collection = self._movie_rating_aggregates
+        find = {"_id": {"$in": [str(id) for id in film_ids]}, "count": {"$gt": 0}}
+        found = await collection.find(find).to_list(length=len(film_ids))
+        return [FilmUserRating(id=e["_id"], rating=e["sum"] / e["count"], count=e["count"]) for e in found]
+
+    async def rebuild_rating_aggregates(self) -> int:
+        """
+        Recompute per-film aggregates from all ratings.
+        Repairs drift if a process died between a rating write and its aggregate update,
+        and fills aggregates for ratings written in bulk. Votes written while it runs
+        may be lost from the aggregates, so it is meant to run off-peak.
         """
         start = time.perf_counter()
+        rebuilt_at = datetime.now(UTC)
+        ratings = self._movie_ratings
         pipeline: list[dict[str, Any]] = [
-            {"$match": {"movie_id": {"$in": [str(id) for id in film_ids]}}},
-            {"$group": {"_id": "$movie_id", "count": {"$count": {}}, "rating": {"$avg": "$value"}}},
-            {"$project": {"id": "$_id", "count": 1, "rating": 1}},
+            {"$group": {"_id": "$movie_id", "count": {"$sum": 1}, "sum": {"$sum": "$value"}}},
+            {"$set": {"rebuilt_at": rebuilt_at}},
+            {
+                "$merge": {
+                    "into": mongo_schema.MOVIE_RATING_AGGREGATES,
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert",
+                }
+            },
         ]
-        collection = await self._get_movie_ratings_collection()
-        values = await collection.aggregate(pipeline).to_list(length=len(film_ids) * 2)
-        elapsed = time.perf_counter() - start
-        self._logger.info("Films rating counted in %.2f sec", elapsed)
-        return [FilmUserRating.model_validate(v) for v in values]
+        await ratings.aggregate(pipeline).to_list(length=None)
+
+        aggregates = self._movie_rating_aggregates
+        # Films that lost all their votes were not produced by $group
+        await aggregates.delete_many({"rebuilt_at": {"$ne": rebuilt_at}})
+        rebuilt = await aggregates.count_documents({})
+        self._logger.info("Rebuilt %d films rating aggregates in %.2f sec", rebuilt, time.perf_counter() - start)
+        return rebuilt
 
     async def list_user_ratings(self, user_id: UUID, films: list[UUID] | None = None) -> dict[UUID, int]:
         """
@@ -72,26 +116,58 @@ class UserPrefService:
             if films is None
             else {"user_id": str(user_id), "movie_id": {"$in": [str(id) for id in films]}}
         )
-        collection = await self._get_movie_ratings_collection()
+        collection = self._movie_ratings
         found = await collection.find(find).to_list(length=None)
         return {UUID(e["movie_id"]): e["value"] for e in found}
 
     async def upsert_movie_rating(self, user_id: UUID, film_id: UUID, rating: int | None) -> int | None:
-        collection = await self._get_movie_ratings_collection()
+        collection = self._movie_ratings
         row_filter = {"user_id": str(user_id), "movie_id": str(film_id)}
+        # Previous value is returned by the same atomic write, so the aggregate delta is exact
         if rating is None:
-            await collection.delete_one(row_filter)
+            previous = await collection.find_one_and_delete(row_filter)
         else:
-            if existing := await collection.find_one(row_filter):
-                await collection.update_one({"_id": existing["_id"]}, {"$set": {"value": rating}})
-            else:
-                doc = {"_id": ObjectId(), "user_id": str(user_id), "movie_id": str(film_id), "value": rating}
-                await collection.insert_one(doc)
+            previous = await collection.find_one_and_update(
+                row_filter, {"$set": {"value": rating}}, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+
+        count, total = _rating_delta(previous["value"] if previous else None, rating)
+        if count or total:
+            await self._update_rating_aggregate(film_id, count=count, total=total)
 
         return rating
 
+    async def upsert_movie_ratings(self, user_id: UUID, ratings: dict[UUID, int | None]) -> dict[UUID, int | None]:
+        """
+        Apply many ratings of the user with one bulk write, None removes the rating.
+        Aggregate deltas are computed against the values read right before the write,
+        so a single vote of the same user racing with the batch may skew them until the next rebuild.
+        """
+        if not ratings:
+            return {}
+
+        previous = await self.list_user_ratings(user_id, list(ratings))
+        writes = [_rating_write(user_id, film_id, rating) for film_id, rating in ratings.items()]
+        await self._movie_ratings.bulk_write(writes, ordered=False)
+
+        aggregates = []
+        for film_id, rating in ratings.items():
+            count, total = _rating_delta(previous.get(film_id), rating)
+            if count or total:
+                aggregates.append(
+                    UpdateOne({"_id": str(film_id)}, {"$inc": {"count": count, "sum": total}}, upsert=True)
+                )
+        if aggregates:
+            await self._movie_rating_aggregates.bulk_write(aggregates, ordered=False)
+
+        return ratings
+
+    async def _update_rating_aggregate(self, film_id: UUID, count: int, total: int) -> None:
+        collection = self._movie_rating_aggregates
+        await collection.update_one({"_id": str(film_id)}, {"$inc": {"count": count, "sum": total}}, upsert=True)
+
     async def create_movie_review(self, user_id: UUID, film_id: UUID, review: str) -> FilmReview:
-        collection = await self._get_movie_reviews_collection()
+        collection = self._movie_reviews
         if await collection.find_one({"user_id": str(user_id), "movie_id": str(film_id)}):
             raise RuntimeError("Что написано пером, того не вырубишь топором")
 
@@ -101,6 +177,8 @@ class UserPrefService:
             "movie_id": str(film_id),
             "review": review,
             "created_at": datetime.now(UTC),
+            "likes": 0,
+            "dislikes": 0,
         }
         await collection.insert_one(doc)
         return FilmReview(
@@ -113,93 +191,115 @@ class UserPrefService:
             dislikes=0,
         )
 
-    async def list_movie_revies(self, movie_id: UUID) -> list[FilmReview]:
+    async def list_movie_revies(self, movie_id: UUID, page_number: int = 1, page_size: int = 10) -> list[FilmReview]:
         filter = {"movie_id": str(movie_id)}
-        return await self._list_rated_reviews(filter)
+        return await self._list_rated_reviews(filter, page_number, page_size)
 
-    async def list_user_reviews(self, user_id: UUID) -> list[FilmReview]:
+    async def list_user_reviews(self, user_id: UUID, page_number: int = 1, page_size: int = 10) -> list[FilmReview]:
         filter = {"user_id": str(user_id)}
-        return await self._list_rated_reviews(filter)
+        return await self._list_rated_reviews(filter, page_number, page_size)
 
-    async def _list_rated_reviews(self, filter: dict[str, Any]) -> list[FilmReview]:
-        collection = await self._get_movie_reviews_collection()
-        pipeline_subdocument = [
-            {"$group": {"_id": "$like", "count": {"$count": {}}}},
-            {
-                "$project": {
-                    "_id": 0,
-                    "v": "$count",
-                    "k": {"$cond": {"if": "$_id", "then": "likes", "else": "dislikes"}},
-                }
-            },
-        ]
+    async def _list_rated_reviews(self, filter: dict[str, Any], page_number: int, page_size: int) -> list[FilmReview]:
+        # Reviews carry their own counters, so a film's page is read in order
+        # from the {movie_id, likes, dislikes, _id} index instead of joining reactions
+        cursor = (
+            self._movie_reviews.find(filter)
+            # _id makes the order total, otherwise ties (e.g. all 0/0) may move between pages
+            .sort([("likes", DESCENDING), ("dislikes", ASCENDING), ("_id", ASCENDING)])
+            .skip((page_number - 1) * page_size)
+            .limit(page_size)
+        )
+        found = await cursor.to_list(length=page_size)
+        return [FilmReview.model_validate({**e, **{"id": str(e["_id"])}}) for e in found]
+
+    async def rebuild_review_counters(self) -> int:
+        """
+        Recompute reviews' likes and dislikes from all reactions.
+        Fills counters of reviews written before they were maintained and repairs drift
+        if a process died between a reaction write and its counter update. Reactions written
+        while it runs may be lost from the counters, so it is meant to run off-peak.
+        """
+        start = time.perf_counter()
+        rebuilt_at = datetime.now(UTC)
         pipeline: list[dict[str, Any]] = [
-            {"$match": filter},
-            {
-                "$lookup": {
-                    "from": "movie_review_reactions",
-                    "localField": "_id",
-                    "foreignField": "review_id",
-                    "as": "reactions",
-                    "pipeline": pipeline_subdocument,
-                }
-            },
-            {
-                "$project": {
-                    "user_id": 1,
-                    "movie_id": 1,
-                    "review": 1,
-                    "created_at": 1,
-                    "reactions": {"$arrayToObject": "$reactions"},
-                }
-            },
             {
-                "$project": {
-                    "id": {"$toString": "$_id"},
-                    "user_id": 1,
-                    "movie_id": 1,
-                    "review": 1,
-                    "created_at": 1,
-                    "likes": {"$ifNull": ["$reactions.likes", 0]},
-                    "dislikes": {"$ifNull": ["$reactions.dislikes", 0]},
+                "$group": {
+                    "_id": "$review_id",
+                    "likes": {"$sum": {"$cond": ["$like", 1, 0]}},
+                    "dislikes": {"$sum": {"$cond": ["$like", 0, 1]}},
                 }
             },
-            {"$sort": {"likes": -1, "dislikes": 1}},
+            {"$set": {"counters_rebuilt_at": rebuilt_at}},
+            # Reactions to deleted reviews are dropped
+            {"$merge": {"into": mongo_schema.MOVIE_REVIEWS, "whenMatched": "merge", "whenNotMatched": "discard"}},
         ]
-        result = await collection.aggregate(pipeline).to_list(length=None)
-        return [FilmReview.model_validate(r) for r in result]
+        await self._movie_review_reactions.aggregate(pipeline).to_list(length=None)
+
+        # Reviews without reactions were not produced by $group
+        await self._movie_reviews.update_many(
+            {"counters_rebuilt_at": {"$ne": rebuilt_at}},
+            {"$set": {"likes": 0, "dislikes": 0, "counters_rebuilt_at": rebuilt_at}},
+        )
+        rebuilt = await self._movie_reviews.count_documents({})
+        self._logger.info("Rebuilt %d reviews counters in %.2f sec", rebuilt, time.perf_counter() - start)
+        return rebuilt
 
     async def rate_movie_review(self, user_id: UUID, review_id: ObjectId, like: bool | None) -> None:
-        collection = await self._get_movie_review_reactions_collection()
+        reactions = self._movie_review_reactions
         review_filter = {"user_id": str(user_id), "review_id": review_id}
+        # Previous reaction is returned by the same atomic write, so the counters delta is exact.
+        # Unique {user_id, review_id} index keeps one reaction per user even for concurrent upserts
         if like is None:
-            await collection.delete_one(review_filter)
-
+            previous = await reactions.find_one_and_delete(review_filter)
         else:
-            if existing := await collection.find_one(review_filter):
-                await collection.update_one({"_id": existing["_id"]}, {"$set": {"like": like}})
-            else:
-                doc = {"_id": ObjectId(), "user_id": str(user_id), "review_id": review_id, "like": like}
-                await collection.insert_one(doc)
+            previous = await reactions.find_one_and_update(
+                review_filter, {"$set": {"like": like}}, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+
+        if counters := _reaction_delta(previous["like"] if previous else None, like):
+            await self._movie_reviews.update_one({"_id": review_id}, {"$inc": counters})
+
+    async def rate_movie_reviews(self, user_id: UUID, reactions: dict[ObjectId, bool | None]) -> None:
+        """
+        Apply many reactions of the user with one bulk write, None removes the reaction.
+        Counters deltas are computed against the reactions read right before the write,
+        so a single reaction of the same user racing with the batch may skew them until the next rebuild.
+        """
+        if not reactions:
+            return
+
+        find = {"user_id": str(user_id), "review_id": {"$in": list(reactions)}}
+        found = await self._movie_review_reactions.find(find).to_list(length=None)
+        previous = {e["review_id"]: e["like"] for e in found}
+
+        writes = [_reaction_write(user_id, review_id, like) for review_id, like in reactions.items()]
+        await self._movie_review_reactions.bulk_write(writes, ordered=False)
+
+        counters = []
+        for review_id, like in reactions.items():
+            if delta := _reaction_delta(previous.get(review_id), like):
+                counters.append(UpdateOne({"_id": review_id}, {"$inc": delta}))
+        if counters:
+            await self._movie_reviews.bulk_write(counters, ordered=False)
 
     async def add_movie_bookmark(self, user_id: UUID, movie_id: UUID) -> str:
-        collection = await self._get_user_bookmarks_collection()
-        doc = {
-            "_id": ObjectId(),
-            "user_id": str(user_id),
-            "movie_id": str(movie_id),
-            "created_at": datetime.now(UTC),
-        }
-        await collection.insert_one(doc)
-        return str(doc["_id"])
+        """Bookmarking a film twice returns the existing bookmark"""
+        found = await self._user_bookmarks.find_one_and_update(
+            {"user_id": str(user_id), "movie_id": str(movie_id)},
+            {"$setOnInsert": {"created_at": datetime.now(UTC)}},
+            projection={"_id": True},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return str(found["_id"])
 
     async def delete_movie_bookmark(self, bookmark_id: ObjectId, user_id: UUID) -> None:
-        collection = await self._get_user_bookmarks_collection()
+        collection = self._user_bookmarks
         # user_id filter is required to be sure that user removes own bookmarks
-        await collection.delete_one({"_id": bookmark_id, "user_id": user_id})
+        await collection.delete_one({"_id": bookmark_id, "user_id": str(user_id)})
 
     async def list_user_bookmarks(self, user_id: UUID, movie_ids: list[UUID] | None = None) -> list[FilmBookmark]:
-        collection = await self._get_user_bookmarks_collection()
+        collection = self._user_bookmarks
         filter = (
             {"user_id": str(user_id), "movie_id": {"$in": [str(id) for id in movie_ids]}}
             if movie_ids
@@ -208,33 +308,38 @@ class UserPrefService:
         results = await collection.find(filter).to_list(length=None)
         return [FilmBookmark.model_validate({**e, **{"id": str(e["_id"])}}) for e in results]
 
-    async def _get_movie_ratings_collection(self) -> AsyncIOMotorCollection:
-        db = self._mongo.get_database("user_pref_db")
-        collection = db.get_collection("movie_likes")
-        await collection.create_index({"user_id": 1})
-        await collection.create_index({"movie_id": 1})
-        return collection
-
-    async def _get_movie_reviews_collection(self) -> AsyncIOMotorCollection:
-        db = self._mongo.get_database("user_pref_db")
-        collection = db.get_collection("movie_reviews")
-        await collection.create_index({"user_id": 1})
-        await collection.create_index({"movie_id": 1})
-        return collection
-
-    async def _get_movie_review_reactions_collection(self) -> AsyncIOMotorCollection:
-        db = self._mongo.get_database("user_pref_db")
-        collection = db.get_collection("movie_review_reactions")
-        await collection.create_index({"user_id": 1})
-        await collection.create_index({"review_id": 1})
-        return collection
-
-    async def _get_user_bookmarks_collection(self) -> AsyncIOMotorCollection:
-        db = self._mongo.get_database("user_pref_db")
-        collection = db.get_collection("user_movie_bookmarks")
-        await collection.create_index({"user_id": 1})
-        await collection.create_index({"movie_id": 1})
-        return collection
+
+def _rating_delta(previous: int | None, rating: int | None) -> tuple[int, int]:
+    """Change of the film's votes count and sum when the user's rating goes from previous to rating"""
+    if previous is None:
+        return (0, 0) if rating is None else (1, rating)
+    if rating is None:
+        return -1, -previous
+    return 0, rating - previous
+
+
+def _reaction_delta(previous: bool | None, like: bool | None) -> dict[str, int]:
+    """Non-zero changes of the review's likes and dislikes when the user's reaction goes from previous to like"""
+    delta = {"likes": 0, "dislikes": 0}
+    if previous is not None:
+        delta["likes" if previous else "dislikes"] -= 1
+    if like is not None:
+        delta["likes" if like else "dislikes"] += 1
+    return {counter: value for counter, value in delta.items() if value}
+
+
+def _rating_write(user_id: UUID, film_id: UUID, rating: int | None) -> DeleteOne | UpdateOne:
+    row_filter = {"user_id": str(user_id), "movie_id": str(film_id)}
+    if rating is None:
+        return DeleteOne(row_filter)
+    return UpdateOne(row_filter, {"$set": {"value": rating}}, upsert=True)
+
+
+def _reaction_write(user_id: UUID, review_id: ObjectId, like: bool | None) -> DeleteOne | UpdateOne:
+    review_filter = {"user_id": str(user_id), "review_id": review_id}
+    if like is None:
+        return DeleteOne(review_filter)
+    return UpdateOne(review_filter, {"$set": {"like": like}}, upsert=True)
 
 
 @lru_cache()
@@ -43,3 +43,20 @@ def make_get_request(http_client: aiohttp.ClientSession):
             return response.status, json.loads(body)
 
     return inner
+
+
+@pytest_asyncio.fixture()
+def make_get_page_request(http_client: aiohttp.ClientSession):
+    """Same as make_get_request, but also returns the response headers"""
+    api_settings = FastAPISettings()
+
+    async def inner(path: str, query_data: dict | None = None):
+        url = encode_url(api_settings.url, path, query_data)
+        async with http_client.get(url) as response:
+            body = await response.text()
+            if response.status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                raise ValueError(body)
+
+            return response.status, json.loads(body), response.headers
+
+    return inner
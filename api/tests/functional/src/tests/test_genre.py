@@ -10,7 +10,9 @@ genres_data = [
     {
         "id": str(uuid.uuid4()),
         "name": f"genre-{ix}",
-        "description": f"Description for genre-{ix}"
+        "description": f"Description for genre-{ix}",
+        "films_count": ix,
+        "top_films": [],
     }
     for ix in range(5)
 ]
@@ -28,6 +30,7 @@ async def test_get_genre(make_get_request, es_write_data):
     assert body["id"] == genre_id
     assert body["name"] == genres_data[0]["name"]
     assert body["description"] == genres_data[0]["description"]
+    assert body["films_count"] == genres_data[0]["films_count"]
 
 
 @pytest.mark.asyncio
@@ -7,11 +7,22 @@ from redis.asyncio import Redis
 from .utils import construct_es_documents
 
 person_id = uuid4()
-persons_data = [{"id": str(person_id), "full_name": "John Doe"}]
+film_ids = [str(uuid4()) for _ in range(3)]
+persons_data = [
+    {
+        "id": str(person_id),
+        "full_name": "John Doe",
+        "films": [
+            {"id": film_ids[0], "roles": ["directors"]},
+            {"id": film_ids[1], "roles": ["actors"]},
+            {"id": film_ids[2], "roles": ["writers"]},
+        ],
+    }
+]
 
 films_data = [
     {
-        "id": str(uuid4()),
+        "id": film_ids[0],
         "title": "The Star",
         "description": "A film about a star.",
         "imdb_rating": 8.5,
@@ -20,7 +31,7 @@ films_data = [
         "writers": [],
     },
     {
-        "id": str(uuid4()),
+        "id": film_ids[1],
         "title": "The Moon",
         "description": "A film about the moon.",
         "imdb_rating": 7.0,
@@ -29,7 +40,7 @@ films_data = [
         "writers": [],
     },
     {
-        "id": str(uuid4()),
+        "id": film_ids[2],
         "title": "Another Movie Without Description",
         "description": None,
         "imdb_rating": 0.0,
@@ -52,6 +63,8 @@ async def test_get_person(make_get_request, es_write_data):
     assert status == HTTPStatus.OK
     assert body["id"] == str(person_id)
     assert body["full_name"] == "John Doe"
+    assert [film["uuid"] for film in body["films"]] == film_ids
+    assert [film["roles"] for film in body["films"]] == [["directors"], ["actors"], ["writers"]]
 
 
 @pytest.mark.asyncio
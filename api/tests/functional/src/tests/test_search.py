@@ -62,3 +62,36 @@ async def test_search(make_get_request, es_write_data, redis_client: Redis, quer
     if status < HTTPStatus.BAD_REQUEST:
         assert len(keys_after) > len(keys_before), "Cache key must be set"
         assert len(body) == expected_answer["length"]
+
+
+@pytest.mark.asyncio(scope="function")
+async def test_search_cursor_pagination(make_get_page_request, es_write_data):
+    # arrange
+    bulk_query = construct_es_documents("movies", es_films)
+    await es_write_data(bulk_query, "movies")
+
+    # act
+    ids: list[str] = []
+    query_data: dict = {"query": "The Star", "page_size": 4, "cursor": "true"}
+    pages = 0
+    while True:
+        (status, body, headers) = await make_get_page_request("/api/v1/films/search", query_data)
+        assert status == HTTPStatus.OK
+        ids.extend(film["id"] for film in body)
+        pages += 1
+        if not (token := headers.get("X-Next-Page-Token")):
+            break
+        query_data = {"query": "The Star", "page_size": 4, "page_token": token}
+
+    # assert
+    assert pages == 4
+    assert len(ids) == len(set(ids)) == 15
+
+
+@pytest.mark.asyncio(scope="function")
+async def test_search_cursor_pagination_invalid_token(make_get_page_request, es_write_data):
+    bulk_query = construct_es_documents("movies", es_films)
+    await es_write_data(bulk_query, "movies")
+
+    (status, _, _) = await make_get_page_request("/api/v1/films/search", {"query": "The Star", "page_token": "broken"})
+    assert status == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,89 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from redis.exceptions import ConnectionError
+from src.services.cache.local_storage import LocalCache
+from src.services.cache.redis_storage import RedisCache
+from src.services.cache.tiered_storage import TieredCache
+from src.services.cache.versions import IndexVersions
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+
+    async def set(self, key: str, value: bytes, timeout_sec: int) -> None:
+        self.data[key] = value
+
+    async def get(self, key: str) -> bytes | None:
+        return self.data.get(key)
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self.data.get(key) for key in keys]
+
+
+async def test_local_cache_evicts_least_recently_used() -> None:
+    cache = LocalCache(max_entries=2, ttl_sec=60)
+    await cache.set("a", b"1", 60)
+    await cache.set("b", b"2", 60)
+    await cache.get("a")
+    await cache.set("c", b"3", 60)
+
+    assert await cache.get("a") == b"1"
+    assert await cache.get("b") is None
+    assert await cache.get("c") == b"3"
+
+
+async def test_local_cache_expires() -> None:
+    cache = LocalCache(max_entries=10, ttl_sec=0.01)
+    await cache.set("a", b"1", 60)
+    await asyncio.sleep(0.02)
+
+    assert await cache.get("a") is None
+    assert len(cache) == 0
+
+
+async def test_redis_cache_compresses_large_values() -> None:
+    client = FakeRedis()
+    cache = RedisCache(client, compress_min_bytes=100)  # type: ignore[arg-type]
+    large = b'{"title": "The Star"}' * 100
+
+    await cache.set("large", large, 60)
+    await cache.set("small", b"[]", 60)
+
+    assert len(client.data["large"]) < len(large) / 5
+    assert await cache.get("large") == large
+    assert await cache.get("small") == b"[]"
+    assert await cache.get("missing") is None
+
+
+async def test_tiered_cache_reads_through_and_invalidates_on_version_bump() -> None:
+    client = FakeRedis()
+    cache = TieredCache(
+        LocalCache(max_entries=10, ttl_sec=60),
+        RedisCache(client),  # type: ignore[arg-type]
+        IndexVersions(client, refresh_sec=0),  # type: ignore[arg-type]
+    )
+
+    await cache.set("films:1:10", b"[1]", 60)
+    assert await cache.get("films:1:10") == b"[1]"
+
+    # Another worker sees the value through Redis
+    other = TieredCache(LocalCache(10, 60), RedisCache(client), IndexVersions(client, 0))  # type: ignore[arg-type]
+    assert await other.get("films:1:10") == b"[1]"
+
+    # ETL loaded movies
+    client.data["cache_version:movies"] = b"1"
+    assert await cache.get("films:1:10") is None
+    assert await other.get("films:1:10") is None
+
+
+async def test_tiered_cache_skips_caching_when_versions_are_unavailable() -> None:
+    remote = AsyncMock(spec=RedisCache)
+    versions = AsyncMock(spec=IndexVersions)
+    versions.get.side_effect = ConnectionError()
+    cache = TieredCache(LocalCache(10, 60), remote, versions)
+
+    await cache.set("films:1:10", b"[1]", 60)
+    assert await cache.get("films:1:10") is None
+    remote.set.assert_not_called()
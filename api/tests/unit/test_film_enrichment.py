@@ -0,0 +1,85 @@
+import asyncio
+import time
+import uuid
+from unittest.mock import AsyncMock
+
+from pymongo.errors import ServerSelectionTimeoutError
+from src.api.v1.schemas.film import Film
+from src.core.settings import EnrichmentSettings
+from src.models.film_bookmark import FilmBookmark
+from src.models.film_user_rating import FilmUserRating
+from src.services.film_enrichment import FilmEnrichmentService
+from src.services.user_pref import UserPrefService
+
+SETTINGS = EnrichmentSettings(ratings_timeout_sec=0.2, user_ratings_timeout_sec=0.2, bookmarks_timeout_sec=0.2)
+
+
+def _delayed(delay: float, value):
+    async def call(*args, **kwargs):
+        await asyncio.sleep(delay)
+        return value
+
+    return call
+
+
+def _film() -> Film:
+    return Film(id=uuid.uuid4(), title="The Star", imdb_rating=7.0)
+
+
+def _user_pref(film: Film, user_id: uuid.UUID, delay: float = 0.05) -> AsyncMock:
+    user_pref = AsyncMock(spec=UserPrefService)
+    user_pref.count_films_rating.side_effect = _delayed(delay, [FilmUserRating(id=film.id, rating=8.5, count=2)])
+    user_pref.list_user_ratings.side_effect = _delayed(delay, {film.id: 9})
+    bookmark = FilmBookmark(id="1", user_id=user_id, movie_id=film.id, created_at="2024-01-01T00:00:00")
+    user_pref.list_user_bookmarks.side_effect = _delayed(delay, [bookmark])
+    return user_pref
+
+
+async def test_sources_are_queried_concurrently() -> None:
+    film, user_id = _film(), uuid.uuid4()
+    service = FilmEnrichmentService(_user_pref(film, user_id, delay=0.05), SETTINGS)
+
+    start = time.perf_counter()
+    await service.enrich([film], user_id)
+
+    assert time.perf_counter() - start < 0.1
+    assert (film.user_rating, film.user_count, film.my_rating, film.is_bookmarked) == (8.5, 2, 9, True)
+
+
+async def test_slow_source_is_skipped() -> None:
+    film, user_id = _film(), uuid.uuid4()
+    user_pref = _user_pref(film, user_id)
+    user_pref.count_films_rating.side_effect = _delayed(1, [])
+    service = FilmEnrichmentService(user_pref, SETTINGS)
+
+    start = time.perf_counter()
+    await service.enrich([film], user_id)
+
+    assert time.perf_counter() - start < 0.5
+    assert (film.user_rating, film.user_count) == (0, 0)
+    assert film.my_rating == 9
+    assert film.is_bookmarked
+
+
+async def test_failing_source_is_skipped() -> None:
+    film, user_id = _film(), uuid.uuid4()
+    user_pref = _user_pref(film, user_id)
+    user_pref.list_user_bookmarks.side_effect = ServerSelectionTimeoutError("mongo is down")
+    service = FilmEnrichmentService(user_pref, SETTINGS)
+
+    await service.enrich([film], user_id)
+
+    assert film.user_rating == 8.5
+    assert not film.is_bookmarked
+
+
+async def test_anonymous_user_gets_only_ratings() -> None:
+    film, user_id = _film(), uuid.uuid4()
+    user_pref = _user_pref(film, user_id)
+    service = FilmEnrichmentService(user_pref, SETTINGS)
+
+    await service.enrich([film], None)
+
+    assert film.user_rating == 8.5
+    user_pref.list_user_ratings.assert_not_called()
+    user_pref.list_user_bookmarks.assert_not_called()
@@ -0,0 +1,48 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from pymongo.errors import OperationFailure
+from src.db import mongo_schema
+
+
+def _mongo(collections: dict[str, AsyncMock]) -> MagicMock:
+    mongo = MagicMock()
+    mongo.get_database.return_value.get_collection.side_effect = lambda name: collections[name]
+    return mongo
+
+
+async def test_all_declared_indexes_are_created() -> None:
+    collections = {name: AsyncMock() for name in mongo_schema.INDEXES}
+
+    assert await mongo_schema.ensure_indexes(_mongo(collections))
+
+    for name, indexes in mongo_schema.INDEXES.items():
+        created = [call.args[0] for call in collections[name].create_indexes.await_args_list]
+        assert created == [[index] for index in indexes]
+
+
+async def test_failed_index_does_not_stop_others() -> None:
+    collections = {name: AsyncMock() for name in mongo_schema.INDEXES}
+    ratings = collections[mongo_schema.MOVIE_RATINGS]
+    ratings.create_indexes.side_effect = [OperationFailure("E11000 duplicate key"), ["movie_id_1"]]
+
+    assert not await mongo_schema.ensure_indexes(_mongo(collections))
+
+    for name in mongo_schema.INDEXES:
+        assert collections[name].create_indexes.await_count == len(mongo_schema.INDEXES[name])
+
+
+async def test_duplicates_are_removed_keeping_newest() -> None:
+    collections = {}
+    for name in mongo_schema.INDEXES:
+        collection = AsyncMock()
+        cursor = MagicMock()
+        cursor.to_list = AsyncMock(return_value=[])
+        collection.aggregate = MagicMock(return_value=cursor)
+        collections[name] = collection
+    ratings = collections[mongo_schema.MOVIE_RATINGS]
+    ratings.aggregate.return_value.to_list.return_value = [{"ids": ["newest", "older", "oldest"], "count": 3}]
+    ratings.delete_many.return_value = MagicMock(deleted_count=2)
+
+    assert await mongo_schema.remove_duplicates(_mongo(collections)) == 2
+
+    ratings.delete_many.assert_awaited_once_with({"_id": {"$in": ["older", "oldest"]}})
@@ -0,0 +1,39 @@
+import math
+
+import pytest
+from src.services.base import PageTokenError, _decode_page_token, _encode_page_token
+
+KEY = b"secret"
+
+
+def test_token_round_trips() -> None:
+    token = _encode_page_token("pit", [7.5, "abc", 42], "query", KEY)
+
+    assert _decode_page_token(token, "query", KEY) == ("pit", [7.5, "abc", 42])
+
+
+def test_missing_sort_values_round_trip_as_sentinels() -> None:
+    token = _encode_page_token("pit", [math.inf, -math.inf, 1], "query", KEY)
+
+    assert _decode_page_token(token, "query", KEY) == ("pit", ["Infinity", "-Infinity", 1])
+
+
+def test_tampered_token_is_rejected() -> None:
+    token = _encode_page_token("pit", [7.5, 1], "query", KEY)
+    forged = _encode_page_token("pit", [0.0, 1], "query", b"other key")
+
+    with pytest.raises(PageTokenError):
+        _decode_page_token(f"{forged.split('.')[0]}.{token.split('.')[1]}", "query", KEY)
+
+
+@pytest.mark.parametrize("token", ["", "garbage", "a.b.c", "!!!.???"])
+def test_malformed_token_is_rejected(token: str) -> None:
+    with pytest.raises(PageTokenError):
+        _decode_page_token(token, "query", KEY)
+
+
+def test_token_of_another_query_is_rejected() -> None:
+    token = _encode_page_token("pit", [1], "query", KEY)
+
+    with pytest.raises(PageTokenError):
+        _decode_page_token(token, "another query", KEY)
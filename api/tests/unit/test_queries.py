@@ -0,0 +1,62 @@
+import uuid
+
+import orjson
+from src.services import queries
+
+
+def _clauses(query: dict) -> list[str]:
+    """All clause names used in the query tree"""
+    names = []
+    for key, value in query.items():
+        names.append(key)
+        if isinstance(value, dict):
+            names.extend(_clauses(value))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    names.extend(_clauses(item))
+    return names
+
+
+def test_films_by_genre_is_filter_context() -> None:
+    genre_id = str(uuid.uuid4())
+
+    query = queries.films_by_genre(genre_id)
+
+    assert query == {"bool": {"filter": [{"nested": {"path": "genres", "query": {"term": {"genres.id": genre_id}}}}]}}
+    assert "must" not in _clauses(query)
+    assert "match" not in _clauses(query)
+
+
+def test_films_by_genre_without_genre_matches_all() -> None:
+    assert queries.films_by_genre(None) == {"match_all": {}}
+
+
+def test_films_by_person_filters_every_role() -> None:
+    person_id = str(uuid.uuid4())
+
+    query = queries.films_by_person(person_id)
+
+    roles = query["bool"]["filter"][0]["bool"]
+    assert roles["minimum_should_match"] == 1
+    assert [clause["nested"]["path"] for clause in roles["should"]] == ["directors", "actors", "writers"]
+    assert all(clause["nested"]["query"] == {"term": {f"{clause['nested']['path']}.id": person_id}} for clause in roles["should"])
+    assert "must" not in _clauses(query)
+
+
+def test_search_queries_score() -> None:
+    assert queries.film_title_search("star") == {"match": {"title": {"query": "star", "fuzziness": "AUTO"}}}
+    assert queries.person_name_search("ann") == {"match": {"full_name": "ann"}}
+
+
+def test_queries_are_cached() -> None:
+    person_id = str(uuid.uuid4())
+
+    first = queries.films_by_person(person_id)
+    second = queries.films_by_person(person_id)
+
+    # Same object for the same arguments, so request bodies are byte-identical
+    assert first is second
+    assert orjson.dumps(first) == orjson.dumps(queries.films_by_person(person_id))
+    assert queries.films_by_person(str(uuid.uuid4())) is not first
+
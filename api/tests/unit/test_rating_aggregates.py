@@ -0,0 +1,80 @@
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from src.services.user_pref import UserPrefService
+
+
+@pytest.fixture
+def service() -> UserPrefService:
+    service = UserPrefService(MagicMock())
+    service._movie_ratings = AsyncMock()
+    service._movie_rating_aggregates = AsyncMock()
+    return service
+
+
+async def _aggregate_inc(service: UserPrefService) -> dict | None:
+    aggregates = service._movie_rating_aggregates
+    if not aggregates.update_one.called:
+        return None
+    return aggregates.update_one.call_args.args[1]["$inc"]
+
+
+@pytest.mark.parametrize(
+    "previous, rating, expected_inc",
+    [
+        (None, 7, {"count": 1, "sum": 7}),
+        ({"value": 3}, 7, {"count": 0, "sum": 4}),
+        ({"value": 7}, 7, None),
+        ({"value": 5}, None, {"count": -1, "sum": -5}),
+        (None, None, None),
+    ],
+)
+async def test_rating_updates_aggregate_by_delta(
+    service: UserPrefService, previous: dict | None, rating: int | None, expected_inc: dict | None
+) -> None:
+    ratings = service._movie_ratings
+    ratings.find_one_and_update.return_value = previous
+    ratings.find_one_and_delete.return_value = previous
+
+    await service.upsert_movie_rating(uuid.uuid4(), uuid.uuid4(), rating)
+
+    assert await _aggregate_inc(service) == expected_inc
+
+
+async def test_count_films_rating_reads_aggregates(service: UserPrefService) -> None:
+    film_id = uuid.uuid4()
+    aggregates = service._movie_rating_aggregates
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=[{"_id": str(film_id), "count": 4, "sum": 30}])
+    aggregates.find = MagicMock(return_value=cursor)
+
+    ratings = await service.count_films_rating([film_id])
+
+    assert len(ratings) == 1
+    assert ratings[0].id == film_id
+    assert ratings[0].rating == 7.5
+    assert ratings[0].count == 4
+
+
+async def test_batch_ratings_update_aggregates_by_delta(service: UserPrefService) -> None:
+    user_id, kept, changed, removed, added = (uuid.uuid4() for _ in range(5))
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(
+        return_value=[
+            {"movie_id": str(kept), "value": 5},
+            {"movie_id": str(changed), "value": 3},
+            {"movie_id": str(removed), "value": 6},
+        ]
+    )
+    service._movie_ratings.find = MagicMock(return_value=cursor)
+
+    await service.upsert_movie_ratings(user_id, {kept: 5, changed: 8, removed: None, added: 2})
+
+    assert len(service._movie_ratings.bulk_write.call_args.args[0]) == 4
+    writes = service._movie_rating_aggregates.bulk_write.call_args.args[0]
+    assert {w._filter["_id"]: w._doc["$inc"] for w in writes} == {
+        str(changed): {"count": 0, "sum": 5},
+        str(removed): {"count": -1, "sum": -6},
+        str(added): {"count": 1, "sum": 2},
+    }
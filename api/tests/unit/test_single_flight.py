@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from src.services.single_flight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_flight() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def call() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(flight.do("film", call) for _ in range(100)))
+
+    assert results == [42] * 100
+    assert calls == 1
+    assert flight.in_flight() == 0
+
+
+async def test_different_keys_are_not_shared() -> None:
+    flight: SingleFlight[str] = SingleFlight()
+
+    async def call(key: str) -> str:
+        await asyncio.sleep(0.01)
+        return key
+
+    results = await asyncio.gather(flight.do("a", lambda: call("a")), flight.do("b", lambda: call("b")))
+
+    assert results == ["a", "b"]
+
+
+async def test_error_is_shared_and_not_cached() -> None:
+    flight: SingleFlight[int] = SingleFlight(result_ttl=60)
+    calls = 0
+
+    async def call() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(*(flight.do("film", call) for _ in range(10)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert calls == 1
+
+    with pytest.raises(RuntimeError):
+        await flight.do("film", call)
+    assert calls == 2
+
+
+async def test_result_window() -> None:
+    flight: SingleFlight[int] = SingleFlight(result_ttl=0.05)
+    calls = 0
+
+    async def call() -> int:
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flight.do("film", call) == 1
+    assert await flight.do("film", call) == 1
+    await asyncio.sleep(0.06)
+    assert await flight.do("film", call) == 2
+
+
+async def test_without_result_window_completed_calls_are_repeated() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def call() -> int:
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flight.do("film", call) == 1
+    assert await flight.do("film", call) == 2
+
+
+async def test_cancelled_caller_does_not_cancel_others() -> None:
+    flight: SingleFlight[int] = SingleFlight()
+
+    async def call() -> int:
+        await asyncio.sleep(0.02)
+        return 42
+
+    first = asyncio.ensure_future(flight.do("film", call))
+    second = asyncio.ensure_future(flight.do("film", call))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == 42
+    with pytest.raises(asyncio.CancelledError):
+        await first
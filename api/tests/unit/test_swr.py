@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+from src.services.cache.local_storage import LocalCache
+from src.services.cache.swr import ENVELOPE, CachePolicy, StaleWhileRevalidateCache
+
+
+class Loader:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.calls = 0
+        self.delay = delay
+        self.fail = False
+
+    async def __call__(self) -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("elastic is down")
+        return f"v{self.calls}".encode()
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_fresh_value_is_served_from_cache() -> None:
+    cache = StaleWhileRevalidateCache(LocalCache(100, 60))
+    load = Loader()
+    policy = CachePolicy(ttl=60, stale_ttl=60, beta=0)
+
+    assert await cache.get_or_load("films", policy, load) == b"v1"
+    assert await cache.get_or_load("films", policy, load) == b"v1"
+    assert load.calls == 1
+
+
+async def test_concurrent_misses_load_once() -> None:
+    cache = StaleWhileRevalidateCache(LocalCache(100, 60))
+    load = Loader(delay=0.01)
+    policy = CachePolicy(ttl=60)
+
+    results = await asyncio.gather(*(cache.get_or_load("films", policy, load) for _ in range(50)))
+
+    assert results == [b"v1"] * 50
+    assert load.calls == 1
+
+
+async def test_stale_value_is_served_while_refreshed() -> None:
+    cache = StaleWhileRevalidateCache(LocalCache(100, 60))
+    load = Loader(delay=0.01)
+    policy = CachePolicy(ttl=0, stale_ttl=60, beta=0)
+
+    assert await cache.get_or_load("films", policy, load) == b"v1"
+    # Expired: stale value comes back at once, one refresh runs in background
+    stale = await asyncio.gather(*(cache.get_or_load("films", policy, load) for _ in range(10)))
+    assert stale == [b"v1"] * 10
+    await asyncio.sleep(0.02)
+
+    assert load.calls == 2
+    assert await cache.get_or_load("films", policy, load) == b"v2"
+
+
+async def test_failed_refresh_keeps_stale_value() -> None:
+    cache = StaleWhileRevalidateCache(LocalCache(100, 60))
+    load = Loader()
+    policy = CachePolicy(ttl=0, stale_ttl=60, beta=0)
+
+    await cache.get_or_load("films", policy, load)
+    load.fail = True
+    assert await cache.get_or_load("films", policy, load) == b"v1"
+    await _settle()
+
+    assert await cache.get_or_load("films", policy, load) == b"v1"
+
+
+async def test_value_close_to_expiry_is_refreshed_early() -> None:
+    local = LocalCache(100, 60)
+    cache = StaleWhileRevalidateCache(local)
+    load = Loader()
+    # Fresh for 10 more seconds, but took 100 seconds to compute
+    await local.set("films", ENVELOPE.pack(time.time() + 10, 100) + b"v0", 60)
+
+    assert await cache.get_or_load("films", CachePolicy(ttl=60, beta=1000), load) == b"v0"
+    await _settle()
+
+    assert load.calls == 1
+    assert await cache.get_or_load("films", CachePolicy(ttl=60, beta=0), load) == b"v1"
+
+
+def test_cache_control() -> None:
+    assert CachePolicy(ttl=300, stale_ttl=60).cache_control == "max-age=300, stale-while-revalidate=60"
+    assert CachePolicy(ttl=300).cache_control == "max-age=300"
+
+
+def test_personal_responses_are_private() -> None:
+    policy = CachePolicy(ttl=300, stale_ttl=60)
+    assert policy.cache_control_for(personal=True) == "private, no-store"
+    assert policy.cache_control_for(personal=False) == policy.cache_control
@@ -0,0 +1,90 @@
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+from pymongo import DeleteOne, UpdateOne
+from src.services.user_pref import UserPrefService
+
+
+@pytest.fixture
+def service() -> UserPrefService:
+    service = UserPrefService(MagicMock())
+    service._movie_reviews = AsyncMock()
+    service._movie_review_reactions = AsyncMock()
+    service._user_bookmarks = AsyncMock()
+    return service
+
+
+def _counters_inc(service: UserPrefService) -> dict | None:
+    reviews = service._movie_reviews
+    if not reviews.update_one.called:
+        return None
+    return reviews.update_one.call_args.args[1]["$inc"]
+
+
+async def test_review_reaction_is_single_upsert(service: UserPrefService) -> None:
+    user_id, review_id = uuid.uuid4(), ObjectId()
+    service._movie_review_reactions.find_one_and_update.return_value = None
+
+    await service.rate_movie_review(user_id, review_id, True)
+
+    reactions = service._movie_review_reactions
+    reactions.find_one_and_update.assert_awaited_once()
+    assert reactions.find_one_and_update.call_args.kwargs["upsert"]
+    reactions.find_one.assert_not_called()
+    reactions.insert_one.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "previous, like, expected_inc",
+    [
+        (None, True, {"likes": 1}),
+        (None, False, {"dislikes": 1}),
+        ({"like": True}, False, {"likes": -1, "dislikes": 1}),
+        ({"like": False}, False, None),
+        ({"like": True}, None, {"likes": -1}),
+        (None, None, None),
+    ],
+)
+async def test_reaction_updates_review_counters_by_delta(
+    service: UserPrefService, previous: dict | None, like: bool | None, expected_inc: dict | None
+) -> None:
+    reactions = service._movie_review_reactions
+    reactions.find_one_and_update.return_value = previous
+    reactions.find_one_and_delete.return_value = previous
+
+    await service.rate_movie_review(uuid.uuid4(), ObjectId(), like)
+
+    assert _counters_inc(service) == expected_inc
+
+
+async def test_batch_reactions_are_one_bulk_write(service: UserPrefService) -> None:
+    liked, switched, removed = ObjectId(), ObjectId(), ObjectId()
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(
+        return_value=[{"review_id": switched, "like": True}, {"review_id": removed, "like": False}]
+    )
+    service._movie_review_reactions.find = MagicMock(return_value=cursor)
+
+    await service.rate_movie_reviews(uuid.uuid4(), {liked: True, switched: False, removed: None})
+
+    writes = service._movie_review_reactions.bulk_write.call_args.args[0]
+    assert [type(w) for w in writes] == [UpdateOne, UpdateOne, DeleteOne]
+    counters = service._movie_reviews.bulk_write.call_args.args[0]
+    assert {w._filter["_id"]: w._doc["$inc"] for w in counters} == {
+        liked: {"likes": 1},
+        switched: {"likes": -1, "dislikes": 1},
+        removed: {"dislikes": -1},
+    }
+
+
+async def test_repeated_bookmark_returns_existing_one(service: UserPrefService) -> None:
+    bookmark_id = ObjectId()
+    service._user_bookmarks.find_one_and_update.return_value = {"_id": bookmark_id}
+
+    assert await service.add_movie_bookmark(uuid.uuid4(), uuid.uuid4()) == str(bookmark_id)
+
+    kwargs = service._user_bookmarks.find_one_and_update.call_args.kwargs
+    assert kwargs["upsert"]
+    service._user_bookmarks.insert_one.assert_not_called()
@@ -0,0 +1,142 @@
+"""
+Генератор синтетического каталога фильмов для бенчмарков ETL.
+
+Пересоздает схему content в отдельной базе и заполняет ее через COPY:
+фильмы, жанры, персоны и связи между ними с заданной плотностью.
+"""
+
+import io
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+from psycopg2.extensions import connection as PgConnection
+
+DDL_PATH = Path(__file__).resolve().parents[2] / "postgres_init" / "movies_database.ddl"
+
+# Сколько строк собирается в памяти перед одним COPY
+COPY_CHUNK_ROWS = 100_000
+
+
+@dataclass
+class CatalogueScale:
+    films: int = 100_000
+    persons: int = 50_000
+    genres: int = 30
+    # Сколько персон участвует в одном фильме: режиссер, два сценариста, остальные актеры
+    cast: int = 10
+    genres_per_film: int = 3
+    seed: int = 42
+
+
+def generate_catalogue(pg_conn: PgConnection, scale: CatalogueScale, ddl_path: Path = DDL_PATH) -> None:
+    """Пересоздает схему content и заполняет ее синтетическими данными."""
+    rng = random.Random(scale.seed)
+    created = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def modified() -> str:
+        return (created + timedelta(seconds=rng.randrange(100_000_000))).isoformat()
+
+    with pg_conn.cursor() as cursor:
+        cursor.execute("DROP SCHEMA IF EXISTS content CASCADE;")
+        cursor.execute(ddl_path.read_text())
+    pg_conn.commit()
+
+    genre_ids = [new_id() for _ in range(scale.genres)]
+    person_ids = [new_id() for _ in range(scale.persons)]
+    film_ids = [new_id() for _ in range(scale.films)]
+
+    _copy(
+        pg_conn,
+        "content.genre (id, name, description, created, modified)",
+        (
+            (gid, f"Genre {i}", f"Description of genre {i}", created.isoformat(), modified())
+            for i, gid in enumerate(genre_ids)
+        ),
+    )
+    _copy(
+        pg_conn,
+        "content.person (id, full_name, created, modified)",
+        ((pid, f"Person {i}", created.isoformat(), modified()) for i, pid in enumerate(person_ids)),
+    )
+    _copy(
+        pg_conn,
+        "content.film_work (id, title, description, rating, type, created, modified)",
+        (
+            (
+                fid,
+                f"Movie {i}",
+                f"Description of movie {i}",
+                f"{rng.uniform(0, 10):.1f}",
+                "movie",
+                created.isoformat(),
+                modified(),
+            )
+            for i, fid in enumerate(film_ids)
+        ),
+    )
+    _copy(
+        pg_conn,
+        "content.genre_film_work (id, film_work_id, genre_id, created)",
+        (
+            (new_id(), fid, gid, created.isoformat())
+            for fid in film_ids
+            for gid in rng.sample(genre_ids, min(scale.genres_per_film, len(genre_ids)))
+        ),
+    )
+    _copy(
+        pg_conn,
+        "content.person_film_work (id, person_id, film_work_id, role, created)",
+        (
+            (new_id(), pid, fid, _role(ix), created.isoformat())
+            for fid in film_ids
+            for ix, pid in enumerate(rng.sample(person_ids, min(scale.cast, len(person_ids))))
+        ),
+    )
+
+    with pg_conn.cursor() as cursor:
+        cursor.execute("ANALYZE;")
+    pg_conn.commit()
+
+
+def touch_catalogue(pg_conn: PgConnection, share: float, seed: int = 42) -> Tuple[int, int]:
+    """Обновляет modified у доли фильмов и персон, как если бы их отредактировали."""
+    with pg_conn.cursor() as cursor:
+        cursor.execute("SELECT setseed(%s);", (seed % 1000 / 1000,))
+        cursor.execute("UPDATE content.film_work SET modified = now() WHERE random() < %s;", (share,))
+        films = cursor.rowcount
+        cursor.execute("UPDATE content.person SET modified = now() WHERE random() < %s;", (share,))
+        persons = cursor.rowcount
+    pg_conn.commit()
+    return films, persons
+
+
+def _role(ix: int) -> str:
+    if ix == 0:
+        return "director"
+    return "writer" if ix < 3 else "actor"
+
+
+def _copy(pg_conn: PgConnection, table: str, rows: Iterable[Tuple[str, ...]]) -> None:
+    with pg_conn.cursor() as cursor:
+        for chunk in _chunks(rows):
+            buffer = io.StringIO("".join("\t".join(row) + "\n" for row in chunk))
+            cursor.copy_expert(f"COPY {table} FROM STDIN;", buffer)
+    pg_conn.commit()
+
+
+def _chunks(rows: Iterable[Tuple[str, ...]]) -> Iterator[List[Tuple[str, ...]]]:
+    chunk: List[Tuple[str, ...]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == COPY_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
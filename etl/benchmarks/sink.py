@@ -0,0 +1,46 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, List
+
+import orjson
+from elasticsearch import Elasticsearch
+
+
+class RecordingElasticsearch(Elasticsearch):
+    """
+    Заменяет кластер в бенчмарках: принимает bulk запросы, считает документы и байты
+    и отвечает успехом после заданной задержки, никуда не отправляя данные.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__("http://localhost:9200")
+        self.latency = latency
+        self.requests = 0
+        self.documents = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def options(self, **kwargs: Any) -> "RecordingElasticsearch":
+        return self
+
+    def ping(self, **kwargs: Any) -> bool:
+        return True
+
+    def bulk(self, *, operations: List[bytes], **kwargs: Any) -> SimpleNamespace:  # type: ignore[override]
+        items = []
+        # Строки запроса чередуются: заголовок действия и тело документа
+        for header in operations[::2]:
+            action = orjson.loads(header)
+            op_type, meta = action.popitem()
+            items.append({op_type: {"_index": meta.get("_index"), "_id": meta.get("_id"), "status": 201}})
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.requests += 1
+            self.documents += len(items)
+            self.bytes += sum(len(line) + 1 for line in operations)
+
+        return SimpleNamespace(body={"took": 0, "errors": False, "items": items})
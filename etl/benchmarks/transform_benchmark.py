@@ -0,0 +1,150 @@
+"""
+Сравнение стадии transform с предыдущей реализацией по CPU на строку и пиковой памяти.
+
+Обе реализации получают одни и те же синтетические строки пачками, как от extract,
+а результат доводится до байтов, которые уходят в bulk запрос: у старой реализации
+словари сериализует клиент elasticsearch, новая отдает готовые байты.
+
+Пример (из каталога etl): python -m benchmarks.transform_benchmark --rows 1000000
+"""
+
+import argparse
+import time
+import tracemalloc
+import uuid
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+from elasticsearch.serializer import JsonSerializer
+from transform import transform_movies_data
+
+
+class LegacyMovie:
+    """Копия Movie до перехода на __slots__ и потоковую сериализацию."""
+
+    def __init__(self, movie_id, title, description, rating, file, genres, directors=None, actors=None, writers=None):
+        self.id = movie_id
+        self.title = title
+        self.description = description
+        self.imdb_rating = rating
+        self.genres = genres
+        self.file = file
+        self.directors = directors if directors is not None else []
+        self.actors = actors if actors is not None else []
+        self.writers = writers if writers is not None else []
+        self.directors_names = [director["name"] for director in self.directors]
+        self.actors_names = [actor["name"] for actor in self.actors]
+        self.writers_names = [writer["name"] for writer in self.writers]
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "imdb_rating": self.imdb_rating,
+            "genres": self.genres,
+            "directors": self.directors,
+            "actors": self.actors,
+            "writers": self.writers,
+            "directors_names": self.directors_names,
+            "actors_names": self.actors_names,
+            "writers_names": self.writers_names,
+        }
+
+
+def legacy_transform_movies_data(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    movies = []
+    for row in batch:
+        movie = LegacyMovie(
+            movie_id=row["id"],
+            title=row["title"],
+            description=row["description"],
+            rating=row["rating"],
+            file=row["file"],
+            genres=row["genres"],
+            directors=row["directors"],
+            actors=row["actors"],
+            writers=row["writers"],
+        )
+        movies.append(movie.to_dict())
+    return movies
+
+
+def synthetic_movies(count: int, cast: int) -> Iterator[Dict[str, Any]]:
+    """Строки в том виде, в котором их отдает enrich_movies."""
+    genres = [{"id": str(uuid.uuid4()), "name": f"Genre {i}"} for i in range(20)]
+    persons = [{"id": str(uuid.uuid4()), "name": f"Person {i}"} for i in range(1000)]
+    for i in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "title": f"Movie {i}",
+            "description": f"Description of movie {i} " * 5,
+            "rating": (i % 100) / 10,
+            "file": None,
+            # enrich_movies собирает новые словари для каждого фильма
+            "genres": [dict(genre) for genre in genres[i % 18: i % 18 + 3]],
+            "directors": [dict(person) for person in persons[i % 997: i % 997 + 1]],
+            "actors": [dict(person) for person in persons[i % 990: i % 990 + cast]],
+            "writers": [dict(person) for person in persons[i % 995: i % 995 + 2]],
+        }
+
+
+def run_legacy(batch: List[Dict[str, Any]]) -> int:
+    # Загрузчик держит документы пачки до конца bulk запроса, поэтому результат материализуется
+    serializer = JsonSerializer()
+    documents = legacy_transform_movies_data(batch)
+    return sum(len(serializer.dumps(doc)) for doc in documents)
+
+
+def run_streaming(batch: List[Dict[str, Any]]) -> int:
+    # Загрузчик читает документы по мере отправки и держит только те, что еще в полете
+    return sum(len(doc.source) for doc in transform_movies_data(batch))
+
+
+def measure(
+    name: str,
+    run: Callable[[List[Dict[str, Any]]], int],
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int,
+    memory_batches: int,
+) -> None:
+    rows = iter(rows)
+    total_rows = total_bytes = 0
+    cpu = 0.0
+    peak = 0
+
+    while batch := list(islice(rows, batch_size)):
+        # Учитываем только время самой стадии, без генерации входных строк
+        started = time.process_time()
+        total_bytes += run(batch)
+        cpu += time.process_time() - started
+
+        # tracemalloc сильно замедляет выделение памяти, поэтому память меряется отдельным прогоном
+        if memory_batches > 0:
+            memory_batches -= 1
+            tracemalloc.start()
+            run(batch)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        total_rows += len(batch)
+
+    print(
+        f"{name:<10} rows={total_rows} cpu/row={cpu / total_rows * 1e6:.2f}us "
+        f"peak/batch={peak / 1024 / 1024:.2f}MiB bytes={total_bytes}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Transform stage micro-benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--cast", type=int, default=8, help="Actors per movie")
+    parser.add_argument("--memory-batches", type=int, default=10, help="Batches to trace for peak memory")
+    args = parser.parse_args()
+
+    for name, run in (("legacy", run_legacy), ("streaming", run_streaming)):
+        measure(name, run, synthetic_movies(args.rows, args.cast), args.batch_size, args.memory_batches)
+
+
+if __name__ == "__main__":
+    main()
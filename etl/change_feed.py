@@ -0,0 +1,99 @@
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Set
+
+import psycopg2
+from db.connections import postgres_dsl
+from decorators import backoff
+from psycopg2 import sql
+from psycopg2.extensions import connection as PgConnection
+from settings import Settings
+
+# Изменения по таблицам: имя таблицы -> id измененных записей
+Changes = Dict[str, Set[str]]
+
+
+class ChangeFeed:
+    """
+    Слушает уведомления Postgres об изменениях и сразу передает id измененных записей обработчику.
+    Уведомления, пришедшие за debounce секунд, обрабатываются одной пачкой.
+    Периодический опрос по позициям остается страховкой: он подберет все, что feed пропустил, пока был отключен.
+    Функция и триггеры, публикующие изменения, создаются один раз в postgres_init/movies_database.ddl,
+    так что роли ETL достаточно права на LISTEN.
+    """
+
+    def __init__(self, settings: Settings, handler: Callable[[Changes], None]) -> None:
+        self._settings = settings
+        self._handler = handler
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="etl-change-feed", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def join(self, timeout: float | None = None) -> None:
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                conn = self._listen()
+                try:
+                    self._consume(conn)
+                finally:
+                    conn.close()
+            except Exception:
+                logging.exception("Change feed failed, reconnecting")
+                self._stop_event.wait(self._settings.delay)
+
+    @backoff()
+    def _listen(self) -> PgConnection:
+        conn = psycopg2.connect(**postgres_dsl(self._settings))
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("LISTEN {};").format(sql.Identifier(self._settings.change_feed_channel)))
+        except Exception:
+            conn.close()
+            raise
+        logging.warning(f"Listening for content changes on channel '{self._settings.change_feed_channel}'")
+        return conn
+
+    def _consume(self, conn: PgConnection) -> None:
+        while not self._stop_event.is_set():
+            changes: Changes = defaultdict(set)
+            self._collect(conn, changes, timeout=1)
+            if not changes:
+                continue
+
+            # Даем накопиться уведомлениям от той же транзакции или серии правок
+            deadline = time.monotonic() + self._settings.change_feed_debounce
+            while (left := deadline - time.monotonic()) > 0 and _size(changes) < self._settings.batch_size:
+                self._collect(conn, changes, timeout=left)
+
+            try:
+                self._handler(changes)
+            except Exception:
+                logging.exception("Failed to apply content changes, they will be picked up by polling")
+
+    @staticmethod
+    def _collect(conn: PgConnection, changes: Changes, timeout: float) -> None:
+        if select.select([conn], [], [], timeout) == ([], [], []):
+            return
+        conn.poll()
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            payload = json.loads(notify.payload)
+            if payload.get("id"):
+                changes[payload["table"]].add(payload["id"])
+
+
+def _size(changes: Changes) -> int:
+    return sum(len(ids) for ids in changes.values())
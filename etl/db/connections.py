@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import psycopg2
+from decorators import backoff
+from elasticsearch import Elasticsearch
+from psycopg2.extensions import connection as PgConnection
+from psycopg2.extras import DictCursor
+from psycopg2.pool import ThreadedConnectionPool
+from settings import Settings
+
+
+class ConnectionManager:
+    """
+    Долгоживущие подключения ETL процесса: пул соединений Postgres и общий клиент Elasticsearch.
+    Соединения переиспользуются между циклами. Перед выдачей они проверяются не чаще
+    раза в connection_check_interval, а не на каждый запрос: соединение, на котором
+    произошла ошибка, и так отбрасывается и будет создано заново.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self._settings = settings
+        self._lock = threading.Lock()
+        self._pool: ThreadedConnectionPool | None = None
+        self._es: Elasticsearch | None = None
+        self._es_checked_at: float | None = None
+        # Время последней проверки каждого соединения пула
+        self._pg_checked_at: dict[PgConnection, float] = {}
+
+    @contextmanager
+    def postgres(self) -> Iterator[PgConnection]:
+        """Выдает соединение из пула и возвращает его обратно после использования."""
+        pool, conn = self._acquire_postgres()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            close = broken or bool(conn.closed)
+            if close:
+                with self._lock:
+                    self._pg_checked_at.pop(conn, None)
+            if not pool.closed:
+                pool.putconn(conn, close=close)
+
+    @backoff()
+    def elastic(self) -> Elasticsearch:
+        """Возвращает общий клиент Elasticsearch, пересоздавая его, если кластер недоступен."""
+        with self._lock:
+            if self._es is None:
+                # Клиент держит пул keep-alive соединений и безопасен для использования из разных потоков
+                self._es = Elasticsearch(
+                    self._settings.elastic_url,
+                    connections_per_node=self._settings.elastic_connections_per_node,
+                )
+                self._es_checked_at = None
+            es = self._es
+            if not self._due_check(self._es_checked_at):
+                return es
+            self._es_checked_at = time.monotonic()
+
+        if not es.ping():
+            with self._lock:
+                if self._es is es:
+                    self._es = None
+            es.close()
+            raise ConnectionError(f"Elasticsearch {self._settings.elastic_url} is not available")
+
+        return es
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._pg_checked_at.clear()
+            if self._es is not None:
+                self._es.close()
+                self._es = None
+        logging.warning("ETL connections closed")
+
+    @backoff()
+    def _acquire_postgres(self) -> tuple[ThreadedConnectionPool, PgConnection]:
+        pool = self._get_pool()
+        conn = pool.getconn()
+        with self._lock:
+            checked_at = self._pg_checked_at.get(conn)
+        if not conn.closed and not self._due_check(checked_at):
+            return pool, conn
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+        except psycopg2.Error:
+            with self._lock:
+                self._pg_checked_at.pop(conn, None)
+            pool.putconn(conn, close=True)
+            raise
+        with self._lock:
+            self._pg_checked_at[conn] = time.monotonic()
+        return pool, conn
+
+    def _due_check(self, checked_at: float | None) -> bool:
+        return checked_at is None or time.monotonic() - checked_at >= self._settings.connection_check_interval
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(
+                    minconn=1,
+                    maxconn=self._settings.postgres_pool_size,
+                    cursor_factory=DictCursor,
+                    **postgres_dsl(self._settings),
+                )
+            return self._pool
+
+
+def postgres_dsl(settings: Settings) -> dict:
+    return {
+        "dbname": settings.postgres_dbname,
+        "user": settings.postgres_user,
+        "password": settings.postgres_password,
+        "host": settings.postgres_host,
+        "port": settings.postgres_port,
+        "options": "-c search_path=content",
+    }
@@ -12,3 +12,11 @@ def connect() -> Redis:
     settings = RedisSettings()
     client = Redis(host=settings.host, port=settings.port, decode_responses=True)
     return client
+
+
+# Версия индекса входит в ключи кеша API: после увеличения старые ответы перестают использоваться
+CACHE_VERSION_KEY = "cache_version:{index}"
+
+
+def bump_cache_version(client: Redis, index: str) -> int:
+    return client.incr(CACHE_VERSION_KEY.format(index=index))
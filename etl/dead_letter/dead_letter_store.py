@@ -0,0 +1,28 @@
+from abc import ABC, abstractmethod
+from datetime import UTC, datetime
+from typing import Any, Dict, List
+
+
+class BaseDeadLetterStore(ABC):
+    """Хранилище документов, которые кластер отказался принять и повтор не поможет."""
+
+    @abstractmethod
+    def put(self, entries: List[Dict[str, Any]]) -> None:
+        pass
+
+    @abstractmethod
+    def retrieve(self) -> List[Dict[str, Any]]:
+        pass
+
+
+def dead_letter_entry(index_name: str, error: Dict[str, Any]) -> Dict[str, Any]:
+    """Запись о документе, отклоненном при загрузке в индекс, вместе с его телом."""
+    source = error.get("_source")
+    return {
+        "index": index_name,
+        "id": error.get("_id"),
+        "status": error.get("status"),
+        "error": error.get("error"),
+        "source": source.decode() if isinstance(source, bytes) else source,
+        "failed_at": datetime.now(UTC).isoformat(),
+    }
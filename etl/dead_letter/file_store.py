@@ -0,0 +1,26 @@
+import json
+import os
+from typing import Any, Dict, List
+
+from .dead_letter_store import BaseDeadLetterStore
+
+
+class JsonLinesDeadLetterStore(BaseDeadLetterStore):
+    """Дописывает записи в файл по одной JSON строке, файл только растет."""
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+
+    def put(self, entries: List[Dict[str, Any]]) -> None:
+        if not entries:
+            return
+        with open(self.file_path, "a") as file:
+            file.writelines(json.dumps(entry, default=str) + "\n" for entry in entries)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def retrieve(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.file_path):
+            return []
+        with open(self.file_path, "r") as file:
+            return [json.loads(line) for line in file if line.strip()]
@@ -0,0 +1,28 @@
+import json
+from typing import Any, Dict, List
+
+from redis import Redis
+
+from .dead_letter_store import BaseDeadLetterStore
+
+REDIS_DEAD_LETTER_KEY = "etl_dead_letter"
+
+
+class RedisDeadLetterStore(BaseDeadLetterStore):
+    """Хранит записи в списке Redis, самые старые вытесняются после max_length записей."""
+
+    def __init__(self, redis_adapter: Redis, max_length: int) -> None:
+        self.redis_adapter = redis_adapter
+        self.max_length = max_length
+
+    def put(self, entries: List[Dict[str, Any]]) -> None:
+        if not entries:
+            return
+        with self.redis_adapter.pipeline() as pipe:
+            pipe.rpush(REDIS_DEAD_LETTER_KEY, *(json.dumps(entry, default=str) for entry in entries))
+            pipe.ltrim(REDIS_DEAD_LETTER_KEY, -self.max_length, -1)
+            pipe.execute()
+
+    def retrieve(self) -> List[Dict[str, Any]]:
+        values = self.redis_adapter.lrange(REDIS_DEAD_LETTER_KEY, 0, -1)
+        return [json.loads(value) for value in values]  # type: ignore[union-attr]
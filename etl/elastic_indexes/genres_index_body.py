@@ -53,6 +53,25 @@ genres_index_body = {
                 "type": "text",
                 "analyzer": "ru_en"
             },
+            "films_count": {
+                "type": "integer"
+            },
+            "top_films": {
+                "type": "object",
+                "dynamic": "strict",
+                "properties": {
+                    "id": {
+                        "type": "keyword"
+                    },
+                    "title": {
+                        "type": "text",
+                        "analyzer": "ru_en"
+                    },
+                    "imdb_rating": {
+                        "type": "float"
+                    }
+                }
+            },
         }
     }
 }
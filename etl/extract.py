@@ -1,101 +1,319 @@
-from typing import Any, Dict, Generator, List
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Generator, Iterable, List, Set
 
-import psycopg2
-from decorators import backoff
-from psycopg2.extensions import connection as PgConnection
 from psycopg2.extras import DictCursor
 from settings import Settings
+from state.state import State, Watermark
 
 settings = Settings()
 
+# Нижняя граница id для keyset пагинации: с ней в выборку попадают все записи с modified == watermark.
+# Используется, когда для позиции известна только дата
+ZERO_UUID = "00000000-0000-0000-0000-000000000000"
 
-@backoff()
-def psycopg2_connection() -> PgConnection:
-    """Создает подключение к базе данных Postgres."""
-    dsl = {
-        "dbname": settings.postgres_dbname,
-        "user": settings.postgres_user,
-        "password": settings.postgres_password,
-        "host": settings.postgres_host,
-        "port": settings.postgres_port,
-        "options": "-c search_path=content",
-    }
-    return psycopg2.connect(**dsl, cursor_factory=DictCursor)
+# Таблицы, изменения в которых приводят к переиндексации фильмов.
+# Для каждой указан запрос, который переводит id измененных записей в id фильмов.
+# Первой указана собственная таблица индекса, ее записи и есть документы индекса.
+MOVIES_PRODUCERS: Dict[str, str | None] = {
+    "film_work": None,
+    "genre": "SELECT DISTINCT film_work_id FROM genre_film_work WHERE genre_id = ANY(%s::uuid[]);",
+    "person": "SELECT DISTINCT film_work_id FROM person_film_work WHERE person_id = ANY(%s::uuid[]);",
+}
 
+# Источники индексов жанров и персон: документы хранят фильмы, поэтому зависят и от их изменений
+GENRES_PRODUCERS: Dict[str, str | None] = {
+    "genre": None,
+    "film_work": "SELECT DISTINCT genre_id FROM genre_film_work WHERE film_work_id = ANY(%s::uuid[]);",
+}
+PERSONS_PRODUCERS: Dict[str, str | None] = {
+    "person": None,
+    "film_work": "SELECT DISTINCT person_id FROM person_film_work WHERE film_work_id = ANY(%s::uuid[]);",
+}
 
-def extract_movies_data(pg_conn, state, batch_size) -> Generator[List[Dict[str, Any]], None, None]:
-    """Извлекает данные о фильмах из базы данных Postgres."""
+LINK_TABLES = ("genre_film_work", "person_film_work")
 
-    last_modified_date = state.get_state("last_modified_movies") or settings.initial_date
+PERSON_ROLES = {"director": "directors", "actor": "actors", "writer": "writers"}
 
-    # FIXME: Тут мы выбираем всю базу разом. Курсор должен быть Server side (просто удалить DictCursor)
-    # и сам запрос очень сложный, лучше сделать 3-4 отдельных запроса
-    with pg_conn.cursor() as cursor:
-        query = """
-            SELECT fw.id,
-                   fw.title,
-                   fw.description,
-                   fw.rating,
-                   fw.file,
-                   array_agg(DISTINCT jsonb_build_object('id', g.id, 'name', g.name)) AS genres,
-                   array_agg(DISTINCT jsonb_build_object('id', p.id, 'name', p.full_name))
-                   FILTER (WHERE pfw.role = 'director') AS directors,
-                   array_agg(DISTINCT jsonb_build_object('id', p.id, 'name', p.full_name))
-                   FILTER (WHERE pfw.role = 'actor') AS actors,
-                   array_agg(DISTINCT jsonb_build_object('id', p.id, 'name', p.full_name))
-                   FILTER (WHERE pfw.role = 'writer') AS writers,
-                   MAX(GREATEST(fw.modified, g.modified, p.modified)) AS last_modified
-            FROM film_work fw
-            LEFT JOIN genre_film_work gfw ON fw.id = gfw.film_work_id
-            LEFT JOIN genre g ON gfw.genre_id = g.id
-            LEFT JOIN person_film_work pfw ON fw.id = pfw.film_work_id
-            LEFT JOIN person p ON pfw.person_id = p.id
-            WHERE fw.modified > %s OR g.modified > %s OR p.modified > %s
-            GROUP BY fw.id
-            ORDER BY last_modified DESC;
-        """
-        cursor.execute(query, (last_modified_date, last_modified_date, last_modified_date))
-
-        while True:
-            batch = cursor.fetchmany(batch_size)
-            if not batch:
-                break
-            yield batch
-
-
-def extract_genres_data(pg_conn, state, batch_size=100) -> Generator[List[Dict[str, Any]], None, None]:
-    """Извлекает данные о жанрах из базы данных Postgres."""
-
-    last_modified_date = state.get_state("last_modified_genres") or settings.initial_date
-    query = """
-        SELECT id, name, description, modified AS last_modified
-        FROM genre
-        WHERE modified > %s
-        ORDER BY modified DESC;
+
+@dataclass
+class ExtractedBatch:
+    """Пачка записей и позиция источника, до которой она была выгружена."""
+
+    state_key: str
+    rows: List[Dict[str, Any]]
+    # None, если после загрузки пачки позицию источника двигать еще нельзя
+    last_modified: datetime | None
+    last_id: str | None = None
+
+
+def extract_movies_data(pg_conn, state, batch_size) -> Generator[ExtractedBatch, None, None]:
+    """
+    Извлекает данные о фильмах из базы данных Postgres.
+
+    Выгрузка идет в три этапа: сначала собираются id измененных фильмов, жанров и персон,
+    затем они переводятся в id затронутых фильмов, и только для этих фильмов
+    узкими запросами дочитываются поля, жанры и участники.
     """
+    yield from _extract_related(pg_conn, state, batch_size, "movies", MOVIES_PRODUCERS, enrich_movies)
+
+
+def _extract_related(
+    pg_conn,
+    state: State,
+    batch_size: int,
+    index: str,
+    producers: Dict[str, str | None],
+    enrich: Callable[[Any, List[str]], List[Dict[str, Any]]],
+) -> Generator[ExtractedBatch, None, None]:
+    """
+    Проходит по таблицам-источникам индекса, переводит id измененных в них записей
+    в id документов индекса и дочитывает документы функцией enrich.
+
+    При полной загрузке (у собственной таблицы индекса еще нет позиции) выгружается только она:
+    остальные источники прошли бы по всем своим записям и загрузили каждый документ повторно.
+    Их позиции, если они не заданы, ставятся на время начала полной загрузки.
+    """
+    own_table = next(iter(producers))
+    legacy_key = f"last_modified_{index}"
+    full_load = not any(state.get_watermark(key) for key in (f"{legacy_key}_{own_table}", legacy_key))
+    started_at = _database_now(pg_conn) if full_load else None
+
+    for table, ids_query in producers.items():
+        state_key = f"{legacy_key}_{table}"
+        if full_load and ids_query is not None:
+            if state.get_watermark(state_key) is None:
+                yield ExtractedBatch(state_key=state_key, rows=[], last_modified=started_at, last_id=ZERO_UUID)
+            continue
+
+        # До разделения на источники у индекса была одна общая позиция
+        watermark = _get_watermark(state, state_key, legacy_key)
+        for changed in _extract_changed(pg_conn, index, table, watermark, batch_size):
+            changed_ids = [row["id"] for row in changed]
+            doc_ids = changed_ids if ids_query is None else _fetch_ids(pg_conn, ids_query, changed_ids)
+
+            chunks = [doc_ids[i: i + batch_size] for i in range(0, len(doc_ids), batch_size)] or [[]]
+            for ix, chunk in enumerate(chunks):
+                # Позиция сдвигается только после загрузки последней части документов
+                is_last = ix == len(chunks) - 1
+                yield ExtractedBatch(
+                    state_key=state_key,
+                    rows=enrich(pg_conn, chunk),
+                    last_modified=changed[-1]["modified"] if is_last else None,
+                    last_id=changed[-1]["id"] if is_last else None,
+                )
+
+
+def enrich_movies(pg_conn, film_ids: List[str]) -> List[Dict[str, Any]]:
+    """Дочитывает поля, жанры и участников фильмов и собирает документы фильмов."""
+    if not film_ids:
+        return []
+
     with pg_conn.cursor() as cursor:
-        cursor.execute(query, (last_modified_date,))
-        while True:
-            batch = cursor.fetchmany(batch_size)
-            if not batch:
-                break
-            yield batch
-
-
-def extract_persons_data(pg_conn, state, batch_size=100) -> Generator[List[Dict[str, Any]], None, None]:
-    """Извлекает данные о персонах из базы данных Postgres."""
-
-    last_modified_date = state.get_state("last_modified_persons") or settings.initial_date
-    query = """
-        SELECT id, full_name, modified AS last_modified
-        FROM person
-        WHERE modified > %s
-        ORDER BY modified DESC;
+        cursor.execute(
+            "SELECT id, title, description, rating, file FROM film_work WHERE id = ANY(%s::uuid[]);",
+            (film_ids,),
+        )
+        movies = {
+            row["id"]: {**row, "genres": {}, "directors": {}, "actors": {}, "writers": {}} for row in cursor.fetchall()
+        }
+
+        cursor.execute(
+            """
+            SELECT gfw.film_work_id, g.id, g.name
+            FROM genre_film_work gfw
+            JOIN genre g ON g.id = gfw.genre_id
+            WHERE gfw.film_work_id = ANY(%s::uuid[]);
+            """,
+            (film_ids,),
+        )
+        for row in cursor.fetchall():
+            if movie := movies.get(row["film_work_id"]):
+                movie["genres"][row["id"]] = {"id": row["id"], "name": row["name"]}
+
+        cursor.execute(
+            """
+            SELECT pfw.film_work_id, pfw.role, p.id, p.full_name
+            FROM person_film_work pfw
+            JOIN person p ON p.id = pfw.person_id
+            WHERE pfw.film_work_id = ANY(%s::uuid[]);
+            """,
+            (film_ids,),
+        )
+        for row in cursor.fetchall():
+            movie = movies.get(row["film_work_id"])
+            role = PERSON_ROLES.get(row["role"])
+            if movie and role:
+                movie[role][row["id"]] = {"id": row["id"], "name": row["full_name"]}
+
+    for movie in movies.values():
+        for field in ("genres", *PERSON_ROLES.values()):
+            movie[field] = list(movie[field].values())
+
+    return list(movies.values())
+
+
+def enrich_persons(pg_conn, person_ids: List[str]) -> List[Dict[str, Any]]:
+    """Дочитывает персон вместе с фильмами, в которых они участвовали, и их ролями."""
+    if not person_ids:
+        return []
+
+    with pg_conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT id, full_name, modified AS last_modified FROM person WHERE id = ANY(%s::uuid[]);",
+            (person_ids,),
+        )
+        persons = {row["id"]: {**row, "films": {}} for row in cursor.fetchall()}
+
+        cursor.execute(
+            """
+            SELECT person_id, film_work_id, role
+            FROM person_film_work
+            WHERE person_id = ANY(%s::uuid[])
+            ORDER BY film_work_id;
+            """,
+            (person_ids,),
+        )
+        for row in cursor.fetchall():
+            person = persons.get(row["person_id"])
+            role = PERSON_ROLES.get(row["role"])
+            if person and role:
+                film = person["films"].setdefault(row["film_work_id"], {"id": row["film_work_id"], "roles": []})
+                if role not in film["roles"]:
+                    film["roles"].append(role)
+
+    for person in persons.values():
+        person["films"] = list(person["films"].values())
+
+    return list(persons.values())
+
+
+def enrich_genres(pg_conn, genre_ids: List[str]) -> List[Dict[str, Any]]:
+    """Дочитывает жанры вместе с количеством фильмов и лучшими по рейтингу фильмами жанра."""
+    if not genre_ids:
+        return []
+
+    with pg_conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT id, name, description, modified AS last_modified FROM genre WHERE id = ANY(%s::uuid[]);",
+            (genre_ids,),
+        )
+        genres = {row["id"]: {**row, "films_count": 0, "top_films": []} for row in cursor.fetchall()}
+
+        cursor.execute(
+            """
+            SELECT genre_id, count(*)
+            FROM genre_film_work
+            WHERE genre_id = ANY(%s::uuid[])
+            GROUP BY genre_id;
+            """,
+            (genre_ids,),
+        )
+        for genre_id, films_count in cursor.fetchall():
+            if genre := genres.get(genre_id):
+                genre["films_count"] = films_count
+
+        cursor.execute(
+            """
+            SELECT g.id AS genre_id, fw.id, fw.title, fw.rating
+            FROM unnest(%s::uuid[]) AS g(id)
+            CROSS JOIN LATERAL (
+                SELECT fw.id, fw.title, fw.rating
+                FROM genre_film_work gfw
+                JOIN film_work fw ON fw.id = gfw.film_work_id
+                WHERE gfw.genre_id = g.id
+                ORDER BY fw.rating DESC NULLS LAST, fw.id
+                LIMIT %s
+            ) fw;
+            """,
+            (genre_ids, settings.genre_top_films),
+        )
+        for row in cursor.fetchall():
+            if genre := genres.get(row["genre_id"]):
+                genre["top_films"].append({"id": row["id"], "title": row["title"], "rating": row["rating"]})
+
+    return list(genres.values())
+
+
+def changed_ids(pg_conn, changes: Dict[str, Iterable[str]], producers: Dict[str, str | None]) -> List[str]:
+    """Переводит id записей, измененных в таблицах контента, в id документов индекса с указанными источниками."""
+    # Уведомления таблиц связей содержат id фильма, для индексов это изменение фильма
+    changes = {
+        **changes,
+        "film_work": {id_ for table in ("film_work", *LINK_TABLES) for id_ in changes.get(table, ())},
+    }
+    ids: Set[str] = set()
+    for table, ids_query in producers.items():
+        if not changes.get(table):
+            continue
+        ids.update(changes[table] if ids_query is None else _fetch_ids(pg_conn, ids_query, changes[table]))
+    return sorted(ids)
+
+
+def extract_genres_data(pg_conn, state, batch_size=100) -> Generator[ExtractedBatch, None, None]:
+    """
+    Извлекает данные о жанрах из базы данных Postgres.
+    Жанр переиндексируется и при изменении его фильмов, так как хранит их количество и лучшие из них.
+    """
+    yield from _extract_related(pg_conn, state, batch_size, "genres", GENRES_PRODUCERS, enrich_genres)
+
+
+def extract_persons_data(pg_conn, state, batch_size=100) -> Generator[ExtractedBatch, None, None]:
     """
+    Извлекает данные о персонах из базы данных Postgres.
+    Персона переиндексируется и при изменении ее фильмов, так как хранит их id и свои роли в них.
+    """
+    yield from _extract_related(pg_conn, state, batch_size, "persons", PERSONS_PRODUCERS, enrich_persons)
+
+
+def _extract_changed(
+    pg_conn, index: str, table: str, watermark: Watermark, batch_size: int
+) -> Generator[List[Dict[str, Any]], None, None]:
+    """Отдает пачками id и modified записей таблицы, измененных после указанной позиции."""
+    query = f"""
+        SELECT id, modified
+        FROM {table}
+        WHERE (modified, id) > (%(modified)s, %(id)s)
+        ORDER BY modified, id;
+    """
+    yield from _stream_query(pg_conn, f"{index}_{table}_cursor", query, watermark._asdict(), batch_size)
+
+
+def _get_watermark(state: State, *keys: str) -> Watermark:
+    """Возвращает позицию по первому найденному ключу или начальную позицию."""
+    for key in keys:
+        if watermark := state.get_watermark(key):
+            return Watermark(watermark.modified, watermark.id or ZERO_UUID)
+    return Watermark(settings.initial_date, ZERO_UUID)
+
+
+def _database_now(pg_conn) -> datetime:
     with pg_conn.cursor() as cursor:
-        cursor.execute(query, (last_modified_date,))
-        while True:
-            batch = cursor.fetchmany(batch_size)
-            if not batch:
-                break
-            yield batch
+        cursor.execute("SELECT now();")
+        now = cursor.fetchone()[0]
+    pg_conn.rollback()
+    return now
+
+
+def _fetch_ids(pg_conn, query: str, ids: Iterable[str]) -> List[str]:
+    with pg_conn.cursor() as cursor:
+        cursor.execute(query, (list(ids),))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _stream_query(
+    pg_conn, cursor_name: str, query: str, params: Dict[str, Any], batch_size: int
+) -> Generator[List[Dict[str, Any]], None, None]:
+    """
+    Выполняет запрос на именованном (server side) курсоре и отдает результат пачками.
+    Строки не накапливаются на клиенте: в памяти одновременно находится не больше одной пачки.
+    """
+    try:
+        with pg_conn.cursor(name=cursor_name, cursor_factory=DictCursor) as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+            while batch := cursor.fetchmany(batch_size):
+                yield batch
+    finally:
+        # Серверный курсор живет внутри транзакции, не оставляем ее открытой между циклами
+        pg_conn.rollback()
@@ -1,4 +1,7 @@
 import logging
+import re
+from copy import deepcopy
+from typing import Any, Dict, List
 
 from elastic_indexes.genres_index_body import genres_index_body
 from elastic_indexes.movies_index_body import movies_index_body
@@ -6,24 +9,105 @@ from elastic_indexes.persons_index_body import persons_index_body
 from elasticsearch import Elasticsearch
 from settings import Settings
 
+settings = Settings()
 
-def initialize_elastic() -> None:
+# Имена, по которым API читает индексы. Это алиасы, указывающие на версионные индексы <имя>_v<N>
+INDEX_BODIES: Dict[str, Dict[str, Any]] = {
+    settings.elastic_index_name_movies: movies_index_body,
+    settings.elastic_index_name_genres: genres_index_body,
+    settings.elastic_index_name_persons: persons_index_body,
+}
+
+
+def initialize_elastic(es_client: Elasticsearch | None = None) -> None:
     """Создает индексы в elastic search, если они не существуют."""
-    settings = Settings()
-    es_client = Elasticsearch(settings.elastic_url)
+    es_client = es_client or Elasticsearch(settings.elastic_url)
+
+    for alias, body in INDEX_BODIES.items():
+        # Индексы, созданные до перехода на алиасы, остаются как есть до первой переиндексации
+        if not es_client.indices.exists(index=alias):
+            index = versioned_index_name(alias, 1)
+            logging.warning(f"создан индекс в elastic search: {index} (alias {alias})")
+            es_client.indices.create(index=index, body={**body, "aliases": {alias: {}}})
+        else:
+            _warn_outdated_mapping(es_client, alias, body)
+
+
+def _warn_outdated_mapping(es_client: Elasticsearch, alias: str, body: Dict[str, Any]) -> None:
+    """
+    Рабочий индекс при старте не меняется: изменения маппинга выкатываются
+    переиндексацией в новую версию (reindex.py) с переключением алиаса.
+    """
+    declared = body["mappings"]["properties"]
+    for index, mapping in es_client.indices.get_mapping(index=alias).items():
+        live = mapping["mappings"].get("properties", {})
+        changed = sorted(name for name, field in declared.items() if live.get(name) != field)
+        if changed:
+            logging.warning(
+                f"маппинг индекса {index} отличается от объявленного ({', '.join(changed)}), "
+                "нужна переиндексация: python reindex.py <index>"
+            )
+
+
+def versioned_index_name(alias: str, version: int) -> str:
+    return f"{alias}_v{version}"
+
+
+def create_build_index(es_client: Elasticsearch, alias: str) -> str:
+    """
+    Создает следующую версию индекса для полной загрузки.
+    Пока индекс наполняется, refresh отключен и реплики не создаются.
+    """
+    versions = [_index_version(alias, index) for index in es_client.indices.get(index=f"{alias}_v*")]
+    index = versioned_index_name(alias, max(versions, default=0) + 1)
+
+    body = deepcopy(INDEX_BODIES[alias])
+    body["settings"].update({"refresh_interval": "-1", "number_of_replicas": 0})
+    es_client.indices.create(index=index, body=body)
+    logging.warning(f"создан индекс для переиндексации: {index}")
+    return index
+
+
+def finish_build_index(es_client: Elasticsearch, alias: str, index: str, keep_old: bool = False) -> None:
+    """
+    Возвращает индексу рабочие настройки, сливает сегменты и атомарно переключает на него алиас.
+    """
+    live_indices = _live_indices(es_client, alias)
+    replicas = None
+    if live_indices:
+        live_settings = es_client.indices.get_settings(index=live_indices[0], name="index.number_of_replicas")
+        replicas = live_settings[live_indices[0]]["settings"]["index"]["number_of_replicas"]
+
+    refresh_interval = INDEX_BODIES[alias]["settings"].get("refresh_interval")
+    es_client.indices.put_settings(
+        index=index,
+        settings={"index": {"refresh_interval": refresh_interval, "number_of_replicas": replicas}},
+    )
+    es_client.indices.refresh(index=index)
+    es_client.indices.forcemerge(index=index, max_num_segments=1)
+
+    actions: List[Dict[str, Any]] = [{"add": {"index": index, "alias": alias}}]
+    if es_client.indices.exists_alias(name=alias):
+        actions = [{"remove": {"index": i, "alias": alias}} for i in live_indices] + actions
+    elif es_client.indices.exists(index=alias):
+        # Индекс без версии занимает имя алиаса, удаляем его в том же атомарном запросе
+        actions = [{"remove_index": {"index": alias}}] + actions
+        live_indices = []
+    es_client.indices.update_aliases(actions=actions)
+    logging.warning(f"алиас {alias} переключен на индекс {index}")
+
+    if not keep_old:
+        for old_index in live_indices:
+            es_client.indices.delete(index=old_index)
+            logging.warning(f"удален индекс {old_index}")
 
-    movies_index = settings.elastic_index_name_movies
-    genres_index = settings.elastic_index_name_genres
-    persons_index = settings.elastic_index_name_persons
 
-    if not es_client.indices.exists(index=movies_index):
-        logging.warning(f"создан индекс в elastic search: {movies_index}")
-        es_client.indices.create(index=movies_index, body=movies_index_body)
+def _live_indices(es_client: Elasticsearch, alias: str) -> List[str]:
+    if not es_client.indices.exists_alias(name=alias):
+        return [alias] if es_client.indices.exists(index=alias) else []
+    return list(es_client.indices.get_alias(name=alias).keys())
 
-    if not es_client.indices.exists(index=genres_index):
-        logging.warning(f"создан индекс в elastic search: {genres_index}")
-        es_client.indices.create(index=genres_index, body=genres_index_body)
 
-    if not es_client.indices.exists(index=persons_index):
-        logging.warning(f"создан индекс в elastic search: {persons_index}")
-        es_client.indices.create(index=persons_index, body=persons_index_body)
+def _index_version(alias: str, index: str) -> int:
+    match = re.fullmatch(rf"{re.escape(alias)}_v(\d+)", index)
+    return int(match.group(1)) if match else 0
@@ -1,14 +1,190 @@
-from typing import Any, Dict, List
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 
-from decorators import backoff
 from elasticsearch import Elasticsearch, helpers
+from settings import Settings
+from transform import Document
 
+settings = Settings()
 
-@backoff()
-def upload_to_elastic(data: List[Dict[str, Any]], es_client: Elasticsearch, index_name: str) -> None:
-    """Загружает данные в ElasticSearch."""
+# Ответы, после которых имеет смысл повторить загрузку документа
+RETRIABLE_STATUSES = {429, 502, 503, 504}
 
-    actions = [{"_index": index_name, "_id": item["id"], "_source": item} for item in data]
 
-    if actions:
-        helpers.bulk(es_client, actions)
+class BulkLoadError(Exception):
+    def __init__(self, index_name: str, errors: List[Dict[str, Any]]) -> None:
+        super().__init__(f"Failed to upload {len(errors)} documents to index '{index_name}'")
+        self.errors = errors
+
+
+@dataclass
+class BulkResult:
+    success: int = 0
+    # Временные ошибки, оставшиеся после всех повторов: пачку стоит загрузить позже целиком
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    # Документы, которые кластер отклонил окончательно, например из-за несоответствия маппингу
+    rejected: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class BulkLoader:
+    """
+    Загружает документы в ElasticSearch несколькими параллельными bulk запросами.
+
+    Размер запроса подстраивается под время ответа кластера и ограничен в байтах,
+    а при частичных ошибках повторно отправляются только не загруженные документы.
+    Если кластер отклоняет запрос целиком, он делится пополам, пока ошибка не сузится
+    до отдельных документов, и остальные документы запроса все же загружаются.
+    """
+
+    def __init__(
+        self,
+        thread_count: int = settings.bulk_thread_count,
+        chunk_size: int = settings.bulk_chunk_size,
+        min_chunk_size: int = settings.bulk_min_chunk_size,
+        max_chunk_size: int = settings.bulk_max_chunk_size,
+        max_chunk_bytes: int = settings.bulk_max_chunk_bytes,
+        target_latency: float = settings.bulk_target_latency,
+        max_retries: int = settings.bulk_max_retries,
+    ) -> None:
+        self.thread_count = thread_count
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+
+    def load(self, es_client: Elasticsearch, documents: Iterable[Document], index_name: str) -> BulkResult:
+        result = BulkResult()
+        # Тело документа уже сериализовано, клиент отправляет байты как есть
+        actions: Iterable[Dict[str, Any]] = (
+            {"_index": index_name, "_id": doc.id, "_source": doc.source} for doc in documents
+        )
+        sleep_time = settings.start_sleep_time
+
+        for attempt in range(self.max_retries + 1):
+            failed = self._send(es_client, actions, result)
+            rejected_requests = [action for action, error in failed.values() if _is_rejected_request(error)]
+            if rejected_requests:
+                failed = {doc_id: f for doc_id, f in failed.items() if not _is_rejected_request(f[1])}
+                failed.update(self._isolate(es_client, rejected_requests, result))
+
+            retriable = {doc_id: failure for doc_id, failure in failed.items() if _is_retriable(failure[1])}
+            result.rejected += [_failure(*f) for doc_id, f in failed.items() if doc_id not in retriable]
+
+            if not retriable:
+                break
+            if attempt == self.max_retries:
+                result.errors += [_failure(*f) for f in retriable.values()]
+                break
+
+            logging.warning(
+                f"Retrying {len(retriable)} documents for index '{index_name}' in {sleep_time} seconds..."
+            )
+            time.sleep(sleep_time)
+            sleep_time = min(sleep_time * settings.factor, settings.border_sleep_time)
+            actions = [action for action, _ in retriable.values()]
+
+        for error in result.errors + result.rejected:
+            logging.error(
+                f"Document '{error.get('_id')}' was not uploaded to index '{index_name}': "
+                f"status={error.get('status')}, error={error.get('error')}"
+            )
+
+        return result
+
+    def _isolate(
+        self, es_client: Elasticsearch, actions: List[Dict[str, Any]], result: BulkResult
+    ) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Повторяет документы отклоненных целиком запросов запросами вдвое меньше.
+        Возвращает ошибки документов, которые не удалось загрузить даже поодиночке.
+        """
+        failed: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        chunk_size = self.chunk_size
+        while actions:
+            chunk_size = max(1, min(chunk_size, len(actions)) // 2)
+            next_actions = []
+            for doc_id, (action, error) in self._send(es_client, actions, result, chunk_size).items():
+                if chunk_size > 1 and _is_rejected_request(error):
+                    next_actions.append(action)
+                else:
+                    failed[doc_id] = (action, error)
+            actions = next_actions
+        return failed
+
+    def _send(
+        self,
+        es_client: Elasticsearch,
+        actions: Iterable[Dict[str, Any]],
+        result: BulkResult,
+        chunk_size: int | None = None,
+    ) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Отправляет документы и возвращает не загруженные: id -> (действие для повтора, ошибка).
+        Документы читаются из actions по мере отправки, а в памяти остаются только
+        те, на которые еще не пришел ответ, и не загруженные.
+        """
+        failed: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        in_flight: Dict[str, Dict[str, Any]] = {}
+
+        def track(source: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            for action in source:
+                in_flight[action["_id"]] = action
+                yield action
+
+        sent = 0
+        started = time.perf_counter()
+        for ok, item in helpers.parallel_bulk(
+            es_client,
+            track(actions),
+            thread_count=self.thread_count,
+            chunk_size=chunk_size or self.chunk_size,
+            max_chunk_bytes=self.max_chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False,
+        ):
+            sent += 1
+            _, info = item.popitem()
+            action = in_flight.pop(str(info.get("_id")), None)
+            if ok:
+                result.success += 1
+            else:
+                # Исключение есть только у ошибок, которыми закончился весь запрос, а не отдельный документ
+                info["request_error"] = info.pop("exception", None) is not None
+                info.pop("data", None)
+                failed[str(info.get("_id"))] = (action, info)
+
+        if sent and chunk_size is None:
+            self._adapt_chunk_size(sent, time.perf_counter() - started)
+        return failed
+
+    def _adapt_chunk_size(self, documents: int, elapsed: float) -> None:
+        """Увеличивает запросы, пока кластер отвечает быстро, и уменьшает их, когда он не успевает."""
+        if documents < self.chunk_size:
+            # Неполный запрос ничего не говорит о том, справится ли кластер с большим
+            return
+
+        waves = math.ceil(math.ceil(documents / self.chunk_size) / self.thread_count)
+        latency = elapsed / waves
+        if latency > self.target_latency:
+            self.chunk_size = max(self.min_chunk_size, self.chunk_size // 2)
+        elif latency < self.target_latency / 2:
+            self.chunk_size = min(self.max_chunk_size, self.chunk_size * 2)
+
+
+def _failure(action: Dict[str, Any], error: Dict[str, Any]) -> Dict[str, Any]:
+    """Ошибка документа вместе с его телом, чтобы документ можно было разобрать и загрузить заново."""
+    return {**error, "_source": action["_source"] if action else None}
+
+
+def _is_rejected_request(error: Dict[str, Any]) -> bool:
+    return bool(error.get("request_error")) and not _is_retriable(error)
+
+
+def _is_retriable(error: Dict[str, Any]) -> bool:
+    status = error.get("status")
+    return status is None or status in RETRIABLE_STATUSES or status >= 500
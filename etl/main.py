@@ -1,51 +1,186 @@
 import logging
-import time
+import signal
 
-from elasticsearch import Elasticsearch
+from change_feed import ChangeFeed, Changes
+from db import redis_utils
+from db.connections import ConnectionManager
+from dead_letter.dead_letter_store import dead_letter_entry
+from dead_letter.file_store import JsonLinesDeadLetterStore
+from dead_letter.redis_store import RedisDeadLetterStore
 from extract import (
+    GENRES_PRODUCERS,
+    MOVIES_PRODUCERS,
+    PERSONS_PRODUCERS,
+    changed_ids,
+    enrich_genres,
+    enrich_movies,
+    enrich_persons,
     extract_genres_data,
     extract_movies_data,
     extract_persons_data,
-    psycopg2_connection,
 )
 from init_elastic_search_index import initialize_elastic
-from load import upload_to_elastic
+from load import BulkLoadError
+from redis.exceptions import RedisError
+from scheduler import Pipeline, Scheduler, prefetch
 from settings import Settings
+from sinks.change_file_sink import ChangeFileSink
+from sinks.elastic_sink import ElasticSink
+from sinks.file_service_uploader import FileServiceUploader
+from sinks.sink import BaseSink
 from state.file_storage import JsonFileStorage
+from state.redis_storage import RedisStorage
 from state.state import State
 from transform import transform_genre_data, transform_movies_data, transform_person_data
 
 settings = Settings()
 
-# TODO: Use redis storage
-state_storage = JsonFileStorage(settings.state_file_path)
-state = State(state_storage)
-initialize_elastic()
+# Клиент подключается к Redis только при первом запросе
+redis_client = redis_utils.connect()
+state_storage = (
+    RedisStorage(redis_client)
+    if settings.state_storage == "redis"
+    else JsonFileStorage(settings.state_file_path)
+)
+dead_letters = (
+    RedisDeadLetterStore(redis_client, settings.dead_letter_max_length)
+    if settings.dead_letter_storage == "redis"
+    else JsonLinesDeadLetterStore(settings.dead_letter_file_path)
+)
+state = State(state_storage, settings.state_checkpoint_interval)
+connections = ConnectionManager(settings)
+
+elastic_sink = ElasticSink(connections)
+# Выгруженные по позициям изменения пишутся во все получатели, elastic первым
+sinks: list[BaseSink] = [elastic_sink]
+if settings.change_files_enabled:
+    uploader = None
+    if settings.file_service_url:
+        uploader = FileServiceUploader(settings.file_service_url, settings.file_service_bucket)
+    sinks.append(ChangeFileSink(settings.change_files_dir, uploader))
+
+# Как по уведомлениям об изменениях найти и дочитать документы индекса
+CHANGE_HANDLERS = {
+    "genres": (GENRES_PRODUCERS, enrich_genres),
+    "persons": (PERSONS_PRODUCERS, enrich_persons),
+    "movies": (MOVIES_PRODUCERS, enrich_movies),
+}
+
 
+def pipeline_delay(delay: int | None) -> int:
+    """Пока изменения приходят через feed, опрос нужен только как редкая страховка"""
+    delay = delay or settings.delay
+    return max(delay, settings.change_feed_poll_delay) if settings.change_feed_enabled else delay
 
-def run_etl_for_table(extract_func, transform_func, index_name):
+
+PIPELINES = [
+    Pipeline("genres", extract_genres_data, transform_genre_data, pipeline_delay(settings.delay_genres)),
+    Pipeline("persons", extract_persons_data, transform_person_data, pipeline_delay(settings.delay_persons)),
+    Pipeline("movies", extract_movies_data, transform_movies_data, pipeline_delay(settings.delay_movies)),
+]
+
+
+def run_etl_for_table(pipeline: Pipeline, etl_state: State = state, index_name: str | None = None) -> int:
     """Выполняет ETL процесс для входящей таблицы и индекса."""
 
-    pg_conn = psycopg2_connection()
-    es_client = Elasticsearch(settings.elastic_url)
+    # Полная загрузка в новую версию индекса при переиндексации не является изменением каталога
+    targets = sinks if index_name is None else [elastic_sink]
+    index_name = index_name or pipeline.name
+    uploaded = 0
+
+    with connections.postgres() as pg_conn:
+        batches = pipeline.extract(pg_conn, etl_state, batch_size=settings.batch_size)
+        for batch in prefetch(batches, settings.pipeline_queue_size):
+            # Если кластер недоступен, позиция не сдвигается и пачка будет загружена повторно в следующем цикле.
+            # Отклоненные документы откладываются в dead letter и пачку не задерживают
+            batch_uploaded = upload(targets, pipeline, batch.rows, index_name)
+            # Версия, которую еще строит переиндексация, API не читает до переключения алиаса
+            if batch_uploaded and index_name == pipeline.name:
+                invalidate_cache(pipeline.name)
+            uploaded += batch_uploaded
+            if batch.last_modified and batch.last_id:
+                etl_state.set_watermark(batch.state_key, batch.last_modified, batch.last_id)
 
-    for batch in extract_func(pg_conn, state, batch_size=300):
-        if batch:
-            last_record = batch[-1]
-            last_modified = last_record["last_modified"].strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
-            transformed_batch = transform_func(batch)
-            if transformed_batch:
-                upload_to_elastic(transformed_batch, es_client, index_name)
-            state.set_state(f"last_modified_{index_name}", last_modified)
-            logging.warning(f"Uploaded {len(transformed_batch)} records to index: '{index_name}'")
+    etl_state.flush()
+    return uploaded
+
+
+def apply_changes(changes: Changes) -> None:
+    """
+    Сразу переиндексирует записи из уведомлений об изменениях, не дожидаясь цикла опроса.
+    Позиции выгрузки не трогает: опрос все равно пройдет по этим записям и ничего не потеряет,
+    а заодно запишет их в файлы изменений, поэтому сюда пишется только elastic.
+    """
+    with connections.postgres() as pg_conn:
+        for pipeline in PIPELINES:
+            producers, enrich = CHANGE_HANDLERS[pipeline.name]
+            ids = changed_ids(pg_conn, changes, producers)
+            uploaded = 0
+            for i in range(0, len(ids), settings.batch_size):
+                rows = enrich(pg_conn, ids[i: i + settings.batch_size])
+                uploaded += upload([elastic_sink], pipeline, rows, pipeline.name)
+            if uploaded:
+                invalidate_cache(pipeline.name)
+        pg_conn.rollback()
+
+
+def invalidate_cache(index_name: str) -> None:
+    """Сдвигает версию индекса в ключах кеша API. Недоступный Redis загрузку не останавливает."""
+    if not settings.cache_invalidation_enabled:
+        return
+    try:
+        redis_utils.bump_cache_version(redis_client, index_name)
+    except RedisError as e:
+        logging.warning(f"Failed to invalidate API cache for index '{index_name}': {e}")
+
+
+def upload(targets: list[BaseSink], pipeline: Pipeline, rows, index_name: str) -> int:
+    """Преобразует записи и передает их получателям. Возвращает количество загруженных в elastic документов."""
+    documents = pipeline.transform(rows)
+    if len(targets) > 1:
+        # Документы читаются каждым получателем, поэтому один раз сохраняются
+        documents = list(documents)
+
+    uploaded = 0
+    for sink in targets:
+        result = sink.write(index_name, documents)
+        if result.rejected:
+            # Повтор не поможет: документ откладывается, чтобы не останавливать индексацию остальных
+            dead_letters.put([dead_letter_entry(index_name, error) for error in result.rejected])
+            logging.error(f"{len(result.rejected)} documents for index '{index_name}' moved to dead letter store")
+            # Следующие получатели (файлы изменений) не должны расходиться с индексом
+            rejected_ids = {error.get("_id") for error in result.rejected}
+            documents = [doc for doc in documents if doc.id not in rejected_ids]
+        if result.errors:
+            raise BulkLoadError(index_name, result.errors)
+        if sink is targets[0]:
+            uploaded = result.success
+    if uploaded:
+        logging.warning(f"Uploaded {uploaded} records to index: '{index_name}'")
+    return uploaded
 
 
 def main():
-    while True:
-        run_etl_for_table(extract_genres_data, transform_genre_data, "genres")
-        run_etl_for_table(extract_persons_data, transform_person_data, "persons")
-        run_etl_for_table(extract_movies_data, transform_movies_data, "movies")
-        time.sleep(settings.delay)
+    initialize_elastic(connections.elastic())
+
+    scheduler = Scheduler(PIPELINES, run_etl_for_table, JsonFileStorage(settings.status_file_path))
+    change_feed = ChangeFeed(settings, apply_changes) if settings.change_feed_enabled else None
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    scheduler.start()
+    if change_feed:
+        change_feed.start()
+    try:
+        scheduler.wait()
+    except KeyboardInterrupt:
+        logging.warning("Stopping ETL...")
+    finally:
+        scheduler.stop()
+        if change_feed:
+            change_feed.stop()
+            change_feed.join()
+        scheduler.join()
+        state.flush()
+        connections.close()
 
 
 if __name__ == "__main__":
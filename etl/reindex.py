@@ -0,0 +1,67 @@
+"""
+Полная переиндексация без простоя.
+
+Новая версия индекса строится в фоне, пока API читает текущую через алиас,
+после чего алиас атомарно переключается на новую версию.
+
+Пример: python reindex.py movies
+"""
+
+import argparse
+import logging
+
+from init_elastic_search_index import create_build_index, finish_build_index, initialize_elastic
+from main import PIPELINES, connections, invalidate_cache, run_etl_for_table
+from scheduler import Pipeline
+from state.memory_storage import MemoryStorage
+from state.state import State
+
+
+def reindex(pipeline: Pipeline, keep_old: bool = False) -> None:
+    es_client = connections.elastic()
+    initialize_elastic(es_client)
+    index = create_build_index(es_client, pipeline.name)
+
+    started_at = _database_now()
+    loaded = run_etl_for_table(pipeline, State(MemoryStorage()), index)
+    logging.warning(f"Loaded {loaded} records to index '{index}'")
+
+    # Изменения, внесенные во время полной загрузки, основной ETL записал в старый индекс
+    caught_up_at = _database_now()
+    run_etl_for_table(pipeline, _state_since(pipeline, started_at), index)
+
+    finish_build_index(es_client, pipeline.name, index, keep_old)
+    invalidate_cache(pipeline.name)
+
+    # И те, что успели попасть в старый индекс, пока алиас еще не был переключен
+    run_etl_for_table(pipeline, _state_since(pipeline, caught_up_at))
+
+
+def _state_since(pipeline: Pipeline, since: str) -> State:
+    return State(MemoryStorage({f"last_modified_{pipeline.name}": since}))
+
+
+def _database_now() -> str:
+    with connections.postgres() as pg_conn:
+        with pg_conn.cursor() as cursor:
+            cursor.execute("SELECT now();")
+            now = cursor.fetchone()[0]
+        pg_conn.rollback()
+    return now.isoformat()
+
+
+def main() -> None:
+    pipelines = {p.name: p for p in PIPELINES}
+    parser = argparse.ArgumentParser(description="Zero downtime full reindex")
+    parser.add_argument("index", choices=list(pipelines))
+    parser.add_argument("--keep-old", action="store_true", help="Do not delete previous index version")
+    args = parser.parse_args()
+
+    try:
+        reindex(pipelines[args.index], args.keep_old)
+    finally:
+        connections.close()
+
+
+if __name__ == "__main__":
+    main()
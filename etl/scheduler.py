@@ -0,0 +1,169 @@
+import logging
+import queue
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from typing import Any, Callable, Dict, Generator, Iterator, List, TypeVar
+
+from state.state_storage import BaseStorage
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+@dataclass
+class Pipeline:
+    """Описание ETL процесса для одного индекса."""
+
+    name: str
+    extract: Callable
+    transform: Callable
+    delay: float
+
+
+@dataclass
+class PipelineStatus:
+    running: bool = False
+    cycles: int = 0
+    last_started: str | None = None
+    last_finished: str | None = None
+    last_records: int = 0
+    total_records: int = 0
+    last_error: str | None = None
+    failures: int = 0
+
+
+@dataclass
+class PipelineWorker:
+    """Поток, который по своему расписанию запускает ETL одного индекса."""
+
+    pipeline: Pipeline
+    runner: Callable[[Pipeline], int]
+    stop_event: threading.Event
+    on_cycle: Callable[[], None]
+    status: PipelineStatus = field(default_factory=PipelineStatus)
+
+    def __post_init__(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=f"etl-{self.pipeline.name}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def join(self, timeout: float | None = None) -> None:
+        self._thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _run(self) -> None:
+        while not self.stop_event.is_set():
+            self.status.running = True
+            self.status.last_started = _now()
+            try:
+                records = self.runner(self.pipeline)
+                self.status.last_records = records
+                self.status.total_records += records
+                self.status.last_error = None
+            except Exception as e:
+                # Ошибка одного индекса не должна останавливать остальные
+                logging.exception(f"ETL for index '{self.pipeline.name}' failed")
+                self.status.last_error = str(e)
+                self.status.failures += 1
+            finally:
+                self.status.running = False
+                self.status.cycles += 1
+                self.status.last_finished = _now()
+                self.on_cycle()
+
+            self.stop_event.wait(self.pipeline.delay)
+
+
+class Scheduler:
+    """
+    Запускает ETL процессы индексов параллельно, каждый в своем потоке и со своей задержкой.
+    Задержка обновления индекса ограничена временем его собственного цикла, а не суммой всех.
+    """
+
+    def __init__(
+        self,
+        pipelines: List[Pipeline],
+        runner: Callable[[Pipeline], int],
+        status_storage: BaseStorage | None = None,
+    ) -> None:
+        self._stop_event = threading.Event()
+        self._status_storage = status_storage
+        self._status_lock = threading.Lock()
+        self._workers = [PipelineWorker(p, runner, self._stop_event, self._save_status) for p in pipelines]
+
+    def start(self) -> None:
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def join(self, timeout: float | None = None) -> None:
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def wait(self) -> None:
+        """Блокирует вызывающий поток, пока планировщик не будет остановлен."""
+        while not self._stop_event.wait(1) and any(w.is_alive() for w in self._workers):
+            pass
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {w.pipeline.name: asdict(w.status) for w in self._workers}
+
+    def _save_status(self) -> None:
+        if self._status_storage is None:
+            return
+        with self._status_lock:
+            self._status_storage.save_state(self.status())
+
+
+def prefetch(source: Iterator[T], maxsize: int) -> Generator[T, None, None]:
+    """
+    Читает source в отдельном потоке и держит наготове не больше maxsize элементов.
+    Пока потребитель загружает одну пачку, следующая уже извлекается, а медленная
+    загрузка останавливает извлечение вместо накопления пачек в памяти.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=maxsize)
+    abort = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not abort.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in source:
+                if not put(item):
+                    break
+            else:
+                put(_DONE)
+        except Exception as e:
+            put(e)
+        finally:
+            if close := getattr(source, "close", None):
+                close()
+
+    producer = threading.Thread(target=produce, name=f"{threading.current_thread().name}-extract", daemon=True)
+    producer.start()
+    try:
+        while (item := buffer.get()) is not _DONE:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        abort.set()
+        producer.join()
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
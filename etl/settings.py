@@ -11,18 +11,71 @@ class Settings(BaseSettings):
     postgres_password: str = Field(..., alias="POSTGRES_PASSWORD")
     postgres_host: str = Field(..., alias="POSTGRES_HOST")
     postgres_port: int = Field(..., alias="POSTGRES_PORT")
+    postgres_pool_size: int = Field(default=5, alias="POSTGRES_POOL_SIZE")
 
     # Elasticsearch settings
     elastic_url: str = Field(..., alias="ELASTIC_URL")
     elastic_index_name_movies: str = Field(default="movies", alias="ELASTIC_INDEX_NAME_MOVIES")
     elastic_index_name_genres: str = Field(default="genres", alias="ELASTIC_INDEX_NAME_GENRES")
     elastic_index_name_persons: str = Field(default="persons", alias="ELASTIC_INDEX_NAME_PERSONS")
+    elastic_connections_per_node: int = Field(default=10, alias="ELASTIC_CONNECTIONS_PER_NODE")
+    # Как часто проверять соединения перед выдачей, секунды. Сломанные соединения отбрасываются сразу после ошибки
+    connection_check_interval: float = Field(default=30, alias="CONNECTION_CHECK_INTERVAL")
+
+    # Bulk loader settings
+    bulk_thread_count: int = Field(default=4, alias="BULK_THREAD_COUNT")
+    bulk_chunk_size: int = Field(default=250, alias="BULK_CHUNK_SIZE")
+    bulk_min_chunk_size: int = Field(default=50, alias="BULK_MIN_CHUNK_SIZE")
+    bulk_max_chunk_size: int = Field(default=2000, alias="BULK_MAX_CHUNK_SIZE")
+    bulk_max_chunk_bytes: int = Field(default=10 * 1024 * 1024, alias="BULK_MAX_CHUNK_BYTES")
+    # Желаемое время ответа на один bulk запрос, секунды
+    bulk_target_latency: float = Field(default=1.0, alias="BULK_TARGET_LATENCY")
+    bulk_max_retries: int = Field(default=5, alias="BULK_MAX_RETRIES")
 
     # General app settings
     initial_date: str = Field(default="1970-01-01", alias="INITIAL_DATE")
     delay: int = Field(default=10, alias="DELAY")
+    # Задержки между циклами отдельных индексов, по умолчанию используется DELAY
+    delay_movies: int | None = Field(default=None, alias="DELAY_MOVIES")
+    delay_genres: int | None = Field(default=None, alias="DELAY_GENRES")
+    delay_persons: int | None = Field(default=None, alias="DELAY_PERSONS")
+    # Сколько лучших по рейтингу фильмов хранить в документе жанра
+    genre_top_films: int = Field(default=10, alias="GENRE_TOP_FILMS")
+    # Размер пачки, извлекаемой из Postgres за один раз
+    batch_size: int = Field(default=1000, alias="BATCH_SIZE")
+    # Сколько извлеченных пачек может ждать загрузки в elastic
+    pipeline_queue_size: int = Field(default=4, alias="PIPELINE_QUEUE_SIZE")
+
+    # Получать изменения из Postgres через LISTEN/NOTIFY и индексировать их сразу, не дожидаясь опроса
+    change_feed_enabled: bool = Field(default=False, alias="CHANGE_FEED_ENABLED")
+    change_feed_channel: str = Field(default="content_changes", alias="CHANGE_FEED_CHANNEL")
+    # Сколько секунд накапливать уведомления перед загрузкой одной пачкой
+    change_feed_debounce: float = Field(default=0.5, alias="CHANGE_FEED_DEBOUNCE")
+    # Интервал страховочного опроса при включенном feed, секунды: подбирает то, что feed пропустил
+    change_feed_poll_delay: int = Field(default=300, alias="CHANGE_FEED_POLL_DELAY")
 
+    # Где хранить состояние ETL: file или redis
+    state_storage: str = Field(default="file", alias="STATE_STORAGE")
     state_file_path: str = Field(default="./etl_state.json", alias="STATE_FILE_PATH")
+    # Как часто позиции выгрузки сбрасываются в хранилище, секунды
+    state_checkpoint_interval: float = Field(default=5, alias="STATE_CHECKPOINT_INTERVAL")
+    status_file_path: str = Field(default="./etl_status.json", alias="STATUS_FILE_PATH")
+
+    # Писать выгруженные изменения в сжатые NDJSON файлы с манифестом для других потребителей каталога
+    change_files_enabled: bool = Field(default=False, alias="CHANGE_FILES_ENABLED")
+    change_files_dir: str = Field(default="./changes", alias="CHANGE_FILES_DIR")
+    # Если задан, файлы изменений дополнительно загружаются в MinIO через file_service
+    file_service_url: str | None = Field(default=None, alias="FILE_SERVICE_URL")
+    file_service_bucket: str = Field(default="catalogue-changes", alias="FILE_SERVICE_BUCKET")
+
+    # Сбрасывать кеш ответов API по индексу после каждой загрузки в него
+    cache_invalidation_enabled: bool = Field(default=True, alias="CACHE_INVALIDATION_ENABLED")
+
+    # Куда откладывать документы, которые elastic отклонил окончательно: file или redis
+    dead_letter_storage: str = Field(default="file", alias="DEAD_LETTER_STORAGE")
+    dead_letter_file_path: str = Field(default="./etl_dead_letter.jsonl", alias="DEAD_LETTER_FILE_PATH")
+    # Сколько последних записей хранить в Redis
+    dead_letter_max_length: int = Field(default=100_000, alias="DEAD_LETTER_MAX_LENGTH")
 
     max_attemts: int = 10
     border_sleep_time: int = 10
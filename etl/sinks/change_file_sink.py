@@ -0,0 +1,76 @@
+import gzip
+import json
+import os
+import threading
+import uuid
+from datetime import UTC, datetime
+from typing import Iterable
+
+from load import BulkResult
+from transform import Document
+
+from .file_service_uploader import FileServiceUploader
+from .sink import BaseSink
+
+MANIFEST_FILE = "manifest.ndjson"
+# Какие изменения индекса есть в файле: только добавление и обновление документов
+MANIFEST_OPERATIONS = ["upsert"]
+
+
+class ChangeFileSink(BaseSink):
+    """
+    Записывает каждую выгруженную пачку изменений в отдельный сжатый NDJSON файл
+    <directory>/<индекс>/<время>-<id>.ndjson.gz, по одному документу индекса на строку.
+
+    Файлы перечислены в manifest.ndjson того же каталога по одной JSON строке в порядке записи.
+    Манифест только дописывается, поэтому запись пачки не зависит от числа уже созданных файлов,
+    а потребителю достаточно запомнить смещение в манифесте, до которого он дочитал. Если задан
+    uploader, файлы дополнительно загружаются в MinIO через file_service, а в строку манифеста
+    пишется их короткое имя.
+
+    В файлы попадают только документы, принятые elastic. Удаления не записываются: ETL не удаляет
+    документы из индекса, об этом сообщает поле operations каждой строки манифеста.
+    """
+
+    def __init__(self, directory: str, uploader: FileServiceUploader | None = None) -> None:
+        self._directory = directory
+        self._uploader = uploader
+        self._lock = threading.Lock()
+
+    def write(self, index_name: str, documents: Iterable[Document]) -> BulkResult:
+        directory = os.path.join(self._directory, index_name)
+        os.makedirs(directory, exist_ok=True)
+        created_at = datetime.now(UTC)
+        file_name = f"{created_at:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}.ndjson.gz"
+        path = os.path.join(directory, file_name)
+
+        records = 0
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wb") as file:
+            for doc in documents:
+                file.write(doc.source)
+                file.write(b"\n")
+                records += 1
+        if not records:
+            os.unlink(tmp_path)
+            return BulkResult()
+        # Потребитель не должен увидеть недописанный файл
+        os.replace(tmp_path, path)
+
+        entry = {
+            "file": file_name,
+            "records": records,
+            "bytes": os.path.getsize(path),
+            "created_at": created_at.isoformat(),
+            "operations": MANIFEST_OPERATIONS,
+        }
+        if self._uploader:
+            entry["short_name"] = self._uploader.upload(path)
+
+        # Строка дописывается целиком под блокировкой, чтобы строки параллельных пачек не перемешались
+        with self._lock, open(os.path.join(directory, MANIFEST_FILE), "a") as manifest:
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            os.fsync(manifest.fileno())
+
+        return BulkResult(success=records)
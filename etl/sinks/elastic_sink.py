@@ -0,0 +1,18 @@
+from typing import Dict, Iterable
+
+from db.connections import ConnectionManager
+from load import BulkLoader, BulkResult
+from transform import Document
+
+from .sink import BaseSink
+
+
+class ElasticSink(BaseSink):
+    def __init__(self, connections: ConnectionManager) -> None:
+        self._connections = connections
+        # У каждого индекса свой загрузчик: размер bulk запроса подбирается под индекс отдельно
+        self._loaders: Dict[str, BulkLoader] = {}
+
+    def write(self, index_name: str, documents: Iterable[Document]) -> BulkResult:
+        loader = self._loaders.setdefault(index_name, BulkLoader())
+        return loader.load(self._connections.elastic(), documents, index_name)
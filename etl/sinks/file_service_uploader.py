@@ -0,0 +1,26 @@
+import os
+
+import urllib3
+from decorators import backoff
+
+
+class FileServiceUploader:
+    """Загружает файлы в MinIO через file_service и возвращает их короткие имена для скачивания."""
+
+    def __init__(self, url: str, bucket: str) -> None:
+        self._url = f"{url.rstrip('/')}/api/v1/files/"
+        self._bucket = bucket
+        self._http = urllib3.PoolManager()
+
+    @backoff()
+    def upload(self, path: str, content_type: str = "application/gzip") -> str:
+        with open(path, "rb") as file:
+            data = file.read()
+        response = self._http.request(
+            "POST",
+            f"{self._url}?bucket={self._bucket}",
+            fields={"file": (os.path.basename(path), data, content_type)},
+        )
+        if response.status >= 300:
+            raise RuntimeError(f"file_service responded {response.status} to upload of '{path}'")
+        return str(response.json()["short_name"])
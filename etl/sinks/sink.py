@@ -0,0 +1,13 @@
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+from load import BulkResult
+from transform import Document
+
+
+class BaseSink(ABC):
+    """Получатель документов, выгруженных ETL. Пачка передается каждому получателю по очереди."""
+
+    @abstractmethod
+    def write(self, index_name: str, documents: Iterable[Document]) -> BulkResult:
+        pass
@@ -1,5 +1,6 @@
 import json
 import os
+import tempfile
 from typing import Any, cast
 
 from .state_storage import BaseStorage
@@ -10,8 +11,18 @@ class JsonFileStorage(BaseStorage):
         self.file_path = file_path
 
     def save_state(self, state: dict[str, Any]) -> None:
-        with open(self.file_path, "w") as file:
-            json.dump(state, file)
+        # Пишем во временный файл и подменяем им старый, чтобы при сбое не остался обрезанный JSON
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(state, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
     def retrieve_state(self) -> dict[str, Any]:
         if os.path.exists(self.file_path):
@@ -0,0 +1,16 @@
+from typing import Any
+
+from .state_storage import BaseStorage
+
+
+class MemoryStorage(BaseStorage):
+    """Хранит состояние только в памяти процесса, например для разовой переиндексации."""
+
+    def __init__(self, state: dict[str, Any] | None = None) -> None:
+        self._state = dict(state or {})
+
+    def save_state(self, state: dict[str, Any]) -> None:
+        self._state = dict(state)
+
+    def retrieve_state(self) -> dict[str, Any]:
+        return dict(self._state)
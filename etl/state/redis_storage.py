@@ -1,21 +1,31 @@
 import json
-from typing import Any, cast
+from typing import Any
 
 from redis import Redis
 
 from .state_storage import BaseStorage
 
-REDIS_STORAGE_KEY = "data"
+REDIS_STORAGE_KEY = "etl_state"
 
 
 class RedisStorage(BaseStorage):
+    """Хранит каждый ключ состояния отдельным полем hash, поэтому запись не переписывает остальные ключи."""
+
     def __init__(self, redis_adapter: Redis):
         self.redis_adapter = redis_adapter
 
     def save_state(self, state: dict[str, Any]) -> None:
-        value = json.dumps(state)
-        self.redis_adapter.set(REDIS_STORAGE_KEY, value)
+        with self.redis_adapter.pipeline() as pipe:
+            pipe.delete(REDIS_STORAGE_KEY)
+            if state:
+                pipe.hset(REDIS_STORAGE_KEY, mapping={key: json.dumps(value) for key, value in state.items()})
+            pipe.execute()
+
+    def update_state(self, values: dict[str, Any]) -> None:
+        if values:
+            mapping = {key: json.dumps(value) for key, value in values.items()}
+            self.redis_adapter.hset(REDIS_STORAGE_KEY, mapping=mapping)
 
     def retrieve_state(self) -> dict[str, Any]:
-        value = self.redis_adapter.get(REDIS_STORAGE_KEY)
-        return cast(dict[str, Any], json.loads(str(value))) if value else {}
+        values = self.redis_adapter.hgetall(REDIS_STORAGE_KEY)
+        return {str(key): json.loads(value) for key, value in values.items()}  # type: ignore[union-attr]
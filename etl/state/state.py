@@ -1,29 +1,66 @@
-from datetime import datetime, timedelta
-from typing import Any
+import threading
+import time
+from datetime import datetime
+from typing import Any, NamedTuple
 
 from .state_storage import BaseStorage
 
 
+class Watermark(NamedTuple):
+    """Позиция выгрузки: последняя обработанная запись в порядке (modified, id)."""
+
+    modified: str
+    id: str | None = None
+
+
 class State:
-    def __init__(self, storage: BaseStorage) -> None:
+    """
+    Состояние ETL с кешем в памяти.
+    Изменения копятся в памяти и сбрасываются в хранилище не чаще, чем раз в checkpoint_interval секунд.
+    """
+
+    def __init__(self, storage: BaseStorage, checkpoint_interval: float = 0) -> None:
         self._storage = storage
+        self._checkpoint_interval = checkpoint_interval
+        # Индексы обрабатываются в разных потоках
+        self._lock = threading.Lock()
+        self._state: dict[str, Any] | None = None
+        self._dirty: dict[str, Any] = {}
+        self._last_flush = time.monotonic()
 
-    def set_state(self, key: str, value: str) -> None:
-        # FIXME: Зачем мы тут парсим время?
-        value_dt = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ")
+    def set_state(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._load()[key] = value
+            self._dirty[key] = value
+            if time.monotonic() - self._last_flush >= self._checkpoint_interval:
+                self._flush()
 
-        # FIXME: Это неправильно, ничего нельзя округлять - мы так пропускам данные
-        # Округляем до следующей полной секунды
-        if value_dt.microsecond > 0:
-            value_dt += timedelta(seconds=1)
-            value_dt = value_dt.replace(microsecond=0)
+    def get_state(self, key: str, default=None) -> Any:
+        with self._lock:
+            return self._load().get(key, default)
 
-        value_str = value_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    def set_watermark(self, key: str, modified: datetime, id: str) -> None:
+        # Время хранится без округления, иначе записи с той же секундой будут пропущены
+        self.set_state(key, {"modified": modified.isoformat(), "id": str(id)})
 
-        state = self._storage.retrieve_state()
-        state[key] = value_str
-        self._storage.save_state(state)
+    def get_watermark(self, key: str) -> Watermark | None:
+        value = self.get_state(key)
+        if isinstance(value, dict):
+            return Watermark(value["modified"], value.get("id"))
+        # Раньше хранилась только дата
+        return Watermark(value) if value else None
 
-    def get_state(self, key: str, default=None) -> Any:
-        state = self._storage.retrieve_state()
-        return state.get(key, default)
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._dirty:
+            self._storage.update_state(self._dirty)
+            self._dirty = {}
+        self._last_flush = time.monotonic()
+
+    def _load(self) -> dict[str, Any]:
+        if self._state is None:
+            self._state = self._storage.retrieve_state()
+        return self._state
@@ -10,3 +10,9 @@ class BaseStorage(ABC):
     @abstractmethod
     def retrieve_state(self) -> dict[str, Any]:
         pass
+
+    def update_state(self, values: Dict[str, Any]) -> None:
+        """Сохраняет изменившиеся ключи, не трогая остальные."""
+        state = self.retrieve_state()
+        state.update(values)
+        self.save_state(state)
@@ -1,9 +1,21 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, NamedTuple
+
+import orjson
+
+
+class Document(NamedTuple):
+    """Документ для загрузки в ElasticSearch: id и уже сериализованное в JSON тело."""
+
+    id: str
+    source: bytes
 
 
 class Movie:
     """Класс для хранения данных фильма."""
 
+    # Без __dict__ у каждого экземпляра: фильмов в пачке тысячи
+    __slots__ = ("id", "title", "description", "imdb_rating", "file", "genres", "directors", "actors", "writers")
+
     def __init__(
         self,
         movie_id: str,
@@ -25,11 +37,9 @@ class Movie:
         self.directors = directors if directors is not None else []
         self.actors = actors if actors is not None else []
         self.writers = writers if writers is not None else []
-        self.directors_names = [director["name"] for director in self.directors]
-        self.actors_names = [actor["name"] for actor in self.actors]
-        self.writers_names = [writer["name"] for writer in self.writers]
 
     def to_dict(self):
+        # Списки имен не хранятся в объекте, а собираются только на время сериализации
         return {
             "id": self.id,
             "title": self.title,
@@ -39,15 +49,14 @@ class Movie:
             "directors": self.directors,
             "actors": self.actors,
             "writers": self.writers,
-            "directors_names": self.directors_names,
-            "actors_names": self.actors_names,
-            "writers_names": self.writers_names,
+            "directors_names": [director["name"] for director in self.directors],
+            "actors_names": [actor["name"] for actor in self.actors],
+            "writers_names": [writer["name"] for writer in self.writers],
         }
 
 
-def transform_movies_data(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def transform_movies_data(batch: Iterable[Dict[str, Any]]) -> Iterator[Document]:
     """Преобразует данные фильмов в формат для загрузки в ElasticSearch."""
-    movies = []
     for row in batch:
         movie = Movie(
             movie_id=row["id"],
@@ -60,26 +69,30 @@ def transform_movies_data(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             actors=row["actors"],
             writers=row["writers"],
         )
-        movies.append(movie.to_dict())
-    return movies
+        yield Document(movie.id, orjson.dumps(movie.to_dict()))
 
 
-def transform_genre_data(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def transform_genre_data(batch: Iterable[Dict[str, Any]]) -> Iterator[Document]:
     """Преобразует данные жанров в формат для загрузки в ElasticSearch."""
-    genres = []
     for row in batch:
-        genre = {"id": row["id"], "name": row["name"], "description": row["description"]}
-        genres.append(genre)
-    return genres
+        genre = {
+            "id": row["id"],
+            "name": row["name"],
+            "description": row["description"],
+            "films_count": row["films_count"],
+            "top_films": [
+                {"id": film["id"], "title": film["title"], "imdb_rating": film["rating"]} for film in row["top_films"]
+            ],
+        }
+        yield Document(row["id"], orjson.dumps(genre))
 
 
-def transform_person_data(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def transform_person_data(batch: Iterable[Dict[str, Any]]) -> Iterator[Document]:
     """Преобразует данные персон в формат для загрузки в ElasticSearch."""
-    persons = []
     for row in batch:
         person = {
             "id": row["id"],
             "full_name": row["full_name"],
+            "films": row["films"],
         }
-        persons.append(person)
-    return persons
+        yield Document(row["id"], orjson.dumps(person))
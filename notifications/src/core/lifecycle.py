@@ -1,7 +1,10 @@
+import asyncio
 import logging.config
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from pymongo.errors import PyMongoError
+from src.db import mongo, mongo_schema
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +17,18 @@ async def lifespan(app: FastAPI):
     """
 
     logger.info("Starting...")
+    # In background, so an unreachable MongoDB doesn't hold the startup for the server selection timeout
+    mongo_indexes = asyncio.create_task(_ensure_mongo_indexes())
 
     yield
 
     logger.info("Finishing...")
+    mongo_indexes.cancel()
+
+
+async def _ensure_mongo_indexes() -> None:
+    try:
+        await mongo_schema.ensure_indexes(mongo.get_mongo())
+    except PyMongoError:
+        # Covers a missing or invalid MONGO_CONNECTION too (ConfigurationError / InvalidURI)
+        logger.exception("Failed to apply MongoDB indexes")
@@ -0,0 +1,64 @@
+"""
+Collections of the notifications database and their indexes.
+
+Indexes are applied once at startup or with `python -m src.db.mongo_schema`,
+so services don't pay create_index round-trips on every call.
+"""
+
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from src.db.mongo import get_mongo
+
+NOTIFICATIONS_DB = "notifications"
+
+NOTIFICATIONS_SCHEDULE = "notifications_schedule"
+NOTIFICATIONS_SENT = "notifications_sent"
+TEMPLATES = "templates"
+
+INDEXES: dict[str, list[IndexModel]] = {
+    NOTIFICATIONS_SCHEDULE: [IndexModel([("next_send", DESCENDING), ("last_sent", DESCENDING)])],
+    NOTIFICATIONS_SENT: [IndexModel([("user", ASCENDING), ("sent_at", DESCENDING)])],
+    TEMPLATES: [IndexModel([("created_at", DESCENDING)])],
+}
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_indexes(mongo: AsyncIOMotorClient) -> bool:
+    """
+    Create declared indexes, existing ones are left as is.
+    Each index is built separately: one that can't be built is logged and skipped,
+    so it doesn't stop the others. Returns False if any index failed.
+    """
+    db = mongo.get_database(NOTIFICATIONS_DB)
+    applied = True
+    for name, indexes in INDEXES.items():
+        collection = db.get_collection(name)
+        for index in indexes:
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                logger.error(
+                    "Failed to create index %s of %s.%s: %s",
+                    index.document["name"],
+                    NOTIFICATIONS_DB,
+                    name,
+                    e.details or e,
+                )
+                applied = False
+
+    return applied
+
+
+async def migrate() -> None:
+    if not await ensure_indexes(get_mongo()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(migrate())
@@ -3,31 +3,29 @@ from uuid import UUID
 
 from bson import ObjectId
 from fastapi import Depends
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from motor.motor_asyncio import AsyncIOMotorClient
 from src import models
+from src.db import mongo_schema
 from src.db.mongo import get_mongo
 
 
 class NotificationsSentService:
     def __init__(self, mongo: AsyncIOMotorClient):
         self._mongo = mongo
+        self._collection = mongo.get_database(mongo_schema.NOTIFICATIONS_DB).get_collection(
+            mongo_schema.NOTIFICATIONS_SENT
+        )
 
     async def add(self, notification: models.NotificationSent) -> None:
-        collection = await self._get_collection()
+        collection = self._collection
         document = NotificationsSentService._to_mongo_document(notification)
         await collection.insert_one(document)
 
     async def get(self, user_id: UUID, limit: int = 10) -> list[models.NotificationSent]:
-        collection = await self._get_collection()
+        collection = self._collection
         cursor = collection.find({"user": str(user_id)}).sort("sent_at", -1).limit(limit)
         return [NotificationsSentService._from_mongo_document(e) async for e in cursor]
 
-    async def _get_collection(self) -> AsyncIOMotorCollection:
-        db = self._mongo.get_database("notifications")
-        collection = db.get_collection("notifications_sent")
-        await collection.create_index({"user": 1, "sent_at": -1})
-        return collection
-
     @staticmethod
     def _to_mongo_document(e: models.NotificationSent) -> dict:
         document = {
@@ -4,9 +4,10 @@ from typing import Annotated
 from bson import ObjectId
 from croniter import croniter
 from fastapi import Depends
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from motor.motor_asyncio import AsyncIOMotorClient
 from src import models
 from src.core.settings import NOTIFICATION_TIMEOUT_SEC
+from src.db import mongo_schema
 from src.db.mongo import get_mongo
 from src.services.templates_service import TemplatesService, get_templates_service
 
@@ -15,6 +16,9 @@ class NotificationsService:
     def __init__(self, mongo: AsyncIOMotorClient, templates: TemplatesService):
         self._mongo = mongo
         self._templates = templates
+        self._collection = mongo.get_database(mongo_schema.NOTIFICATIONS_DB).get_collection(
+            mongo_schema.NOTIFICATIONS_SCHEDULE
+        )
 
     async def create(
         self,
@@ -39,7 +43,7 @@ class NotificationsService:
             status="idle",
         )
         document = NotificationsService._to_mongo_document(notification)
-        collection = await self._get_collection()
+        collection = self._collection
         await collection.insert_one(document)
         return notification
 
@@ -66,12 +70,12 @@ class NotificationsService:
             status="idle",
         )
         document = NotificationsService._to_mongo_document(notification)
-        collection = await self._get_collection()
+        collection = self._collection
         await collection.insert_one(document)
         return notification
 
     async def get_next_for_processing(self) -> models.Notification | None:
-        collection = await self._get_collection()
+        collection = self._collection
         now = datetime.now(UTC)
         found = await collection.find_one_and_update(
             {"next_send": {"$lte": now}, "last_sent": {"$not": {"$gt": "$next_send"}}, "status": "idle"},
@@ -80,7 +84,7 @@ class NotificationsService:
         return NotificationsService._from_mongo_document(found) if found else None
 
     async def confirm(self, notification: models.Notification) -> None:
-        collection = await self._get_collection()
+        collection = self._collection
         next_send = (
             NotificationsService.get_next_schedule(notification.schedule)
             if notification.schedule
@@ -91,12 +95,6 @@ class NotificationsService:
             {"_id": ObjectId(notification.id)}, {"$set": {"status": "idle", "next_send": next_send, "last_sent": now}}
         )
 
-    async def _get_collection(self) -> AsyncIOMotorCollection:
-        db = self._mongo.get_database("notifications")
-        collection = db.get_collection("notifications_schedule")
-        await collection.create_index({"next_send": -1, "last_sent": -1})
-        return collection
-
     @staticmethod
     def get_next_schedule_validated(schedule: models.NotificationSchedule) -> datetime | None:
         if schedule.schedule:
@@ -1,5 +1,10 @@
+import argparse
+import io
+import logging
 import os
 import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
 
 import psycopg2
@@ -10,6 +15,39 @@ from psycopg2.extras import RealDictCursor
 
 load_dotenv()
 
+# from SQLite to Postgres column
+COLUMN_MAPPING = {"created_at": "created", "updated_at": "modified"}
+
+TABLES = [
+    {"name": "film_work", "dataclass": FilmWork, "column_mapping": COLUMN_MAPPING},
+    {"name": "genre", "dataclass": Genre, "column_mapping": COLUMN_MAPPING},
+    {"name": "genre_film_work", "dataclass": GenreFilmWork, "column_mapping": COLUMN_MAPPING},
+    {"name": "person", "dataclass": Person, "column_mapping": COLUMN_MAPPING},
+    {"name": "person_film_work", "dataclass": PersonFilmWork, "column_mapping": COLUMN_MAPPING},
+]
+
+# Внешние ключи схемы content
+FOREIGN_KEYS_QUERY = """
+    SELECT conrelid::regclass::text AS table_name, conname AS name, pg_get_constraintdef(oid) AS definition
+    FROM pg_constraint
+    WHERE contype = 'f' AND connamespace = 'content'::regnamespace;
+"""
+
+# Обычные индексы схемы content: без первичных ключей и уникальных индексов, на них опирается ON CONFLICT
+INDEXES_QUERY = """
+    SELECT indexname AS name, indexdef AS definition
+    FROM pg_indexes
+    WHERE schemaname = 'content' AND indexdef NOT LIKE 'CREATE UNIQUE INDEX%';
+"""
+
+# Таблицы схемы content с включенным триггером уведомлений ETL
+NOTIFY_TRIGGER = "notify_content_change"
+NOTIFY_TRIGGERS_QUERY = """
+    SELECT tgrelid::regclass::text AS table_name
+    FROM pg_trigger JOIN pg_class ON pg_class.oid = tgrelid
+    WHERE tgname = %s AND NOT tgisinternal AND tgenabled <> 'D' AND relnamespace = 'content'::regnamespace;
+"""
+
 
 @contextmanager
 def sqlite_connect(db_path: str):
@@ -60,30 +98,26 @@ def map_columns(row, column_mapping):
     return new_row
 
 
-def load_from_sqlite(sqlite_conn, pg_conn, batch_size=1000):
-    # from SQLite to Postgres column
-    mapping = {"created_at": "created", "updated_at": "modified"}
-    tables = [
-        {
-            "name": "film_work",
-            "dataclass": FilmWork,
-            "column_mapping": mapping,
-        },
-        {"name": "genre", "dataclass": Genre, "column_mapping": mapping},
-        {
-            "name": "genre_film_work",
-            "dataclass": GenreFilmWork,
-            "column_mapping": mapping,
-        },
-        {"name": "person", "dataclass": Person, "column_mapping": mapping},
-        {
-            "name": "person_film_work",
-            "dataclass": PersonFilmWork,
-            "column_mapping": mapping,
-        },
-    ]
+def prepare_rows(table: dict, rows: list) -> list[dict]:
+    """Приводит строки SQLite к колонкам таблицы PostgreSQL."""
+    data = [map_columns(dict(row), table["column_mapping"]) for row in rows]
+    if table["name"] == "film_work":
+        for row in data:
+            row["creation_date"] = row["created"]
+            row["certificate"] = ""
+            row["description"] = ""
+            row["rating"] = 0
+            row["file"] = row.pop("file_path", None)
+
+    if table["name"] == "genre":
+        for row in data:
+            row["description"] = ""
+
+    return data
 
-    for table in tables:
+
+def load_from_sqlite(sqlite_conn, pg_conn, batch_size=1000):
+    for table in TABLES:
         sqlite_cursor = sqlite_conn.cursor()
         sqlite_cursor.execute(f"SELECT * FROM {table['name']};")
 
@@ -92,23 +126,150 @@ def load_from_sqlite(sqlite_conn, pg_conn, batch_size=1000):
             if not rows:
                 break
 
-            data = [map_columns(dict(row), table["column_mapping"]) for row in rows]
-            if table["name"] == "film_work":
-                for row in data:
-                    row["creation_date"] = row["created"]
-                    row["certificate"] = ""
-                    row["description"] = ""
-                    row["rating"] = 0
-                    row["file"] = row.pop("file_path", None)
-
-            if table["name"] == "genre":
-                for row in data:
-                    row["description"] = ""
-
+            data = prepare_rows(table, rows)
             columns = list(data[0].keys()) if data else []
             save_data_to_postgres(pg_conn, table["name"], data, columns)
 
 
+def fast_load_from_sqlite(sqlite_db_path: str, dsl: dict, workers: int, batch_size: int = 10000) -> None:
+    """
+    Быстрая загрузка: таблицы грузятся параллельно в отдельных процессах через COPY,
+    а внешние ключи и обычные индексы снимаются на время загрузки и создаются заново после нее.
+    Триггеры уведомлений ETL на это время выключаются, чтобы не слать NOTIFY на каждую строку.
+    """
+    with pg_connect(dsl) as pg_conn:
+        dropped = _drop_constraints(pg_conn)
+
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(copy_table, sqlite_db_path, dsl, table, batch_size) for table in TABLES]
+            for future in futures:
+                table_name, rows, seconds = future.result()
+                logging.warning(
+                    f"{table_name}: {rows} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:.0f} rows/s)"
+                )
+    except BaseException:
+        # Ограничения возвращаются, даже если загрузка одной из таблиц не удалась,
+        # но ошибка восстановления только логируется, чтобы не скрыть исходную ошибку загрузки
+        try:
+            with pg_connect(dsl) as pg_conn:
+                _restore_constraints(pg_conn, *dropped)
+        except Exception:
+            logging.exception("Failed to restore constraints after a failed load")
+        raise
+
+    with pg_connect(dsl) as pg_conn:
+        _restore_constraints(pg_conn, *dropped)
+
+    logging.warning(f"Loaded all tables in {time.perf_counter() - started:.2f}s")
+
+
+def copy_table(sqlite_db_path: str, dsl: dict, table: dict, batch_size: int) -> tuple[str, int, float]:
+    """
+    Загружает одну таблицу: строки потоком идут через COPY во временную таблицу,
+    откуда одним запросом переносятся в целевую без дублей.
+    """
+    started = time.perf_counter()
+    loaded = 0
+    target = sql.Identifier("content", table["name"])
+
+    with sqlite_connect(sqlite_db_path) as sqlite_conn, pg_connect(dsl) as pg_conn:
+        sqlite_cursor = sqlite_conn.cursor()
+        sqlite_cursor.execute(f"SELECT * FROM {table['name']};")
+
+        with pg_conn.cursor() as pg_cursor:
+            pg_cursor.execute(
+                sql.SQL("CREATE TEMP TABLE staging (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP;").format(target)
+            )
+            columns: list[str] = []
+            while rows := sqlite_cursor.fetchmany(batch_size):
+                data = prepare_rows(table, rows)
+                columns = columns or list(data[0].keys())
+                buffer = io.StringIO("".join("\t".join(_copy_value(row[c]) for c in columns) + "\n" for row in data))
+                pg_cursor.copy_expert(
+                    sql.SQL("COPY staging ({}) FROM STDIN;")
+                    .format(sql.SQL(", ").join(map(sql.Identifier, columns)))
+                    .as_string(pg_conn),
+                    buffer,
+                )
+                loaded += len(data)
+
+            if columns:
+                column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+                pg_cursor.execute(
+                    sql.SQL("INSERT INTO {} ({}) SELECT {} FROM staging ON CONFLICT DO NOTHING;").format(
+                        target, column_list, column_list
+                    )
+                )
+        pg_conn.commit()
+
+    return table["name"], loaded, time.perf_counter() - started
+
+
+def _copy_value(value) -> str:
+    """Значение в текстовом формате COPY."""
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _drop_constraints(pg_conn) -> tuple[list[dict], list[dict], list[str]]:
+    with pg_conn.cursor() as pg_cursor:
+        pg_cursor.execute(FOREIGN_KEYS_QUERY)
+        foreign_keys = pg_cursor.fetchall()
+        pg_cursor.execute(INDEXES_QUERY)
+        indexes = pg_cursor.fetchall()
+        pg_cursor.execute(NOTIFY_TRIGGERS_QUERY, [NOTIFY_TRIGGER])
+        triggers = [row["table_name"] for row in pg_cursor.fetchall()]
+
+        for fk in foreign_keys:
+            logging.warning(f"Dropping {fk['name']} on {fk['table_name']}: {fk['definition']}")
+            pg_cursor.execute(f"ALTER TABLE {fk['table_name']} DROP CONSTRAINT {fk['name']};")
+        for index in indexes:
+            logging.warning(f"Dropping index: {index['definition']}")
+            pg_cursor.execute(sql.SQL("DROP INDEX {};").format(sql.Identifier("content", index["name"])))
+        for table_name in triggers:
+            logging.warning(f"Disabling {NOTIFY_TRIGGER} on {table_name}")
+            pg_cursor.execute(f"ALTER TABLE {table_name} DISABLE TRIGGER {NOTIFY_TRIGGER};")
+    pg_conn.commit()
+    return foreign_keys, indexes, triggers
+
+
+def _restore_constraints(pg_conn, foreign_keys: list[dict], indexes: list[dict], triggers: list[str]) -> None:
+    """
+    Каждый шаг фиксируется отдельно, поэтому ошибка в одном из них логируется и не откатывает остальные.
+    Внешние ключи добавляются как NOT VALID и проверяются по одному: ключ, который не прошел проверку,
+    остается в схеме и действует для новых строк, а нарушающие его строки нужно исправить и запустить
+    VALIDATE CONSTRAINT вручную.
+    """
+    started = time.perf_counter()
+    failed = 0
+    statements = [index["definition"] for index in indexes]
+    statements += [
+        f"ALTER TABLE {fk['table_name']} ADD CONSTRAINT {fk['name']} {fk['definition']} NOT VALID;"
+        for fk in foreign_keys
+    ]
+    statements += [f"ALTER TABLE {fk['table_name']} VALIDATE CONSTRAINT {fk['name']};" for fk in foreign_keys]
+    statements += [f"ALTER TABLE {table_name} ENABLE TRIGGER {NOTIFY_TRIGGER};" for table_name in triggers]
+    statements.append("ANALYZE;")
+
+    with pg_conn.cursor() as pg_cursor:
+        for statement in statements:
+            try:
+                pg_cursor.execute(statement)
+                pg_conn.commit()
+            except psycopg2.Error as e:
+                pg_conn.rollback()
+                failed += 1
+                logging.error(f"Failed to restore: {statement} {e}")
+
+    logging.warning(
+        f"Restored {len(foreign_keys)} foreign keys, {len(indexes)} indexes and {len(triggers)} triggers "
+        f"in {time.perf_counter() - started:.2f}s, {failed} statements failed"
+    )
+
+
 def _ensure_db_exists(database_name: str, dsl: dict[str, str]) -> None:
     default_dsl = {**dsl, "dbname": "postgres"}
     with pg_connect(default_dsl) as pg_conn:
@@ -121,7 +282,14 @@ def _ensure_db_exists(database_name: str, dsl: dict[str, str]) -> None:
 
 
 def main():
-    sqlite_db_path = "db.sqlite"
+    parser = argparse.ArgumentParser(description="Load movies from SQLite into PostgreSQL")
+    parser.add_argument("--sqlite", default="db.sqlite", help="Path to the SQLite database")
+    parser.add_argument("--fast", action="store_true", help="Parallel COPY load with deferred foreign keys and indexes")
+    parser.add_argument("--workers", type=int, default=len(TABLES), help="Worker processes for --fast")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    sqlite_db_path = args.sqlite
     dsl = {
         "dbname": os.environ["ADMIN_POSTGRES_DB"],
         "user": os.environ["POSTGRES_USER"],
@@ -132,8 +300,12 @@ def main():
 
     _ensure_db_exists(os.environ["ADMIN_POSTGRES_DB"], dsl)
 
+    if args.fast:
+        fast_load_from_sqlite(sqlite_db_path, dsl, args.workers, args.batch_size or 10000)
+        return
+
     with sqlite_connect(sqlite_db_path) as sqlite_conn, pg_connect(dsl) as pg_conn:
-        load_from_sqlite(sqlite_conn, pg_conn)
+        load_from_sqlite(sqlite_conn, pg_conn, args.batch_size or 1000)
 
 
 if __name__ == "__main__":
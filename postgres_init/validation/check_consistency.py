@@ -1,6 +1,25 @@
+"""
+Проверка переноса данных из SQLite в PostgreSQL.
+
+Обе базы читаются потоково в порядке первичного ключа. Строки SQLite режутся на чанки
+по CHUNK_SIZE, границы чанков (последний id) применяются и к строкам PostgreSQL,
+и для каждого чанка с обеих сторон считается хеш. Построчно сравниваются только
+диапазоны, хеши которых не совпали, поэтому память ограничена размером чанка.
+Таблицы проверяются параллельно в отдельных процессах.
+"""
+
+import hashlib
+import json
 import re
 import sqlite3
+import time
 import unittest
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Iterable, Iterator
 
 import psycopg2
 from dateutil.parser import parse
@@ -11,21 +30,61 @@ COLUMN_MAPPING = {
     "updated_at": "modified",
 }
 
+DSL = {
+    "dbname": "movies_database",
+    "user": "app",
+    "password": "123qwe",
+    "host": "127.0.0.1",
+    "port": 5432,
+}
+
+SQLITE_PATH = "../db.sqlite"
+
+TABLES = ("film_work", "genre", "genre_film_work", "person", "person_film_work")
+
+CHUNK_SIZE = 10000
+
+# Сколько id расхождений каждого вида сохраняется в отчете
+MAX_REPORTED_IDS = 100
+
+
+@dataclass
+class TableReport:
+    table: str
+    sqlite_rows: int = 0
+    pg_rows: int = 0
+    chunks: int = 0
+    mismatched_chunks: int = 0
+    missing: list = field(default_factory=list)
+    extra: list = field(default_factory=list)
+    different: list = field(default_factory=list)
+    missing_count: int = 0
+    extra_count: int = 0
+    different_count: int = 0
+    seconds: float = 0.0
+
+    @property
+    def consistent(self) -> bool:
+        return not (self.missing_count or self.extra_count or self.different_count)
+
+    def __str__(self) -> str:
+        summary = (
+            f"{self.table}: sqlite={self.sqlite_rows} pg={self.pg_rows} chunks={self.chunks} "
+            f"mismatched_chunks={self.mismatched_chunks} missing={self.missing_count} extra={self.extra_count} "
+            f"different={self.different_count} in {self.seconds:.2f}s"
+        )
+        if self.consistent:
+            return summary
+        return f"{summary}\n  missing: {self.missing}\n  extra: {self.extra}\n  different: {self.different}"
+
 
-def connect_to_sqlite(db_path="../db.sqlite") -> sqlite3.Connection:
+def connect_to_sqlite(db_path=SQLITE_PATH) -> sqlite3.Connection:
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def connect_to_postgresql() -> psycopg2.extensions.connection:
-    dsl = {
-        "dbname": "movies_database",
-        "user": "app",
-        "password": "123qwe",
-        "host": "127.0.0.1",
-        "port": 5432,
-    }
+def connect_to_postgresql(dsl: dict = DSL) -> psycopg2.extensions.connection:
     return psycopg2.connect(**dsl, cursor_factory=DictCursor)
 
 
@@ -38,35 +97,169 @@ def normalize_datetime(value):
     return value
 
 
-def compare_data(sqlite_cursor, pg_cursor, table_name: str, column_mapping: dict) -> bool:
-    sqlite_cursor.execute(f"SELECT * FROM {table_name}")
-    sqlite_data = [dict(row) for row in sqlite_cursor.fetchall()]
-
-    pg_cursor.execute(f"SELECT * FROM content.{table_name}")
-    pg_data = [dict(row) for row in pg_cursor.fetchall()]
-    # print(sqlite_data)
-    # print(pg_data)
-    if len(sqlite_data) != len(pg_data):
-        print(f"Row count mismatch: SQLite has {len(sqlite_data)} rows, PostgreSQL has {len(pg_data)} rows")
-        return False
-
-    for sqlite_row, pg_row in zip(sqlite_data, pg_data):
-        for sqlite_column, sqlite_value in sqlite_row.items():
-            pg_column = column_mapping.get(sqlite_column, sqlite_column)
-            pg_value = pg_row[pg_column]
-
-            # Normalize datetime values before comparison
-            sqlite_value = normalize_datetime(sqlite_value)
-            pg_value = normalize_datetime(pg_value)
-
-            if sqlite_value != pg_value:
-                print(
-                    f"""Mismatch in column '{sqlite_column}': SQLite value \
-                    '{sqlite_value}' != PostgreSQL value '{pg_value}'"""
-                )
-                return False
-
-    return True
+def canonical_value(value):
+    """Приводит значение из любой базы к общему виду для хеширования."""
+    value = normalize_datetime(value)
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).isoformat() if value.tzinfo else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return float(value)
+    return value if value is None else str(value)
+
+
+def row_digest(row: Iterable) -> bytes:
+    return hashlib.blake2b(json.dumps([canonical_value(value) for value in row]).encode(), digest_size=16).digest()
+
+
+def compare_data(
+    sqlite_path: str, dsl: dict, table_name: str, column_mapping: dict = COLUMN_MAPPING, chunk_size: int = CHUNK_SIZE
+) -> TableReport:
+    """Сравнивает таблицу в двух базах по хешам чанков и разбирает построчно только несовпавшие чанки."""
+    started = time.perf_counter()
+    report = TableReport(table_name)
+
+    with closing(connect_to_sqlite(sqlite_path)) as sqlite_conn, closing(connect_to_postgresql(dsl)) as pg_conn:
+        columns = [column[1] for column in sqlite_conn.execute(f"PRAGMA table_info({table_name})")]
+        pg_columns = [column_mapping.get(column, column) for column in columns]
+        key = columns.index("id")
+
+        # Границы чанков задает SQLite: последний id каждого чанка
+        boundaries: list[str] = []
+        sqlite_hashes = []
+        for chunk in _chunks(_sqlite_rows(sqlite_conn, table_name, columns, key, chunk_size), chunk_size):
+            boundaries.append(chunk[-1][0])
+            chunk_hash = hashlib.blake2b(digest_size=16)
+            for _, digest in chunk:
+                chunk_hash.update(digest)
+            sqlite_hashes.append(chunk_hash.digest())
+            report.sqlite_rows += len(chunk)
+
+        # Последний чанк собирает строки PostgreSQL за последней границей
+        pg_hashes = [hashlib.blake2b(digest_size=16) for _ in range(len(boundaries) + 1)]
+        position = 0
+        for row_id, digest in _pg_rows(pg_conn, table_name, pg_columns, key, chunk_size):
+            while position < len(boundaries) and row_id > boundaries[position]:
+                position += 1
+            pg_hashes[position].update(digest)
+            report.pg_rows += 1
+
+        empty = hashlib.blake2b(digest_size=16).digest()
+        report.chunks = len(boundaries)
+        for position, pg_hash in enumerate(pg_hashes):
+            expected = sqlite_hashes[position] if position < len(boundaries) else empty
+            if pg_hash.digest() == expected:
+                continue
+            report.mismatched_chunks += 1
+            lower = boundaries[position - 1] if position > 0 else None
+            upper = boundaries[position] if position < len(boundaries) else None
+            _diff_range(
+                report, sqlite_conn, pg_conn, table_name, columns, pg_columns, key, chunk_size, lower, upper
+            )
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def check_tables(
+    sqlite_path: str = SQLITE_PATH,
+    dsl: dict = DSL,
+    tables: Iterable[str] = TABLES,
+    chunk_size: int = CHUNK_SIZE,
+    workers: int | None = None,
+) -> dict[str, TableReport]:
+    """Проверяет таблицы параллельно, каждую в своем процессе со своими подключениями."""
+    tables = list(tables)
+    with ProcessPoolExecutor(max_workers=workers or len(tables)) as executor:
+        futures = {
+            table: executor.submit(compare_data, sqlite_path, dsl, table, COLUMN_MAPPING, chunk_size)
+            for table in tables
+        }
+        return {table: future.result() for table, future in futures.items()}
+
+
+def _sqlite_rows(
+    sqlite_conn: sqlite3.Connection,
+    table_name: str,
+    columns: list[str],
+    key: int,
+    chunk_size: int,
+    lower: str | None = None,
+    upper: str | None = None,
+) -> Iterator[tuple[str, bytes]]:
+    where, params = _range(lower, upper, "?")
+    query = f"SELECT {', '.join(columns)} FROM {table_name}{where} ORDER BY {columns[key]};"
+    cursor = sqlite_conn.execute(query, params)
+    while rows := cursor.fetchmany(chunk_size):
+        for row in rows:
+            yield str(row[key]).lower(), row_digest(row)
+
+
+def _pg_rows(
+    pg_conn,
+    table_name: str,
+    columns: list[str],
+    key: int,
+    chunk_size: int,
+    lower: str | None = None,
+    upper: str | None = None,
+) -> Iterator[tuple[str, bytes]]:
+    where, params = _range(lower, upper, "%s")
+    # Именованный курсор читает таблицу с сервера порциями, а не целиком
+    with pg_conn.cursor(name=f"{table_name}_consistency") as cursor:
+        cursor.itersize = chunk_size
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM content.{table_name}{where} ORDER BY {columns[key]};", params
+        )
+        for row in cursor:
+            yield str(row[key]).lower(), row_digest(row)
+    pg_conn.rollback()
+
+
+def _range(lower: str | None, upper: str | None, placeholder: str) -> tuple[str, list[str]]:
+    conditions, params = [], []
+    if lower is not None:
+        conditions.append(f"id > {placeholder}")
+        params.append(lower)
+    if upper is not None:
+        conditions.append(f"id <= {placeholder}")
+        params.append(upper)
+    return (f" WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+
+def _diff_range(
+    report: TableReport, sqlite_conn, pg_conn, table_name, columns, pg_columns, key, chunk_size, lower, upper
+) -> None:
+    """Построчное сравнение одного диапазона id, хеши которого не совпали."""
+    sqlite_rows = dict(_sqlite_rows(sqlite_conn, table_name, columns, key, chunk_size, lower, upper))
+    for row_id, digest in _pg_rows(pg_conn, table_name, pg_columns, key, chunk_size, lower, upper):
+        expected = sqlite_rows.pop(row_id, None)
+        if expected is None:
+            report.extra_count += 1
+            _note(report.extra, row_id)
+        elif expected != digest:
+            report.different_count += 1
+            _note(report.different, row_id)
+    for row_id in sqlite_rows:
+        report.missing_count += 1
+        _note(report.missing, row_id)
+
+
+def _note(ids: list, row_id: str) -> None:
+    if len(ids) < MAX_REPORTED_IDS:
+        ids.append(row_id)
+
+
+def _chunks(rows: Iterator[tuple[str, bytes]], size: int) -> Iterator[list[tuple[str, bytes]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 def count_raw_in_table(
@@ -86,6 +279,15 @@ def count_raw_in_table(
 
 
 class DataIntegrityTest(unittest.TestCase):
+    reports: dict[str, TableReport] = {}
+
+    @classmethod
+    def setUpClass(cls):
+        # Все таблицы сверяются один раз и параллельно, тесты только читают отчеты
+        cls.reports = check_tables()
+        for report in cls.reports.values():
+            print(report)
+
     def setUp(self):
         self.sqlite_conn = connect_to_sqlite()
         self.sqlite_cursor = self.sqlite_conn.cursor()
@@ -98,9 +300,8 @@ class DataIntegrityTest(unittest.TestCase):
 
     def table_integrity(self, table_name):
         """Проверка целостности данных в таблице."""
-        data_is_consistent = compare_data(self.sqlite_cursor, self.pg_cursor, table_name, COLUMN_MAPPING)
-        print(data_is_consistent)
-        self.assertTrue(data_is_consistent, "Data inconsistency found")
+        report = self.reports[table_name]
+        self.assertTrue(report.consistent, f"Data inconsistency found: {report}")
 
     def test_film_work_count(self):
         """Проверяем кол-во на одинаковое кол-во фильмов в table film_work."""